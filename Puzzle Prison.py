@@ -1,286 +1,172 @@
-from OpenGL.GL import *
-from OpenGL.GLU import *
-from OpenGL.GLUT import *
+import argparse
+import ctypes
+import importlib
 import math
+import os
 import random
+import sys
 import time
+from collections import OrderedDict
+from functools import lru_cache
+
+LAUNCHED = time.perf_counter()  # --startup-profile counts from here
+
+import numpy as np
+
+import game_logic as logic
+import replay
+from culling import Frustum
+from event_log import console_line, json_line
+from frame_profiler import FrameProfiler
+from simulation_thread import GameSnapshot, SimulationThread
+from levels import BOX_TEMPLATE, box_mesh, load_level
+from mesh_cache import load_meshes
+from game_logic import *
+
+# PyOpenGL takes longer to import than anything else the game needs, so it
+# is only imported once rendering is about to start. import_gl() does what
+# the star imports at the top of this file used to: the public names of
+# OpenGL.GL, OpenGL.GLU and OpenGL.GLUT land in this module's globals, where
+# the draw functions look them up. Names this module already defines (or a
+# tool has patched in) win.
+GL_MODULES = ("OpenGL.GL", "OpenGL.GLU", "OpenGL.GLUT")
+
+def import_gl():
+    global HUD_FONT
+    if "glBegin" in globals():
+        return
+    namespace = globals()
+    for module_name in GL_MODULES:
+        module = importlib.import_module(module_name)
+        public = getattr(module, "__all__", None) or [name for name in vars(module) if not name.startswith("_")]
+        for name in public:
+            namespace.setdefault(name, getattr(module, name))
+    HUD_FONT = namespace["GLUT_BITMAP_HELVETICA_18"]
 
 WINDOW_WIDTH = 1280
 WINDOW_HEIGHT = 720
-ROOM_SIZE = 20.0
-WALL_HEIGHT = 8.0
-TIME_LIMIT = 60
-FLOOR_Z = 0.0
-
-PLAYER_HEIGHT = 1.7
-PLAYER_RADIUS = 0.5
-MOVE_SPEED = 0.15
-ROTATION_SPEED = 2.0
-MOUSE_SENSITIVITY = 0.2
+FOV_Y = 75
+NEAR_PLANE = 0.1
+FAR_PLANE = 100.0
 
 COLOR_WALL = (0.4, 0.35, 0.3)
 COLOR_FLOOR = (0.3, 0.25, 0.2)
 COLOR_CEILING = (0.35, 0.3, 0.25)
 COLOR_BOX = (0.6, 0.4, 0.2)
 COLOR_LOCKED_BOX = (0.5, 0.2, 0.2)
-COLOR_APPLE = (0.9, 0.1, 0.1)
-COLOR_BANANA = (0.95, 0.9, 0.2)
-COLOR_ORANGE = (1.0, 0.5, 0.0)
-COLOR_GRAPE = (0.5, 0.0, 0.5)
 COLOR_KEY = (0.9, 0.8, 0.1)
 
-class GameState:
-    def __init__(self):
-        self.player_x = 0.0
-        self.player_y = PLAYER_HEIGHT
-        self.player_z = 5.0
-        self.player_rotation_y = 0.0
-        self.player_rotation_x = 0.0
-        self.camera_mode = "first_person"
-        self.camera_distance = 5.0
-        self.move_forward = False
-        self.move_backward = False
-        self.move_left = False
-        self.move_right = False
-        self.rotate_left = False
-        self.rotate_right = False
-        self.start_time = time.time()
-        self.time_remaining = TIME_LIMIT
-        self.current_room = 0
-        self.gate_open = [False, False]
-        self.gate_opening_progress = [0.0, 0.0]
-        self.gate_open_time = [0, 0]
-        self.collected_fruits = []
-        self.required_fruits = ["apple", "banana", "orange"]
-        self.keys_found = 0
-        self.held_object = None
-        self.nearby_interactive = None
-        self.current_message = ""
-        self.message_timer = 0
-        self.message_duration = 3.0
-        self.final_score = 0
-        self.game_completed = False
-
-game = GameState()
-
 
 # ROOM 1: FRUIT PUZZLE
 
-class Fruit:
-    def __init__(self, fruit_type, position):
-        self.type = fruit_type
-        self.position = list(position)
-        self.collected = False
-        self.size = 0.3
-        self.color = {
-            "apple": COLOR_APPLE,
-            "banana": COLOR_BANANA,
-            "orange": COLOR_ORANGE,
-            "grape": COLOR_GRAPE
-        }.get(fruit_type, (0.5, 0.5, 0.5))
-
-class Box:
-    def __init__(self, position, locked=False, contains_fruit=None, riddle=""):
-        self.position = list(position)
-        self.locked = locked
-        self.opened = False
-        self.contains_fruit = contains_fruit
-        self.size = (1.0, 0.8, 1.0)
-        self.riddle = riddle
-
-class Key:
-    def __init__(self, position, clue_text=""):
-        self.position = list(position)
-        self.collected = False
-        self.size = 0.2
-        self.clue_text = clue_text
-
-class Clue:
-    def __init__(self, position, text):
-        self.position = list(position)
-        self.text = text
-        self.read = False
-        self.size = 0.3
-
-boxes = []
-fruits = []
-keys = []
-clues = []
-
-def initialize_room1_objects():
-    global boxes, fruits, keys, clues
-    
-    boxes.append(Box([-6, 0, -6], locked=False, contains_fruit="apple", 
-                     riddle="I am red and keep doctors away. What am I?"))
-    boxes.append(Box([6, 0, -6], locked=True, contains_fruit="banana", 
-                     riddle="Yellow and curved, monkeys love me. Find the key near the center."))
-    boxes.append(Box([-6, 0, 6], locked=False, contains_fruit="grape", 
-                     riddle="Purple and small, I grow in bunches."))
-    boxes.append(Box([6, 0, 6], locked=True, contains_fruit="orange", 
-                     riddle="I am round and orange. My key is in the corner."))
-    
-    keys.append(Key([-3, 0.5, 0], clue_text="This key unlocks the yellow fruit box."))
-    keys.append(Key([3, 0.5, 3], clue_text="This key unlocks the orange fruit box."))
-    
-    clues.append(Clue([0, 0.5, -8], "Collect: Apple, Banana, and Orange to escape!"))
-    clues.append(Clue([-8, 0.5, 0], "Red boxes are unlocked. Dark boxes need keys."))
-    clues.append(Clue([8, 0.5, 0], "Look for shiny objects - they might be keys!"))
-
-def get_nearby_object():
-    interact_range = 2.0
-    px, pz = game.player_x, game.player_z
-    
-    for clue in clues:
-        cx, cy, cz = clue.position
-        distance = math.sqrt((px - cx)**2 + (pz - cz)**2)
-        if distance < interact_range:
-            return ("clue", clue)
-    
-    for box in boxes:
-        bx, by, bz = box.position
-        distance = math.sqrt((px - bx)**2 + (pz - bz)**2)
-        if distance < interact_range:
-            return ("box", box)
-    
-    for key in keys:
-        kx, ky, kz = key.position
-        distance = math.sqrt((px - kx)**2 + (pz - kz)**2)
-        if distance < interact_range and not key.collected:
-            return ("key", key)
-    
-    for fruit in fruits:
-        fx, fy, fz = fruit.position
-        distance = math.sqrt((px - fx)**2 + (pz - fz)**2)
-        if distance < interact_range and not fruit.collected:
-            return ("fruit", fruit)
-    
-    return None
-
-def interact_room1():
-    nearby = get_nearby_object()
-    
-    if nearby:
-        obj_type, obj = nearby
-        
-        if obj_type == "clue":
-            obj.read = True
-            game.current_message = obj.text
-            game.message_timer = time.time()
-            print(f"Clue: {obj.text}")
-        
-        elif obj_type == "key":
-            obj.collected = True
-            game.keys_found += 1
-            if obj.clue_text:
-                game.current_message = obj.clue_text
-                game.message_timer = time.time()
-            print(f"Picked up a key! Keys found: {game.keys_found}")
-            if obj.clue_text:
-                print(f"Key hint: {obj.clue_text}")
-        
-        elif obj_type == "box":
-            if obj.locked and game.keys_found > 0:
-                obj.locked = False
-                obj.opened = True
-                game.keys_found -= 1
-                print("Unlocked the box!")
-                if obj.riddle:
-                    print(f"Box riddle: {obj.riddle}")
-                
-                if obj.contains_fruit:
-                    game.collected_fruits.append(obj.contains_fruit)
-                    print(f"Found and collected a {obj.contains_fruit}! ({len(game.collected_fruits)}/{len(game.required_fruits)})")
-                    game.current_message = f"You got a {obj.contains_fruit}!"
-                    game.message_timer = time.time()
-                    check_puzzle_solved()
-            
-            elif not obj.locked and not obj.opened:
-                obj.opened = True
-                if obj.riddle:
-                    print(f"Box riddle: {obj.riddle}")
-                    game.current_message = obj.riddle
-                    game.message_timer = time.time()
-                if obj.contains_fruit:
-                    game.collected_fruits.append(obj.contains_fruit)
-                    print(f"Found and collected a {obj.contains_fruit}! ({len(game.collected_fruits)}/{len(game.required_fruits)})")
-                    game.current_message = f"You got a {obj.contains_fruit}!"
-                    game.message_timer = time.time()
-                    check_puzzle_solved()
-            
-            elif obj.locked:
-                if obj.riddle:
-                    game.current_message = obj.riddle
-                    game.message_timer = time.time()
-                    print(f"Box riddle: {obj.riddle}")
-                print("This box is locked! Find a key to open it.")
-        
-        elif obj_type == "fruit":
-            obj.collected = True
-            game.collected_fruits.append(obj.type)
-            print(f"Collected {obj.type}! ({len(game.collected_fruits)}/{len(game.required_fruits)})")
-            check_puzzle_solved()
-
-def check_puzzle_solved():
-    collected_types = set(game.collected_fruits)
-    required_types = set(game.required_fruits)
-    
-    if required_types.issubset(collected_types):
-        if not game.gate_open[0]:
-            game.gate_open[0] = True
-            print("\n" + "="*50)
-            print("ROOM 1 PUZZLE SOLVED! The gate is opening...")
-            print("="*50 + "\n")
-
-def check_box_collision(x, z, box):
-    box_x, box_y, box_z = box.position
-    w, h, d = box.size
-    return (abs(x - box_x) < (w/2 + PLAYER_RADIUS) and
-            abs(z - box_z) < (d/2 + PLAYER_RADIUS))
-
-def draw_box(box):
-    x, y, z = box.position
-    w, h, d = box.size
-    
-    if box.locked and not box.opened:
-        color = COLOR_LOCKED_BOX
+# Boxes never move, so a room's box geometry (the positions and normals
+# stored with its RoomContent) stays in a buffer while the room is current.
+# Only colors change, when a box is unlocked or opened, and every visible
+# box is drawn with one glMultiDrawArrays. Locks go through the cuboid queue.
+BOX_VERTICES = len(BOX_TEMPLATE)
+LOCK_SIZE = 0.2
+COLOR_LOCK = (0.3, 0.3, 0.3)
+static_boxes = {"content": None, "count": 0, "boxes": None, "locked": None,
+                "mesh_vbo": None, "color_vbo": None}
+
+def upload_static_boxes(store):
+    content = view.room_content
+    if static_boxes["mesh_vbo"] is not None:
+        glDeleteBuffers(2, [static_boxes["mesh_vbo"], static_boxes["color_vbo"]])
+    boxes = store.of_kind(KIND_BOX)
+    if content is not None and content.count == store.count:
+        mesh = content.box_mesh
     else:
-        color = COLOR_BOX
-    
-    draw_cuboid(x, y, z, w, h, d, color)
-    
-    if box.locked and not box.opened:
-        glColor3f(0.8, 0.8, 0.8)
-        lock_size = 0.2
-        draw_cuboid(x, y + h/2, z + d/2 + 0.05, lock_size, lock_size, 0.1, (0.3, 0.3, 0.3))
-
-def draw_fruit(fruit):
+        mesh = box_mesh(store.positions[boxes])
+    mesh = np.ascontiguousarray(mesh, dtype=np.float32)
+    locked = (store.flags[boxes] & (FLAG_LOCKED | FLAG_OPENED)) == FLAG_LOCKED
+    colors = np.repeat(np.where(locked[:, None], COLOR_LOCKED_BOX, COLOR_BOX).astype(np.float32),
+                       BOX_VERTICES, axis=0)
+    
+    mesh_vbo, color_vbo = glGenBuffers(2)
+    glBindBuffer(GL_ARRAY_BUFFER, mesh_vbo)
+    glBufferData(GL_ARRAY_BUFFER, mesh.nbytes, mesh, GL_STATIC_DRAW)
+    glBindBuffer(GL_ARRAY_BUFFER, color_vbo)
+    glBufferData(GL_ARRAY_BUFFER, colors.nbytes, colors, GL_DYNAMIC_DRAW)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    static_boxes.update(content=content, count=store.count, boxes=boxes, locked=locked,
+                        mesh_vbo=mesh_vbo, color_vbo=color_vbo)
+
+def update_box_colors(store):
+    boxes = static_boxes["boxes"]
+    locked = (store.flags[boxes] & (FLAG_LOCKED | FLAG_OPENED)) == FLAG_LOCKED
+    changed = np.flatnonzero(locked != static_boxes["locked"])
+    if len(changed):
+        glBindBuffer(GL_ARRAY_BUFFER, static_boxes["color_vbo"])
+        for slot in changed.tolist():
+            color = COLOR_LOCKED_BOX if locked[slot] else COLOR_BOX
+            colors = np.tile(np.array(color, dtype=np.float32), BOX_VERTICES)
+            glBufferSubData(GL_ARRAY_BUFFER, slot * colors.nbytes, colors.nbytes, colors)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        static_boxes["locked"] = locked
+    return locked
+
+def draw_boxes(store, visible):
+    if static_boxes["content"] is not view.room_content or static_boxes["count"] != store.count:
+        upload_static_boxes(store)
+    locked = update_box_colors(store)
+    if not len(visible):
+        return
+    slots = np.searchsorted(static_boxes["boxes"], visible)
+    
+    glEnableClientState(GL_COLOR_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glBindBuffer(GL_ARRAY_BUFFER, static_boxes["color_vbo"])
+    glColorPointer(3, GL_FLOAT, 0, ctypes.c_void_p(0))
+    glBindBuffer(GL_ARRAY_BUFFER, static_boxes["mesh_vbo"])
+    glNormalPointer(GL_FLOAT, 24, ctypes.c_void_p(12))
+    glVertexPointer(3, GL_FLOAT, 24, ctypes.c_void_p(0))
+    glMultiDrawArrays(GL_TRIANGLES, (slots * BOX_VERTICES).astype(np.int32),
+                      np.full(len(slots), BOX_VERTICES, dtype=np.int32), len(slots))
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glDisableClientState(GL_NORMAL_ARRAY)
+    glDisableClientState(GL_COLOR_ARRAY)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    
+    w, h, d = KIND_SIZES[KIND_BOX]
+    locks = store.positions[visible[locked[slots]]]
+    rows = np.empty((len(locks), CUBOID_ROW), dtype=np.float32)
+    rows[:, 0] = locks[:, 0]
+    rows[:, 1] = locks[:, 1] + h/2
+    rows[:, 2] = locks[:, 2] + d/2 + 0.05
+    rows[:, 3:6] = (LOCK_SIZE, LOCK_SIZE, 0.1)
+    rows[:, 6:9] = COLOR_LOCK
+    queue_cuboids(rows)
+
+def draw_fruit(fruit, detail=20):
     if not fruit.collected:
         x, y, z = fruit.position
-        draw_sphere(x, y, z, fruit.size, fruit.color)
+        draw_sphere(x, y, z, fruit.size, fruit.color, detail)
 
-def draw_key(key):
+def draw_key(key, detail=20):
     if not key.collected:
         x, y, z = key.position
-        draw_sphere(x, y, z, key.size, COLOR_KEY)
+        draw_sphere(x, y, z, key.size, COLOR_KEY, detail)
         draw_cuboid(x, y, z, key.size * 0.5, key.size * 0.3, key.size * 1.5, COLOR_KEY)
 
-def draw_clue(clue):
+def draw_clue(clue, detail=20):
     x, y, z = clue.position
     if clue.read:
-        draw_sphere(x, y, z, clue.size, (0.5, 0.5, 0.5))
+        draw_sphere(x, y, z, clue.size, (0.5, 0.5, 0.5), detail)
     else:
-        draw_sphere(x, y, z, clue.size, (1.0, 1.0, 0.0))
+        draw_sphere(x, y, z, clue.size, (1.0, 1.0, 0.0), detail)
     draw_cuboid(x, y + 0.3, z, 0.4, 0.05, 0.6, (0.9, 0.9, 0.9))
 
 def draw_room1_hud():
     draw_text(20, WINDOW_HEIGHT - 60, "Room 1: The Fruit Puzzle")
     
-    collected_text = f"Fruits: {len(game.collected_fruits)}/{len(game.required_fruits)}"
+    collected_text = hud_text("Fruits: {}/{}", len(view.collected_fruits), len(view.required_fruits))
     draw_text(20, WINDOW_HEIGHT - 90, collected_text)
     
-    draw_text(20, WINDOW_HEIGHT - 120, f"Keys: {game.keys_found}")
+    draw_text(20, WINDOW_HEIGHT - 120, hud_text("Keys: {}", view.keys_found))
     
-    nearby = get_nearby_object()
+    nearby = view.nearby_object()
     if nearby:
         obj_type, obj = nearby
         if obj_type == "box":
@@ -293,101 +179,95 @@ def draw_room1_hud():
         elif obj_type == "key":
             hint = "Press F to pick up key"
         elif obj_type == "fruit":
-            hint = f"Press F to collect {obj.type}"
+            hint = hud_text("Press F to collect {}", obj.type)
         elif obj_type == "clue":
             hint = "Press F to read clue"
         
         draw_text(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 - 50, hint)
     
-    if game.gate_open[0]:
+    if view.gate_open[0]:
         draw_text(WINDOW_WIDTH // 2 - 200, WINDOW_HEIGHT // 2, 
                  "PUZZLE SOLVED! Walk through the gate to Room 2!")
     
-    if game.current_message and (time.time() - game.message_timer) < game.message_duration:
-        time_left = game.message_duration - (time.time() - game.message_timer)
+    if view.current_message and (view.sim_time - view.message_timer) < view.message_duration:
+        time_left = view.message_duration - (view.sim_time - view.message_timer)
         alpha = min(1.0, time_left / 0.5)
         glColor3f(0.2 * alpha, 0.8 * alpha, 0.2 * alpha)
-        draw_text(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 + 100, game.current_message)
+        draw_text(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 + 100, view.current_message)
 
 
 # ROOM 2: COLOR SEQUENCE PUZZLE
 
-COLOR_SEQUENCE = ['red', 'blue', 'green', 'yellow']
-AVAILABLE_COLORS = ['red', 'blue', 'green', 'yellow']
-color_switches = [
-    {"pos": [-300, 200], "color": "red", "active": False, "col": (0.9, 0.1, 0.1)},
-    {"pos": [300, 200], "color": "blue", "active": False, "col": (0.1, 0.1, 0.9)},
-    {"pos": [-300, -200], "color": "green", "active": False, "col": (0.1, 0.9, 0.1)},
-    {"pos": [300, -200], "color": "yellow", "active": False, "col": (0.95, 0.95, 0.1)},
-]
-current_sequence = []
-sequence_correct = False
-last_switch_time = 0
-SWITCH_COOLDOWN = 0.5
-ROOM2_COLLIDERS = []
-player_pos = [0, 0, 0]
-
-def randomize_color_sequence():
-    global COLOR_SEQUENCE
-    COLOR_SEQUENCE = [AVAILABLE_COLORS[i] for i in range(len(AVAILABLE_COLORS))]
-    for i in range(len(COLOR_SEQUENCE)):
-        swap_idx = random.randint(0, len(COLOR_SEQUENCE) - 1)
-        COLOR_SEQUENCE[i], COLOR_SEQUENCE[swap_idx] = COLOR_SEQUENCE[swap_idx], COLOR_SEQUENCE[i]   
-    print(f"Room 2 - Color sequence: {COLOR_SEQUENCE}")
-
-def rebuild_room2_colliders():
-    global ROOM2_COLLIDERS
-    ROOM2_COLLIDERS = []
-    for switch in color_switches:
-        x, y = switch["pos"]
-        ROOM2_COLLIDERS.append((x, y, 30, 30))
-    ROOM2_COLLIDERS.append((0, 0, 35, 35))
-
-def room_offset_y(room_num):
-    if room_num == 0:
-        return 0
-    else:
-        return -400
+# Cylinders are rebuilt from cached unit-circle tables only the first time a
+# (radius, height, slices) combination is seen; afterwards every switch base
+# and the buzzer reuse the same ready-made vertex arrays.
+unit_circle_tables = {}
+cylinder_mesh_cache = {}
+SWITCH_BASE = (0.25, 0.3)  # radius, height
+BUZZER_BASE = (0.3, 0.5)
+
+def get_unit_circle(slices):
+    table = unit_circle_tables.get(slices)
+    if table is None:
+        angles = np.linspace(0.0, 2.0 * math.pi, slices + 1)
+        table = (np.cos(angles).astype(np.float32), np.sin(angles).astype(np.float32))
+        unit_circle_tables[slices] = table
+    return table
+
+def build_cylinder_mesh(radius, height, slices):
+    cos_table, sin_table = get_unit_circle(slices)
+    ring = np.zeros((slices + 1, 3), dtype=np.float32)
+    ring[:, 0] = radius * cos_table
+    ring[:, 1] = radius * sin_table
+    
+    bottom = np.vstack([[0, 0, 0], ring])
+    top = bottom + (0, 0, height)
+    side = np.empty((2 * (slices + 1), 3), dtype=np.float32)
+    side[0::2] = ring
+    side[1::2] = ring + (0, 0, height)
+    
+    side_normals = np.zeros_like(side)
+    side_normals[0::2, 0] = side_normals[1::2, 0] = cos_table
+    side_normals[0::2, 1] = side_normals[1::2, 1] = sin_table
+    cap_normals = np.zeros_like(bottom)
+    
+    vertices = np.vstack([bottom, top, side]).astype(np.float32)
+    normals = np.vstack([cap_normals + (0, 0, -1), cap_normals + (0, 0, 1), side_normals]).astype(np.float32)
+    return vertices, normals
 
 def draw_cylinder(radius, height, slices=16):
-    glBegin(GL_TRIANGLE_FAN)
-    glVertex3f(0, 0, 0)
-    for i in range(slices + 1):
-        angle = 2.0 * math.pi * i / slices
-        x = radius * math.cos(angle)
-        y = radius * math.sin(angle)
-        glVertex3f(x, y, 0)
-    glEnd()
-    
-    glBegin(GL_TRIANGLE_FAN)
-    glVertex3f(0, 0, height)
-    for i in range(slices + 1):  
-        angle = 2.0 * math.pi * i / slices
-        x = radius * math.cos(angle)
-        y = radius * math.sin(angle)
-        glVertex3f(x, y, height)
-    glEnd()
-    
-    glBegin(GL_TRIANGLE_STRIP)
-    for i in range(slices + 1):
-        angle = 2.0 * math.pi * i / slices
-        x = radius * math.cos(angle)
-        y = radius * math.sin(angle)
-        glVertex3f(x, y, 0)
-        glVertex3f(x, y, height)
-    glEnd()
+    key = (radius, height, slices)
+    mesh = cylinder_mesh_cache.get(key)
+    if mesh is None:
+        mesh = build_cylinder_mesh(radius, height, slices)
+        cylinder_mesh_cache[key] = mesh
+    vertices, normals = mesh
+    
+    fan_count = slices + 2
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, vertices)
+    glNormalPointer(GL_FLOAT, 0, normals)
+    glDrawArrays(GL_TRIANGLE_FAN, 0, fan_count)
+    glDrawArrays(GL_TRIANGLE_FAN, fan_count, fan_count)
+    glDrawArrays(GL_TRIANGLE_STRIP, 2 * fan_count, 2 * (slices + 1))
+    glDisableClientState(GL_NORMAL_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
 
 def draw_color_switches(room_base_y):
-    for switch in color_switches:
+    for switch in view.switches:
         x, y = switch["pos"]
         world_x = x / 100.0
         world_z = y / 100.0
+        if not prop_in_view(world_x, SWITCH_BOUNDS[0], world_z, SWITCH_BOUNDS[1], SWITCH_DRAW_CALLS):
+            continue
+        slices, detail = prop_detail(world_x, SWITCH_BOUNDS[0], world_z, 0.25)
         
         glColor3f(0.3, 0.3, 0.3)
         glPushMatrix()
         glTranslatef(world_x, FLOOR_Z, world_z)
         glRotatef(-90, 1, 0, 0)
-        draw_cylinder(0.25, 0.3, 16)
+        draw_cylinder(*SWITCH_BASE, slices)
         glPopMatrix()
         
         if switch["active"]:
@@ -400,134 +280,52 @@ def draw_color_switches(room_base_y):
         
         z_offset = 0.35 + (0.05 if switch["active"] else 0)
         draw_sphere(world_x, z_offset, world_z, 0.15, switch["col"] if not switch["active"] else 
-                   (min(1.0, switch["col"][0] * 1.5), min(1.0, switch["col"][1] * 1.5), min(1.0, switch["col"][2] * 1.5)))
+                   (min(1.0, switch["col"][0] * 1.5), min(1.0, switch["col"][1] * 1.5), min(1.0, switch["col"][2] * 1.5)),
+                   detail)
 
 def draw_central_buzzer(room_base_y):
+    if not prop_in_view(0, BUZZER_BOUNDS[0], 0, BUZZER_BOUNDS[1], SWITCH_DRAW_CALLS):
+        return
+    slices, detail = prop_detail(0, BUZZER_BOUNDS[0], 0, 0.3)
+    
     glColor3f(0.4, 0.4, 0.4)
     glPushMatrix()
     glTranslatef(0, FLOOR_Z, 0)
     glRotatef(-90, 1, 0, 0)
-    draw_cylinder(0.3, 0.5, 16)
+    draw_cylinder(*BUZZER_BASE, slices)
     glPopMatrix()
     
-    if sequence_correct and not game.gate_open[1]:
+    if view.sequence_correct and not view.gate_open[1]:
         pulse = 0.3 + 0.2 * math.sin(time.time() * 4.0)
         glColor3f(0.2 + pulse, 1.0, 0.2 + pulse)
-    elif game.gate_open[1]:
+    elif view.gate_open[1]:
         glColor3f(1.0, 1.0, 1.0)
     else:
         glColor3f(1.0, 1.0, 1.0)
     
-    z_offset = 0.55 + (0.05 if sequence_correct else 0)
+    z_offset = 0.55 + (0.05 if view.sequence_correct else 0)
     current_color = (1.0, 1.0, 1.0)
-    if sequence_correct and not game.gate_open[1]:
+    if view.sequence_correct and not view.gate_open[1]:
         pulse = 0.3 + 0.2 * math.sin(time.time() * 4.0)
         current_color = (0.2 + pulse, 1.0, 0.2 + pulse)
-    elif game.gate_open[1]:
+    elif view.gate_open[1]:
         current_color = (1.0, 1.0, 1.0)
     
-    draw_sphere(0, z_offset, 0, 0.2, current_color)
-
-def try_activate_switch():
-    global current_sequence, sequence_correct, last_switch_time
-    
-    if game.current_room != 1:
-        return
-    
-    if time.time() - last_switch_time < SWITCH_COOLDOWN:
-        return
-    
-    room_base_y = room_offset_y(game.current_room)
-    
-    if sequence_correct and not game.gate_open[1]:
-        if activate_buzzer(room_base_y):
-            return
-    
-    nearest_switch = find_nearest_switch(room_base_y)
-    if nearest_switch:
-        handle_switch_activation(nearest_switch)
-
-def activate_buzzer(room_base_y):
-    buzzer_x, buzzer_z = 0, 0
-    buzzer_dist = calculate_distance(game.player_x, game.player_z, buzzer_x, buzzer_z)
-    
-    if buzzer_dist < 1.0:
-        update_gate_status()
-        return True
-    return False
-
-def find_nearest_switch(room_base_y):
-    nearest_switch = None
-    nearest_dist = float('inf')
-    
-    for switch in color_switches:
-        x, y = switch["pos"]
-        world_x = x / 100.0
-        world_z = y / 100.0
-        dist = calculate_distance(game.player_x, game.player_z, world_x, world_z)
-        
-        if dist < 1.0 and dist < nearest_dist:
-            nearest_dist = dist
-            nearest_switch = switch
-    
-    return nearest_switch
-
-def calculate_distance(x1, y1, x2, y2):
-    return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
-
-def handle_switch_activation(nearest_switch):
-    global current_sequence, sequence_correct, last_switch_time
-    
-    last_switch_time = time.time()
-    expected_next = len(current_sequence)
-    
-    if is_valid_switch_activation(nearest_switch, expected_next):
-        nearest_switch["active"] = True
-        current_sequence.append(nearest_switch["color"])
-        print(f"Activated {nearest_switch['color']} switch. Sequence: {current_sequence}")
-        
-        if len(current_sequence) == len(COLOR_SEQUENCE):
-            sequence_correct = True
-            print("Color sequence complete! Go to central buzzer and press F")
-    else:
-        print(f"Wrong switch! Expected {COLOR_SEQUENCE[expected_next] if expected_next < len(COLOR_SEQUENCE) else 'none'}, got {nearest_switch['color']}")
-        reset_color_sequence()
-
-def is_valid_switch_activation(nearest_switch, expected_next):
-    return (expected_next < len(COLOR_SEQUENCE) and
-            nearest_switch["color"] == COLOR_SEQUENCE[expected_next])
-
-def update_gate_status():
-    game.gate_open[1] = True
-    game.gate_open_time[1] = time.time()
-    print(f"Buzzer activated! Game complete!")
-
-def reset_color_sequence():
-    clear_current_sequence()
-    deactivate_all_switches()
-
-def clear_current_sequence():
-    global current_sequence, sequence_correct
-    current_sequence = []
-    sequence_correct = False
-
-def deactivate_all_switches():
-    for switch in color_switches:
-        switch["active"] = False
+    draw_sphere(0, z_offset, 0, 0.2, current_color, detail)
 
 def draw_room2_hud():
     draw_text(20, WINDOW_HEIGHT - 60, "Room 2: Color Sequence")
     
-    seq_text = f"Sequence: {' -> '.join(current_sequence) if current_sequence else 'Start!'}"
+    seq_text = sequence_text("Sequence", view.current_sequence, "Start!")
     draw_text(20, WINDOW_HEIGHT - 90, seq_text)
     
-    target_text = f"Target: {' -> '.join(COLOR_SEQUENCE)}"
+    target_text = sequence_text("Target", view.color_sequence, "")
     draw_text(20, WINDOW_HEIGHT - 120, target_text)
     
-    if sequence_correct and not game.gate_open[1]:
+    if view.sequence_correct and not view.gate_open[1]:
         draw_text(WINDOW_WIDTH // 2 - 150, WINDOW_HEIGHT // 2, 
                  "Sequence Complete! Activate the central buzzer (Press F)")
-    elif game.gate_open[1]:
+    elif view.gate_open[1]:
         draw_text(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2, 
                  "GAME COMPLETE!")
 
@@ -535,134 +333,188 @@ def draw_room2_hud():
 # Shared rendering and game logic functions:
 
 
+# Batched geometry shares one vertex layout: interleaved float32 color,
+# normal and position. draw_interleaved() draws it from the bound buffer,
+# or from client memory at address base when no buffer is bound.
+VERTEX_STRIDE = 9 * 4
+
+def draw_interleaved(mode, first, count, base=0):
+    glEnableClientState(GL_COLOR_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glColorPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base))
+    glNormalPointer(GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base + 12))
+    glVertexPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base + 24))
+    glDrawArrays(mode, first, count)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glDisableClientState(GL_NORMAL_ARRAY)
+    glDisableClientState(GL_COLOR_ARRAY)
+
+# gl_accounting charges calls made inside these to their caller.
+GL_HELPERS = ("draw_interleaved", "draw_quads")
+
+# draw_cuboid() only queues a row. flush_cuboids() expands everything queued
+# this frame into lit triangles with NumPy and draws them in one call from a
+# streamed buffer, so a cuboid costs no GL calls of its own.
+CUBOID_ROW = 9  # x, y, z, width, height, depth, r, g, b
+cuboid_queue = {"rows": np.zeros((64, CUBOID_ROW), dtype=np.float32), "count": 0, "vbo": None}
+
+def queue_cuboids(rows):
+    count = cuboid_queue["count"]
+    needed = count + len(rows)
+    if needed > len(cuboid_queue["rows"]):
+        grown = np.zeros((max(needed, 2 * len(cuboid_queue["rows"])), CUBOID_ROW), dtype=np.float32)
+        grown[:count] = cuboid_queue["rows"][:count]
+        cuboid_queue["rows"] = grown
+    cuboid_queue["rows"][count:needed] = rows
+    cuboid_queue["count"] = needed
+
 def draw_cuboid(x, y, z, width, height, depth, color):
-    glPushMatrix()
-    glTranslatef(x, y + height/2, z)
-    glColor3f(*color)
-    
-    glBegin(GL_QUADS)
-    glVertex3f(-width/2, -height/2, depth/2)
-    glVertex3f(width/2, -height/2, depth/2)
-    glVertex3f(width/2, height/2, depth/2)
-    glVertex3f(-width/2, height/2, depth/2)
-    
-    glVertex3f(-width/2, -height/2, -depth/2)
-    glVertex3f(-width/2, height/2, -depth/2)
-    glVertex3f(width/2, height/2, -depth/2)
-    glVertex3f(width/2, -height/2, -depth/2)
-    
-    glVertex3f(-width/2, -height/2, -depth/2)
-    glVertex3f(-width/2, -height/2, depth/2)
-    glVertex3f(-width/2, height/2, depth/2)
-    glVertex3f(-width/2, height/2, -depth/2)
-    
-    glVertex3f(width/2, -height/2, -depth/2)
-    glVertex3f(width/2, height/2, -depth/2)
-    glVertex3f(width/2, height/2, depth/2)
-    glVertex3f(width/2, -height/2, depth/2)
-    
-    glVertex3f(-width/2, height/2, -depth/2)
-    glVertex3f(-width/2, height/2, depth/2)
-    glVertex3f(width/2, height/2, depth/2)
-    glVertex3f(width/2, height/2, -depth/2)
-    
-    glVertex3f(-width/2, -height/2, -depth/2)
-    glVertex3f(width/2, -height/2, -depth/2)
-    glVertex3f(width/2, -height/2, depth/2)
-    glVertex3f(-width/2, -height/2, depth/2)
-    glEnd()
-    
-    glPopMatrix()
+    queue_cuboids(((x, y, z, width, height, depth) + tuple(color),))
+
+def cuboid_vertices(rows):
+    vertices = np.empty((len(rows), len(CUBE_POSITIONS), 9), dtype=np.float32)
+    vertices[:, :, 0:3] = rows[:, None, 6:9]
+    vertices[:, :, 3:6] = CUBE_NORMALS
+    vertices[:, :, 6:9] = CUBE_POSITIONS * rows[:, None, 3:6] + rows[:, None, 0:3]
+    vertices[:, :, 7] += rows[:, None, 4] / 2
+    return vertices.reshape(-1, 9)
+
+def flush_cuboids():
+    count = cuboid_queue["count"]
+    if not count:
+        return
+    vertices = cuboid_vertices(cuboid_queue["rows"][:count])
+    cuboid_queue["count"] = 0
+    if cuboid_queue["vbo"] is None:
+        cuboid_queue["vbo"] = glGenBuffers(1)
+    glBindBuffer(GL_ARRAY_BUFFER, cuboid_queue["vbo"])
+    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STREAM_DRAW)
+    draw_interleaved(GL_TRIANGLES, 0, len(vertices))
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+# Unit spheres are tessellated once per detail level and shared by every
+# draw_sphere call; the radius is applied with glScalef.
+SPHERE_DETAIL_LEVELS = (8, 12, 20)
+sphere_mesh_pool = {}
+render_stats = {"sphere_tessellations": 0, "props_culled": 0, "draw_calls_saved": 0}
+
+def tessellate_unit_sphere(detail):
+    slices = stacks = detail
+    rho = np.linspace(0.0, math.pi, stacks + 1, dtype=np.float32)
+    theta = np.linspace(0.0, 2.0 * math.pi, slices + 1, dtype=np.float32)
+    rho, theta = np.meshgrid(rho, theta, indexing="ij")
+    vertices = np.stack([np.cos(theta) * np.sin(rho),
+                         np.sin(theta) * np.sin(rho),
+                         np.cos(rho)], axis=-1).reshape(-1, 3)
+
+    row = np.arange(stacks, dtype=np.uint16)[:, None] * (slices + 1)
+    col = np.arange(slices, dtype=np.uint16)[None, :]
+    a = (row + col).ravel()
+    b = a + slices + 1
+    indices = np.stack([a, b, a + 1, a + 1, b, b + 1], axis=-1).astype(np.uint16).ravel()
+
+    render_stats["sphere_tessellations"] += 1
+    return np.ascontiguousarray(vertices, dtype=np.float32), indices
+
+def get_sphere_mesh(detail):
+    for level in SPHERE_DETAIL_LEVELS:
+        if detail <= level:
+            break
+    mesh = sphere_mesh_pool.get(level)
+    if mesh is None:
+        mesh = tessellate_unit_sphere(level)
+        sphere_mesh_pool[level] = mesh
+    return mesh
+
+def draw_sphere(x, y, z, radius, color, detail=20):
+    vertices, indices = get_sphere_mesh(detail)
 
-def draw_sphere(x, y, z, radius, color):
     glPushMatrix()
     glTranslatef(x, y, z)
+    glScalef(radius, radius, radius)
     glColor3f(*color)
-    quadric = gluNewQuadric()
-    gluSphere(quadric, radius, 20, 20)
-    gluDeleteQuadric(quadric)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, vertices)
+    glNormalPointer(GL_FLOAT, 0, vertices)
+    glDrawElements(GL_TRIANGLES, len(indices), GL_UNSIGNED_SHORT, indices)
+    glDisableClientState(GL_NORMAL_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
     glPopMatrix()
 
-def draw_floor():
-    glColor3f(*COLOR_FLOOR)
-    glBegin(GL_QUADS)
-    glVertex3f(-ROOM_SIZE/2, 0, -ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, 0, -ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, 0, ROOM_SIZE/2)
-    glVertex3f(-ROOM_SIZE/2, 0, ROOM_SIZE/2)
-    glEnd()
-
-def draw_ceiling():
-    glColor3f(*COLOR_CEILING)
-    glBegin(GL_QUADS)
-    glVertex3f(-ROOM_SIZE/2, WALL_HEIGHT, -ROOM_SIZE/2)
-    glVertex3f(-ROOM_SIZE/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, WALL_HEIGHT, -ROOM_SIZE/2)
-    glEnd()
-
-def draw_walls():
-    glColor3f(*COLOR_WALL)
-    
-    glBegin(GL_QUADS)
-    glVertex3f(-ROOM_SIZE/2, 0, -ROOM_SIZE/2)
-    glVertex3f(-ROOM_SIZE/2, WALL_HEIGHT, -ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, WALL_HEIGHT, -ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, 0, -ROOM_SIZE/2)
-    glEnd()
-    
-    glBegin(GL_QUADS)
-    glVertex3f(-ROOM_SIZE/2, 0, -ROOM_SIZE/2)
-    glVertex3f(-ROOM_SIZE/2, 0, ROOM_SIZE/2)
-    glVertex3f(-ROOM_SIZE/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(-ROOM_SIZE/2, WALL_HEIGHT, -ROOM_SIZE/2)
-    glEnd()
-    
-    glBegin(GL_QUADS)
-    glVertex3f(ROOM_SIZE/2, 0, -ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, WALL_HEIGHT, -ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, 0, ROOM_SIZE/2)
-    glEnd()
-    
-    gate_width = 3.0
-    gate_height = 4.0
-    gate_offset = game.gate_opening_progress[game.current_room] * gate_height
-    
-    glBegin(GL_QUADS)
-    glVertex3f(-ROOM_SIZE/2, 0, ROOM_SIZE/2)
-    glVertex3f(-ROOM_SIZE/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(-gate_width/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(-gate_width/2, 0, ROOM_SIZE/2)
-    glEnd()
-    
-    glBegin(GL_QUADS)
-    glVertex3f(gate_width/2, 0, ROOM_SIZE/2)
-    glVertex3f(gate_width/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(ROOM_SIZE/2, 0, ROOM_SIZE/2)
-    glEnd()
-    
-    glBegin(GL_QUADS)
-    glVertex3f(-gate_width/2, gate_height, ROOM_SIZE/2)
-    glVertex3f(-gate_width/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(gate_width/2, WALL_HEIGHT, ROOM_SIZE/2)
-    glVertex3f(gate_width/2, gate_height, ROOM_SIZE/2)
-    glEnd()
-    
-    if game.gate_opening_progress[game.current_room] < 1.0:
-        glColor3f(0.3, 0.3, 0.3)
-        glBegin(GL_QUADS)
-        glVertex3f(-gate_width/2, gate_offset, ROOM_SIZE/2 - 0.1)
-        glVertex3f(-gate_width/2, gate_height, ROOM_SIZE/2 - 0.1)
-        glVertex3f(gate_width/2, gate_height, ROOM_SIZE/2 - 0.1)
-        glVertex3f(gate_width/2, gate_offset, ROOM_SIZE/2 - 0.1)
-        glEnd()
-
-def draw_player_body(x, y, z, rotation_y):
-    glPushMatrix()
-    glTranslatef(x, y, z)
-    glRotatef(rotation_y, 0, 1, 0)
+# Room surfaces are (color, normal, corners) quads, turned into
+# interleaved vertices and drawn with one call.
+def floor_quads():
+    return [(COLOR_FLOOR, (0, 1, 0), [(-ROOM_SIZE/2, 0, -ROOM_SIZE/2), (ROOM_SIZE/2, 0, -ROOM_SIZE/2),
+                                      (ROOM_SIZE/2, 0, ROOM_SIZE/2), (-ROOM_SIZE/2, 0, ROOM_SIZE/2)])]
+
+def ceiling_quads():
+    return [(COLOR_CEILING, (0, -1, 0), [(-ROOM_SIZE/2, WALL_HEIGHT, -ROOM_SIZE/2),
+                                         (-ROOM_SIZE/2, WALL_HEIGHT, ROOM_SIZE/2),
+                                         (ROOM_SIZE/2, WALL_HEIGHT, ROOM_SIZE/2),
+                                         (ROOM_SIZE/2, WALL_HEIGHT, -ROOM_SIZE/2)])]
+
+def wall_quads():
+    half = ROOM_SIZE/2
+    return [
+        (COLOR_WALL, (0, 0, 1), [(-half, 0, -half), (-half, WALL_HEIGHT, -half),
+                                 (half, WALL_HEIGHT, -half), (half, 0, -half)]),
+        (COLOR_WALL, (1, 0, 0), [(-half, 0, -half), (-half, 0, half),
+                                 (-half, WALL_HEIGHT, half), (-half, WALL_HEIGHT, -half)]),
+        (COLOR_WALL, (-1, 0, 0), [(half, 0, -half), (half, WALL_HEIGHT, -half),
+                                  (half, WALL_HEIGHT, half), (half, 0, half)]),
+        (COLOR_WALL, (0, 0, -1), [(-half, 0, half), (-half, WALL_HEIGHT, half),
+                                  (-GATE_WIDTH/2, WALL_HEIGHT, half), (-GATE_WIDTH/2, 0, half)]),
+        (COLOR_WALL, (0, 0, -1), [(GATE_WIDTH/2, 0, half), (GATE_WIDTH/2, WALL_HEIGHT, half),
+                                  (half, WALL_HEIGHT, half), (half, 0, half)]),
+        (COLOR_WALL, (0, 0, -1), [(-GATE_WIDTH/2, GATE_HEIGHT, half), (-GATE_WIDTH/2, WALL_HEIGHT, half),
+                                  (GATE_WIDTH/2, WALL_HEIGHT, half), (GATE_WIDTH/2, GATE_HEIGHT, half)]),
+    ]
+
+def gate_quads(progress):
+    if progress >= 1.0:
+        return []
+    
+    gate_offset = progress * GATE_HEIGHT
+    z = ROOM_SIZE/2 - 0.1
+    return [((0.3, 0.3, 0.3), (0, 0, -1), [(-GATE_WIDTH/2, gate_offset, z), (-GATE_WIDTH/2, GATE_HEIGHT, z),
+                                           (GATE_WIDTH/2, GATE_HEIGHT, z), (GATE_WIDTH/2, gate_offset, z)])]
+
+def quad_vertices(quads):
+    return np.array([color + normal + corner for color, normal, corners in quads for corner in corners],
+                    dtype=np.float32).reshape(-1, 9)
+
+def draw_quads(quads):
+    vertices = quad_vertices(quads)
+    if len(vertices):
+        draw_interleaved(GL_QUADS, 0, len(vertices), vertices.ctypes.data)
+
+def draw_gate(progress):
+    draw_quads(gate_quads(progress))
+
+# The floor, ceiling and walls never move and every room has the same
+# ones, so they live in a single static buffer with the closed gate as its
+# last quad. Only a gate that is actually sliding open is drawn separately.
+room_shell_mesh = {"vbo": None, "count": 0}
+
+def room_shell_vertices():
+    return quad_vertices(floor_quads() + ceiling_quads() + wall_quads() + gate_quads(0.0))
+
+def draw_room_shell():
+    room = view.current_room
+    progress = sim_clock.lerp(view.prev_gate_opening_progress[room], view.gate_opening_progress[room])
+    count = room_shell_mesh["count"] if progress <= 0.0 else room_shell_mesh["count"] - 4
+    
+    glBindBuffer(GL_ARRAY_BUFFER, room_shell_mesh["vbo"])
+    draw_interleaved(GL_QUADS, 0, count)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    
+    if 0.0 < progress < 1.0:
+        draw_gate(progress)
+
+def player_body_parts():
+    parts = []
     
     torso_color = (0.1, 0.15, 0.25)
     accent_color = (0.0, 0.8, 1.0)
@@ -672,201 +524,324 @@ def draw_player_body(x, y, z, rotation_y):
     
     head_radius = 0.22
     head_y = 0.5
-    draw_sphere(0, head_y, 0, head_radius, head_color)
+    parts.append(("sphere", 0, head_y, 0, head_radius, head_color))
     
     eye_offset = 0.08
     eye_forward = 0.18
-    draw_sphere(-eye_offset, head_y + 0.05, eye_forward, 0.04, accent_color)
-    draw_sphere(eye_offset, head_y + 0.05, eye_forward, 0.04, accent_color)
+    parts.append(("sphere", -eye_offset, head_y + 0.05, eye_forward, 0.04, accent_color))
+    parts.append(("sphere", eye_offset, head_y + 0.05, eye_forward, 0.04, accent_color))
     
     neck_width = 0.12
     neck_height = 0.15
     neck_depth = 0.12
     neck_y = 0.3
-    draw_cuboid(0, neck_y, 0, neck_width, neck_height, neck_depth, limb_color)
+    parts.append(("cuboid", 0, neck_y, 0, neck_width, neck_height, neck_depth, limb_color))
     
     upper_torso_width = 0.5
     upper_torso_height = 0.35
     upper_torso_depth = 0.28
     upper_torso_y = 0.05
-    draw_cuboid(0, upper_torso_y, 0, upper_torso_width, upper_torso_height, upper_torso_depth, torso_color)
+    parts.append(("cuboid", 0, upper_torso_y, 0, upper_torso_width, upper_torso_height, upper_torso_depth, torso_color))
     
-    draw_cuboid(0, 0.1, upper_torso_depth/2 + 0.01, upper_torso_width * 0.3, 0.08, 0.02, accent_color)
+    parts.append(("cuboid", 0, 0.1, upper_torso_depth/2 + 0.01, upper_torso_width * 0.3, 0.08, 0.02, accent_color))
     
     lower_torso_width = 0.42
     lower_torso_height = 0.3
     lower_torso_depth = 0.26
     lower_torso_y = -0.25
-    draw_cuboid(0, lower_torso_y, 0, lower_torso_width, lower_torso_height, lower_torso_depth, torso_color)
+    parts.append(("cuboid", 0, lower_torso_y, 0, lower_torso_width, lower_torso_height, lower_torso_depth, torso_color))
     
     shoulder_radius = 0.1
     shoulder_x = upper_torso_width/2
     shoulder_y = 0.15
-    draw_sphere(-shoulder_x, shoulder_y, 0, shoulder_radius, joint_color)
-    draw_sphere(shoulder_x, shoulder_y, 0, shoulder_radius, joint_color)
+    parts.append(("sphere", -shoulder_x, shoulder_y, 0, shoulder_radius, joint_color))
+    parts.append(("sphere", shoulder_x, shoulder_y, 0, shoulder_radius, joint_color))
     
     arm_width = 0.13
     upper_arm_height = 0.35
     arm_depth = 0.13
     left_upper_arm_x = -upper_torso_width/2 - arm_width/2 - 0.03
     upper_arm_y = 0.0
-    draw_cuboid(left_upper_arm_x, upper_arm_y, 0, arm_width, upper_arm_height, arm_depth, limb_color)
-    draw_cuboid(-left_upper_arm_x, upper_arm_y, 0, arm_width, upper_arm_height, arm_depth, limb_color)
+    parts.append(("cuboid", left_upper_arm_x, upper_arm_y, 0, arm_width, upper_arm_height, arm_depth, limb_color))
+    parts.append(("cuboid", -left_upper_arm_x, upper_arm_y, 0, arm_width, upper_arm_height, arm_depth, limb_color))
     
     elbow_y = -0.15
-    draw_sphere(left_upper_arm_x, elbow_y, 0, 0.08, joint_color)
-    draw_sphere(-left_upper_arm_x, elbow_y, 0, 0.08, joint_color)
+    parts.append(("sphere", left_upper_arm_x, elbow_y, 0, 0.08, joint_color))
+    parts.append(("sphere", -left_upper_arm_x, elbow_y, 0, 0.08, joint_color))
     
     lower_arm_height = 0.32
     lower_arm_y = -0.4
-    draw_cuboid(left_upper_arm_x, lower_arm_y, 0, arm_width * 0.9, lower_arm_height, arm_depth * 0.9, limb_color)
-    draw_cuboid(-left_upper_arm_x, lower_arm_y, 0, arm_width * 0.9, lower_arm_height, arm_depth * 0.9, limb_color)
+    parts.append(("cuboid", left_upper_arm_x, lower_arm_y, 0, arm_width * 0.9, lower_arm_height, arm_depth * 0.9, limb_color))
+    parts.append(("cuboid", -left_upper_arm_x, lower_arm_y, 0, arm_width * 0.9, lower_arm_height, arm_depth * 0.9, limb_color))
     
     hand_y = -0.6
-    draw_sphere(left_upper_arm_x, hand_y, 0, 0.09, accent_color)
-    draw_sphere(-left_upper_arm_x, hand_y, 0, 0.09, accent_color)
+    parts.append(("sphere", left_upper_arm_x, hand_y, 0, 0.09, accent_color))
+    parts.append(("sphere", -left_upper_arm_x, hand_y, 0, 0.09, accent_color))
     
     hip_x = lower_torso_width/3
     hip_y = -0.42
-    draw_sphere(-hip_x, hip_y, 0, 0.09, joint_color)
-    draw_sphere(hip_x, hip_y, 0, 0.09, joint_color)
+    parts.append(("sphere", -hip_x, hip_y, 0, 0.09, joint_color))
+    parts.append(("sphere", hip_x, hip_y, 0, 0.09, joint_color))
     
     leg_width = 0.16
     upper_leg_height = 0.4
     leg_depth = 0.16
     left_leg_x = -lower_torso_width/3.5
     upper_leg_y = -0.7
-    draw_cuboid(left_leg_x, upper_leg_y, 0, leg_width, upper_leg_height, leg_depth, limb_color)
-    draw_cuboid(-left_leg_x, upper_leg_y, 0, leg_width, upper_leg_height, leg_depth, limb_color)
+    parts.append(("cuboid", left_leg_x, upper_leg_y, 0, leg_width, upper_leg_height, leg_depth, limb_color))
+    parts.append(("cuboid", -left_leg_x, upper_leg_y, 0, leg_width, upper_leg_height, leg_depth, limb_color))
     
     knee_y = -0.92
-    draw_sphere(left_leg_x, knee_y, 0, 0.08, joint_color)
-    draw_sphere(-left_leg_x, knee_y, 0, 0.08, joint_color)
+    parts.append(("sphere", left_leg_x, knee_y, 0, 0.08, joint_color))
+    parts.append(("sphere", -left_leg_x, knee_y, 0, 0.08, joint_color))
     
     lower_leg_height = 0.42
     lower_leg_y = -1.2
-    draw_cuboid(left_leg_x, lower_leg_y, 0, leg_width * 0.9, lower_leg_height, leg_depth * 0.9, limb_color)
-    draw_cuboid(-left_leg_x, lower_leg_y, 0, leg_width * 0.9, lower_leg_height, leg_depth * 0.9, limb_color)
+    parts.append(("cuboid", left_leg_x, lower_leg_y, 0, leg_width * 0.9, lower_leg_height, leg_depth * 0.9, limb_color))
+    parts.append(("cuboid", -left_leg_x, lower_leg_y, 0, leg_width * 0.9, lower_leg_height, leg_depth * 0.9, limb_color))
     
     foot_width = 0.18
     foot_height = 0.12
     foot_depth = 0.28
     foot_y = -1.48
     foot_z = 0.08
-    draw_cuboid(left_leg_x, foot_y, foot_z, foot_width, foot_height, foot_depth, limb_color)
-    draw_cuboid(-left_leg_x, foot_y, foot_z, foot_width, foot_height, foot_depth, limb_color)
-    draw_cuboid(left_leg_x, foot_y + 0.03, foot_z + foot_depth/2, foot_width * 0.8, 0.05, 0.02, accent_color)
-    draw_cuboid(-left_leg_x, foot_y + 0.03, foot_z + foot_depth/2, foot_width * 0.8, 0.05, 0.02, accent_color)
-    
-    glPopMatrix()
-
-def check_wall_collision(x, z):
-    half_room = ROOM_SIZE / 2 - PLAYER_RADIUS
-    
-    if game.gate_open[game.current_room]:
-        gate_width = 3.0
-        if z > half_room and abs(x) < gate_width / 2:
-            return False
-    
-    return (abs(x) > half_room or abs(z) > half_room)
+    parts.append(("cuboid", left_leg_x, foot_y, foot_z, foot_width, foot_height, foot_depth, limb_color))
+    parts.append(("cuboid", -left_leg_x, foot_y, foot_z, foot_width, foot_height, foot_depth, limb_color))
+    parts.append(("cuboid", left_leg_x, foot_y + 0.03, foot_z + foot_depth/2, foot_width * 0.8, 0.05, 0.02, accent_color))
+    parts.append(("cuboid", -left_leg_x, foot_y + 0.03, foot_z + foot_depth/2, foot_width * 0.8, 0.05, 0.02, accent_color))
+    
+    return parts
+
+# Unit cube faces in the same winding draw_cuboid uses, split into triangles.
+CUBE_FACES = [
+    ((0, 0, 1), [(-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1)]),
+    ((0, 0, -1), [(-1, -1, -1), (-1, 1, -1), (1, 1, -1), (1, -1, -1)]),
+    ((-1, 0, 0), [(-1, -1, -1), (-1, -1, 1), (-1, 1, 1), (-1, 1, -1)]),
+    ((1, 0, 0), [(1, -1, -1), (1, 1, -1), (1, 1, 1), (1, -1, 1)]),
+    ((0, 1, 0), [(-1, 1, -1), (-1, 1, 1), (1, 1, 1), (1, 1, -1)]),
+    ((0, -1, 0), [(-1, -1, -1), (1, -1, -1), (1, -1, 1), (-1, -1, 1)]),
+]
+CUBE_POSITIONS = np.array([corners[i] for normal, corners in CUBE_FACES for i in (0, 1, 2, 0, 2, 3)],
+                          dtype=np.float32) * 0.5
+CUBE_NORMALS = np.array([normal for normal, corners in CUBE_FACES for i in range(6)], dtype=np.float32)
+
+def cuboid_triangles(x, y, z, width, height, depth):
+    positions = CUBE_POSITIONS * (width, height, depth) + (x, y + height/2, z)
+    return positions.astype(np.float32), CUBE_NORMALS
+
+def sphere_triangles(x, y, z, radius, detail=20):
+    vertices, indices = get_sphere_mesh(detail)
+    normals = vertices[indices]
+    return (normals * radius + (x, y, z)).astype(np.float32), normals
+
+# The character never changes shape, so every part is baked once into a
+# single interleaved color/normal/position buffer and drawn with one call.
+player_body_mesh = {"vbo": None, "count": 0}
+
+def bake_player_body():
+    chunks = []
+    for part in player_body_parts():
+        kind, args, color = part[0], part[1:-1], part[-1]
+        if kind == "sphere":
+            positions, normals = sphere_triangles(*args)
+        else:
+            positions, normals = cuboid_triangles(*args)
+        colors = np.broadcast_to(np.array(color, dtype=np.float32), positions.shape)
+        chunks.append(np.hstack([colors, normals, positions]))
+    return np.ascontiguousarray(np.vstack(chunks), dtype=np.float32)
 
-def can_move_to(new_x, new_z):
-    if check_wall_collision(new_x, new_z):
-        return False
+def draw_player_body(x, y, z, rotation_y):
+    glPushMatrix()
+    glTranslatef(x, y, z)
+    glRotatef(rotation_y, 0, 1, 0)
     
-    if game.current_room == 0:
-        for box in boxes:
-            if check_box_collision(new_x, new_z, box):
-                return False
+    glBindBuffer(GL_ARRAY_BUFFER, player_body_mesh["vbo"])
+    draw_interleaved(GL_TRIANGLES, 0, player_body_mesh["count"])
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
     
-    return True
-
-def interact():
-    if game.current_room == 1:
-        try_activate_switch()
-        return
-    
-    interact_room1()
+    glPopMatrix()
 
-def update_player_movement():
-    if game.camera_mode == "first_person":
-        if game.rotate_left:
-            game.player_rotation_y -= ROTATION_SPEED
-        if game.rotate_right:
-            game.player_rotation_y += ROTATION_SPEED
-    else:
-        if game.rotate_left:
-            game.player_rotation_y -= ROTATION_SPEED
-        if game.rotate_right:
-            game.player_rotation_y += ROTATION_SPEED
-    
-    if game.move_forward or game.move_backward or game.move_left or game.move_right:
-        angle = math.radians(game.player_rotation_y)
-        
-        dx = 0
-        dz = 0
-        
-        if game.camera_mode == "first_person":
-            if game.move_forward:
-                dx += math.cos(math.radians(game.player_rotation_y)) * MOVE_SPEED
-                dz += math.sin(math.radians(game.player_rotation_y)) * MOVE_SPEED
-            if game.move_backward:
-                dx -= math.cos(math.radians(game.player_rotation_y)) * MOVE_SPEED
-                dz -= math.sin(math.radians(game.player_rotation_y)) * MOVE_SPEED
-            if game.move_left:
-                dx += math.sin(math.radians(game.player_rotation_y)) * MOVE_SPEED
-                dz -= math.cos(math.radians(game.player_rotation_y)) * MOVE_SPEED
-            if game.move_right:
-                dx -= math.sin(math.radians(game.player_rotation_y)) * MOVE_SPEED
-                dz += math.cos(math.radians(game.player_rotation_y)) * MOVE_SPEED
-        else:
-            if game.move_forward:
-                dx -= math.sin(angle) * MOVE_SPEED
-                dz -= math.cos(angle) * MOVE_SPEED
-            if game.move_backward:
-                dx += math.sin(angle) * MOVE_SPEED
-                dz += math.cos(angle) * MOVE_SPEED
-            if game.move_left:
-                dx -= math.cos(angle) * MOVE_SPEED
-                dz += math.sin(angle) * MOVE_SPEED
-            if game.move_right:
-                dx += math.cos(angle) * MOVE_SPEED
-                dz -= math.sin(angle) * MOVE_SPEED
-        
-        new_x = game.player_x + dx
-        new_z = game.player_z + dz
-        
-        if can_move_to(new_x, new_z):
-            game.player_x = new_x
-            game.player_z = new_z
+# Meshes that don't depend on the game state are kept between launches in
+# mesh_cache.ppmc and only rebuilt when something they are made from changes.
+def cylinder_shapes():
+    return [(radius, height, slices) for radius, height in (SWITCH_BASE, BUZZER_BASE)
+            for limit, slices in LOD_CYLINDER_SLICES]
+
+def mesh_inputs():
+    return {
+        "room_size": ROOM_SIZE,
+        "wall_height": WALL_HEIGHT,
+        "gate": (GATE_WIDTH, GATE_HEIGHT),
+        "surface_colors": (COLOR_FLOOR, COLOR_CEILING, COLOR_WALL),
+        "sphere_detail_levels": SPHERE_DETAIL_LEVELS,
+        "cylinders": cylinder_shapes(),
+        "player_body": player_body_parts(),
+    }
+
+def build_meshes():
+    meshes = {}
+    for detail in SPHERE_DETAIL_LEVELS:
+        meshes[f"sphere{detail}.vertices"], meshes[f"sphere{detail}.indices"] = get_sphere_mesh(detail)
+    for number, shape in enumerate(cylinder_shapes()):
+        meshes[f"cylinder{number}.vertices"], meshes[f"cylinder{number}.normals"] = build_cylinder_mesh(*shape)
+    meshes["player_body"] = bake_player_body()
+    meshes["room_shell"] = room_shell_vertices()
+    return meshes
+
+def upload_static(mesh, vertices):
+    mesh["vbo"] = glGenBuffers(1)
+    mesh["count"] = len(vertices)
+    glBindBuffer(GL_ARRAY_BUFFER, mesh["vbo"])
+    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+def load_static_meshes():
+    # Spheres and cylinders are drawn from the mapped arrays as they are;
+    # the player body and room shell go into buffers once.
+    meshes, cached = load_meshes(mesh_inputs(), build_meshes)
+    for detail in SPHERE_DETAIL_LEVELS:
+        sphere_mesh_pool[detail] = meshes[f"sphere{detail}.vertices"], meshes[f"sphere{detail}.indices"]
+    for number, shape in enumerate(cylinder_shapes()):
+        cylinder_mesh_cache[shape] = meshes[f"cylinder{number}.vertices"], meshes[f"cylinder{number}.normals"]
+    upload_static(player_body_mesh, meshes["player_body"])
+    upload_static(room_shell_mesh, meshes["room_shell"])
+    return cached
+
+def interpolated_pose():
+    return (sim_clock.lerp(view.prev_player_x, view.player_x),
+            sim_clock.lerp(view.prev_player_z, view.player_z),
+            sim_clock.lerp(view.prev_player_rotation_y, view.player_rotation_y))
 
 def setup_camera():
     glLoadIdentity()
+    player_x, player_z, rotation_y = interpolated_pose()
     
-    if game.camera_mode == "first_person":
-        eye_x = game.player_x
-        eye_y = game.player_y
-        eye_z = game.player_z
+    if view.camera_mode == "first_person":
+        eye_x = player_x
+        eye_y = view.player_y
+        eye_z = player_z
         
-        center_x = game.player_x + 100 * math.cos(math.radians(game.player_rotation_y))
-        center_y = game.player_y
-        center_z = game.player_z + 100 * math.sin(math.radians(game.player_rotation_y))
+        center_x = player_x + 100 * math.cos(math.radians(rotation_y))
+        center_y = view.player_y
+        center_z = player_z + 100 * math.sin(math.radians(rotation_y))
         
         gluLookAt(eye_x, eye_y, eye_z,
                   center_x, center_y, center_z,
                   0, 1, 0)
+        update_view((eye_x, eye_y, eye_z), (center_x, center_y, center_z))
     
     else:
-        angle = math.radians(game.player_rotation_y)
-        cam_x = game.player_x + math.sin(angle) * game.camera_distance
-        cam_z = game.player_z + math.cos(angle) * game.camera_distance
-        cam_y = game.player_y + 3.0
+        angle = math.radians(rotation_y)
+        cam_x = player_x + math.sin(angle) * view.camera_distance
+        cam_z = player_z + math.cos(angle) * view.camera_distance
+        cam_y = view.player_y + 3.0
         
         gluLookAt(cam_x, cam_y, cam_z,
-                  game.player_x, game.player_y, game.player_z,
+                  player_x, view.player_y, player_z,
                   0, 1, 0)
+        update_view((cam_x, cam_y, cam_z), (player_x, view.player_y, player_z))
+
+# Props are tested against the camera frustum before drawing, and spheres
+# and cylinders far from the camera use coarser meshes. Bounds are
+# (height of the bounding-sphere centre above the prop position, radius).
+# The draw-call counts are what a culled prop would have issued; boxes, locks
+# and other cuboids are batched and cost none of their own.
+PROP_BOUNDS = np.array([(0.15, 0.5), (0.4, 0.9), (0.0, 0.3), (0.0, 0.3)])
+PROP_SPHERE_RADII = np.array([size[0] for size in KIND_SIZES])
+PROP_DRAW_CALLS = np.array([1, 0, 1, 1])
+SWITCH_BOUNDS = (0.25, 0.35)
+BUZZER_BOUNDS = (0.4, 0.45)
+SWITCH_DRAW_CALLS = 4
+ROOM1_DRAW_ORDER = ((KIND_FRUIT, draw_fruit), (KIND_KEY, draw_key), (KIND_CLUE, draw_clue))
+
+# Detail is chosen from apparent size (radius / distance).
+LOD_SPHERE_DETAIL = ((0.04, 20), (0.015, 12), (0.0, 8))
+LOD_CYLINDER_SLICES = ((0.02, 16), (0.0, 8))
+
+view_frustum = None
+camera_eye = np.zeros(3)
+
+def update_view(eye, center):
+    global view_frustum, camera_eye
+    view_frustum = Frustum.from_camera(FOV_Y, WINDOW_WIDTH / WINDOW_HEIGHT, NEAR_PLANE, FAR_PLANE,
+                                       eye, center)
+    camera_eye = np.array(eye, dtype=np.float64)
+
+def pick_level(levels, apparent_size):
+    for threshold, level in levels:
+        if apparent_size >= threshold:
+            return level
+    return levels[-1][1]
+
+def prop_in_view(x, y, z, radius, draw_calls):
+    if view_frustum is None or view_frustum.sphere_visible(x, y, z, radius):
+        return True
+    render_stats["props_culled"] += 1
+    render_stats["draw_calls_saved"] += draw_calls
+    return False
 
-def draw_text(x, y, text):
+def prop_detail(x, y, z, radius):
+    distance = math.dist((x, y, z), camera_eye)
+    apparent = radius / max(distance, NEAR_PLANE)
+    return pick_level(LOD_CYLINDER_SLICES, apparent), pick_level(LOD_SPHERE_DETAIL, apparent)
+
+def draw_room1_props(store):
+    # store is the snapshot's frozen copy, never the live room_entities.
+    count = store.count
+    kinds = store.kinds[:count]
+    drawn = (store.flags[:count] & FLAG_COLLECTED) == 0
+    drawn |= (kinds == KIND_BOX) | (kinds == KIND_CLUE)
+    
+    bounds = PROP_BOUNDS[kinds]
+    centers = store.positions[:count].astype(np.float64)
+    centers[:, 1] += bounds[:, 0]
+    if view_frustum is not None:
+        culled = drawn & ~view_frustum.spheres_visible(centers, bounds[:, 1])
+        render_stats["props_culled"] += int(culled.sum())
+        render_stats["draw_calls_saved"] += int(PROP_DRAW_CALLS[kinds[culled]].sum())
+        drawn &= ~culled
+    
+    apparent = PROP_SPHERE_RADII[kinds] / np.maximum(np.linalg.norm(centers - camera_eye, axis=1), NEAR_PLANE)
+    details = np.select([apparent >= threshold for threshold, _ in LOD_SPHERE_DETAIL],
+                        [level for _, level in LOD_SPHERE_DETAIL], LOD_SPHERE_DETAIL[-1][1])
+    
+    draw_boxes(store, np.flatnonzero(drawn & (kinds == KIND_BOX)))
+    for kind, draw in ROOM1_DRAW_ORDER:
+        view_class = ENTITY_VIEWS[kind]
+        for index in np.flatnonzero(drawn & (kinds == kind)).tolist():
+            draw(view_class.at(store, index), int(details[index]))
+
+# HUD text is drawn in one orthographic pass per frame (begin_hud/end_hud).
+# Each distinct string is compiled once into a display list of its glyphs,
+# and HUD lines are only re-formatted when the values they show change.
+HUD_FONT = None  # GLUT_BITMAP_HELVETICA_18, set by import_gl()
+MAX_TEXT_LISTS = 256
+text_lists = OrderedDict()
+
+hud_text = lru_cache(maxsize=256)(str.format)
+
+@lru_cache(maxsize=64)
+def sequence_text(label, colors, empty):
+    return f"{label}: {' -> '.join(colors) if colors else empty}"
+
+def text_list(text):
+    list_id = text_lists.get(text)
+    if list_id is not None:
+        text_lists.move_to_end(text)
+        return list_id
+    
+    if len(text_lists) >= MAX_TEXT_LISTS:
+        _, stale = text_lists.popitem(last=False)
+        glDeleteLists(stale, 1)
+    list_id = glGenLists(1)
+    glNewList(list_id, GL_COMPILE)
+    for char in text:
+        glutBitmapCharacter(HUD_FONT, ord(char))
+    glEndList()
+    text_lists[text] = list_id
+    return list_id
+
+def begin_hud():
     glMatrixMode(GL_PROJECTION)
     glPushMatrix()
     glLoadIdentity()
@@ -875,44 +850,47 @@ def draw_text(x, y, text):
     glMatrixMode(GL_MODELVIEW)
     glPushMatrix()
     glLoadIdentity()
-    
-    glColor3f(1, 1, 1)
-    glRasterPos2f(x, y)
-    for char in text:
-        glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18, ord(char))
-    
+
+def end_hud():
     glPopMatrix()
     glMatrixMode(GL_PROJECTION)
     glPopMatrix()
     glMatrixMode(GL_MODELVIEW)
 
+def draw_text(x, y, text, cached=True):
+    # Only valid between begin_hud() and end_hud(). Text that changes every
+    # frame should pass cached=False rather than churn the list cache.
+    glColor3f(1, 1, 1)
+    glRasterPos2f(x, y)
+    if cached:
+        glCallList(text_list(text))
+    else:
+        for char in text:
+            glutBitmapCharacter(HUD_FONT, ord(char))
+
 def draw_hud():
-    elapsed = time.time() - game.start_time
-    game.time_remaining = max(0, TIME_LIMIT - int(elapsed))
-    
-    minutes = game.time_remaining // 60
-    seconds = game.time_remaining % 60
-    time_text = f"Time: {minutes:02d}:{seconds:02d}"
-    draw_text(20, WINDOW_HEIGHT - 30, time_text)
+    draw_text(20, WINDOW_HEIGHT - 30, hud_text("Time: {:02d}:{:02d}", *divmod(view.time_remaining, 60)))
     
-    if game.current_room == 0:
+    if view.current_room == 0:
         draw_room1_hud()
     else:
         draw_room2_hud()
     
-    if game.game_completed:
+    if view.game_completed:
         glColor3f(0.0, 1.0, 0.0)
-        draw_text(WINDOW_WIDTH // 2 - 150, WINDOW_HEIGHT // 2 + 30, f"Your Score: {game.final_score} seconds")
+        draw_text(WINDOW_WIDTH // 2 - 150, WINDOW_HEIGHT // 2 + 30, hud_text("Your Score: {} seconds", view.final_score))
         draw_text(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 - 30, "Press ESC to Exit")
     
     draw_text(20, 60, "WASD: Move | Q/E: Rotate | F: Interact | C: Change Camera | ESC: Quit")
 
 def init_opengl():
+    import_gl()
     glClearColor(0.1, 0.1, 0.15, 1.0)
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
     glEnable(GL_COLOR_MATERIAL)
+    glEnable(GL_RESCALE_NORMAL)
     glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
     
     glLightfv(GL_LIGHT0, GL_POSITION, [0, WALL_HEIGHT - 1, 0, 1])
@@ -921,131 +899,279 @@ def init_opengl():
     
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
-    gluPerspective(75, WINDOW_WIDTH / WINDOW_HEIGHT, 0.1, 100.0)
+    gluPerspective(FOV_Y, WINDOW_WIDTH / WINDOW_HEIGHT, NEAR_PLANE, FAR_PLANE)
     glMatrixMode(GL_MODELVIEW)
+    
+    load_static_meshes()
+
+# Every frame is timed per phase. P toggles the percentile overlay, O writes
+# the recorded frames to PROFILE_CSV, and --profile-csv PATH writes them on exit.
+# Simulation ticks run on their own thread and are timed there (the
+# "simulation" phase); they go to the overlay and to a second CSV beside
+# the frame one, named like frame_profile_simulation.csv.
+FRAME_PHASES = ("snapshot", "setup_camera", "room_shell", "room1_objects", "room2_objects",
+                "player_body", "hud", "swap")
+PROFILE_CSV = "frame_profile.csv"
+profiler = FrameProfiler(FRAME_PHASES, counters=("sphere_tessellations", "props_culled", "draw_calls_saved"))
+show_profile = False
+profile_csv_path = None
+# --gl-accounting counts every GL call per frame by calling function and
+# prints the per-frame means on exit.
+gl_accounting = None
+
+def draw_profile_overlay():
+    lines = profiler.summary_lines()
+    if simulation is not None:
+        lines += simulation.profiler.summary_lines()[1:]
+    lines.append(f"culled: {render_stats['props_culled']}  draw calls saved: {render_stats['draw_calls_saved']}  "
+                 f"tessellations: {render_stats['sphere_tessellations']}")
+    for row, line in enumerate(lines):
+        draw_text(WINDOW_WIDTH - 520, WINDOW_HEIGHT - 30 - 22 * row, line, cached=False)
+
+def write_profile(path):
+    frames = profiler.write_csv(path)
+    print(f"Frame profile saved to {path} ({frames} frames)")
+    if simulation is not None:
+        root, extension = os.path.splitext(path)
+        tick_path = f"{root}_simulation{extension or '.csv'}"
+        ticks = simulation.profiler.write_csv(tick_path)
+        print(f"Simulation profile saved to {tick_path} ({ticks} ticks)")
+
+# The game state being drawn this frame (a GameSnapshot).
+view = None
+
+def current_view():
+    # The latest snapshot from the simulation thread, or one taken now when
+    # the game is driven directly (offscreen tools and benchmarks).
+    if simulation is None:
+        return GameSnapshot(view)
+    snapshot = simulation.settled()
+    sim_clock.alpha = simulation.alpha(snapshot, time.perf_counter())
+    return snapshot
 
 def display():
+    global view
+    profiler.mark()
+    view = current_view()
+    profiler.lap("snapshot")
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    render_stats["sphere_tessellations"] = 0
+    render_stats["props_culled"] = 0
+    render_stats["draw_calls_saved"] = 0
     
     glEnable(GL_LIGHTING)
     glMatrixMode(GL_MODELVIEW)
     setup_camera()
+    profiler.lap("setup_camera")
     
-    draw_floor()
-    draw_ceiling()
-    draw_walls()
+    draw_room_shell()
+    profiler.lap("room_shell")
     
-    if game.current_room == 0:
-        for box in boxes:
-            draw_box(box)
-        
-        for fruit in fruits:
-            draw_fruit(fruit)
-        
-        for key in keys:
-            draw_key(key)
-        
-        for clue in clues:
-            draw_clue(clue)
+    if view.current_room == 0:
+        draw_room1_props(view.store)
+        flush_cuboids()
+        profiler.lap("room1_objects")
     else:
-        room_base_y = room_offset_y(game.current_room)
+        room_base_y = room_offset_y(view.current_room)
         draw_color_switches(room_base_y)
         draw_central_buzzer(room_base_y)
+        flush_cuboids()
+        profiler.lap("room2_objects")
     
-    if game.camera_mode == "third_person":
-        draw_player_body(game.player_x, game.player_y, game.player_z, game.player_rotation_y)
+    if view.camera_mode == "third_person":
+        player_x, player_z, rotation_y = interpolated_pose()
+        draw_player_body(player_x, view.player_y, player_z, rotation_y)
+    profiler.lap("player_body")
     
     glDisable(GL_LIGHTING)
+    begin_hud()
     draw_hud()
+    if show_profile:
+        draw_profile_overlay()
+    end_hud()
+    profiler.lap("hud")
     
     glutSwapBuffers()
+    profiler.lap("swap")
+    for counter in profiler.counters:
+        profiler.count(counter, render_stats[counter])
+    profiler.end_frame()
+    if gl_accounting is not None:
+        gl_accounting.end_frame()
+    if startup_steps is not None:
+        startup_step_done("first_frame", profiler.samples[0].sum() / 1000.0)
+        report_startup()
+
+# --startup-profile breaks the time from launch to the first frame down by
+# step and prints it once that frame is drawn.
+startup_steps = None  # [(step, seconds)] while profiling
+
+def startup_step_done(name, seconds):
+    startup_steps.append((name, seconds))
+
+def startup_step(name, function, *args):
+    if startup_steps is None:
+        return function(*args)
+    started = time.perf_counter()
+    result = function(*args)
+    startup_step_done(name, time.perf_counter() - started)
+    return result
+
+def profile_game_setup():
+    # new_game() finds these in game_logic's globals, so wrapping them there
+    # times them wherever a game is set up.
+    for name in ("initialize_room1_objects", "randomize_color_sequence", "rebuild_room2_colliders"):
+        function = getattr(logic, name)
+        setattr(logic, name, lambda *args, name=name, function=function: startup_step(name, function, *args))
+
+def report_startup():
+    global startup_steps
+    total = time.perf_counter() - LAUNCHED
+    steps, startup_steps = startup_steps, None
+    print(f"Startup: {total * 1000:.1f} ms from launch to the first frame")
+    for name, seconds in steps + [("other", total - sum(seconds for name, seconds in steps))]:
+        print(f"  {name:26} {seconds * 1000:8.1f} ms")
+
+# Set from the command line: --record writes every tick's input to a log,
+# --replay drives the game from one instead of the keyboard.
+recorder = None
+record_path = None
+replayer = None
+simulation = None
+event_log_file = None  # --event-log PATH, closed once the writer has stopped
+
+def simulation_tick():
+    if replayer is not None:
+        if not replayer.done:
+            replayer.step()
+        return
+    if recorder is not None:
+        recorder.sample(game)
+    simulation_step()
+
+def save_recording():
+    if recorder is not None:
+        recorder.save(record_path, game)
+        print(f"Input log saved to {record_path} ({recorder.ticks} ticks)")
+
+# end_session() saves before leaving the main loop, and freeglut then runs
+# the close callback as the window goes; only the first call saves.
+session_saved = False
+
+def save_session():
+    global session_saved
+    if session_saved:
+        return
+    session_saved = True
+    if simulation is not None:
+        simulation.stop()
+    logic.events.stop()
+    if event_log_file is not None:
+        event_log_file.close()
+    save_recording()
+    if profile_csv_path:
+        write_profile(profile_csv_path)
+    if gl_accounting is not None:
+        print(f"GL calls per frame over {gl_accounting.frames} frames:")
+        print("\n".join(gl_accounting.table()))
+
+def end_session():
+    save_session()
+    glutLeaveMainLoop()
 
 def update(value):
-    update_player_movement()
-    
-    if game.current_room == 0 and game.gate_open[0]:
-        if game.player_z > ROOM_SIZE/2 + 0.5:
-            game.current_room = 1
-            game.player_z = -ROOM_SIZE/2 + 2.0
-            game.player_x = 0.0
-            print("\n" + "="*60)
-            print(" "*15 + "ENTERING ROOM 2")
-            print("="*60)
-            print("\nROOM 2: Color Sequence Puzzle")
-            print("-" * 60)
-            print(f"Sequence to follow: {COLOR_SEQUENCE}")
-            print("  - Activate the colored switches in the correct order")
-            print("  - Press F near each switch to activate it")
-            print("  - After completing the sequence, activate the central buzzer")
-            print("="*60 + "\n")
-    
-    if game.gate_open[game.current_room] and game.gate_opening_progress[game.current_room] < 1.0:
-        game.gate_opening_progress[game.current_room] += 0.02
-    
-    if game.time_remaining <= 0 and not all(game.gate_open):
-        print("\nTIME'S UP! Game Over.")
-        glutLeaveMainLoop()
-    
-    if game.gate_open[1] and not game.game_completed:
-        game.game_completed = True
-        game.final_score = game.time_remaining
-        print("\n" + "="*60)
-        print(" "*15 + "CONGRATULATIONS!")
-        print("="*60)
-        print("\nYou have escaped the Puzzle Prison!")
-        print("Both rooms completed successfully!")
-        print(f"Your Score: {game.final_score} seconds remaining!")
-        print("="*60 + "\n")
+    # The simulation runs on its own thread; this only paces redraws.
+    if simulation.latest().game_over:
+        end_session()
+        return
     
     glutPostRedisplay()
     glutTimerFunc(16, update, 0)
 
+# Input is applied on the simulation thread between ticks.
+def set_key(name, pressed):
+    setattr(game, name, pressed)
+
+def interact_command():
+    if recorder is not None:
+        recorder.event(replay.EVENT_INTERACT)
+    interact()
+
+def camera_command():
+    if recorder is not None:
+        recorder.event(replay.EVENT_CAMERA)
+    replay.toggle_camera(game)
+    say(f"Camera mode: {game.camera_mode}")
+    event("camera_changed", mode=game.camera_mode)
+
+MOVEMENT_KEYS = {'w': "move_forward", 's': "move_backward", 'a': "move_left", 'd': "move_right",
+                 'q': "rotate_left", 'e': "rotate_right"}
+
 def keyboard(key, x, y):
+    global show_profile
     key = key.decode('utf-8').lower()
     
+    if key == 'p':
+        show_profile = not show_profile
+        return
+    if key == 'o':
+        write_profile(PROFILE_CSV)
+        return
+    if replayer is not None and key != '\x1b':
+        return
+    
     if key == '\x1b':
-        glutLeaveMainLoop()
-    elif key == 'w':
-        game.move_forward = True
-    elif key == 's':
-        game.move_backward = True
-    elif key == 'a':
-        game.move_left = True
-    elif key == 'd':
-        game.move_right = True
-    elif key == 'q':
-        game.rotate_left = True
-    elif key == 'e':
-        game.rotate_right = True
+        end_session()
+    elif key in MOVEMENT_KEYS:
+        simulation.submit(set_key, MOVEMENT_KEYS[key], True)
     elif key == 'f':
-        interact()
+        simulation.submit(interact_command)
     elif key == 'c':
-        if game.camera_mode == "first_person":
-            game.camera_mode = "third_person"
-        else:
-            game.camera_mode = "first_person"
-        print(f"Camera mode: {game.camera_mode}")
+        simulation.submit(camera_command)
 
 def keyboard_up(key, x, y):
     key = key.decode('utf-8').lower()
     
-    if key == 'w':
-        game.move_forward = False
-    elif key == 's':
-        game.move_backward = False
-    elif key == 'a':
-        game.move_left = False
-    elif key == 'd':
-        game.move_right = False
-    elif key == 'q':
-        game.rotate_left = False
-    elif key == 'e':
-        game.rotate_right = False
+    if replayer is not None:
+        return
+    
+    if key in MOVEMENT_KEYS:
+        simulation.submit(set_key, MOVEMENT_KEYS[key], False)
 
 def mouse_motion(x, y):
     pass
 
 def main():
+    global recorder, record_path, replayer, simulation, profile_csv_path, gl_accounting, startup_steps, event_log_file
+    imported = time.perf_counter() - LAUNCHED
+    parser = argparse.ArgumentParser(description="Puzzle Prison - Two Room Escape")
+    parser.add_argument("--record", metavar="PATH", help="write an input log of this session")
+    parser.add_argument("--replay", metavar="PATH", help="play back an input log instead of the keyboard")
+    parser.add_argument("--profile-csv", metavar="PATH", help="write per-phase frame timings on exit")
+    parser.add_argument("--level", metavar="PATH", help="level file (.json or compiled .pplc)")
+    parser.add_argument("--gl-accounting", action="store_true", help="count GL calls per frame and print them on exit")
+    parser.add_argument("--startup-profile", action="store_true", help="print where startup time went at the first frame")
+    parser.add_argument("--event-log", metavar="PATH", help="also write game events as JSON lines (- for stdout only)")
+    args, _ = parser.parse_known_args()
+    profile_csv_path = args.profile_csv
+    # Console text and the event log are written by a background thread.
+    sinks = [(sys.stdout, console_line)]
+    if args.event_log == "-":
+        sinks = [(sys.stdout, json_line)]
+    elif args.event_log:
+        event_log_file = open(args.event_log, "w")
+        sinks.append((event_log_file, json_line))
+    logic.events.start(sinks)
+    if args.startup_profile:
+        startup_steps = [("imports", imported)]
+        profile_game_setup()
+    startup_step("import_gl", import_gl)
+    if args.gl_accounting:
+        from gl_accounting import GLAccounting
+        gl_accounting = GLAccounting(sys.modules[__name__]).install()
+    if args.level:
+        startup_step("load_level", lambda: logic.use_level(load_level(args.level)))
+    
     print("\n" + "="*60)
     print(" "*15 + "WELCOME TO THE PUZZLE PRISON")
     print("="*60)
@@ -1065,19 +1191,27 @@ def main():
     print("  Q/E - Rotate camera left/right")
     print("  F - Interact with objects")
     print("  C - Switch camera mode")
+    print("  P - Show frame profile, O - Save it to CSV")
     print("  ESC - Quit game")
     print("="*60 + "\n")
     
-    glutInit()
+    startup_step("glutInit", glutInit)
     glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
     glutInitWindowSize(WINDOW_WIDTH, WINDOW_HEIGHT)
-    glutCreateWindow(b"Puzzle Prison - Two Room Escape")
+    startup_step("create_window", glutCreateWindow, b"Puzzle Prison - Two Room Escape")
     
-    init_opengl()
+    startup_step("init_opengl", init_opengl)
     
-    initialize_room1_objects()
-    randomize_color_sequence()
-    rebuild_room2_colliders()
+    if args.replay:
+        replayer = replay.Replayer(replay.InputLog.load(args.replay))
+        replayer.start()
+    else:
+        seed = random.randrange(2 ** 32)
+        new_game(seed)
+        if args.record:
+            recorder = replay.InputRecorder(seed)
+            record_path = args.record
+    simulation = SimulationThread(simulation_tick).start()
     
     glutDisplayFunc(display)
     glutKeyboardFunc(keyboard)
@@ -1085,6 +1219,7 @@ def main():
     glutPassiveMotionFunc(mouse_motion)
     glutMotionFunc(mouse_motion)
     glutTimerFunc(0, update, 0)
+    glutCloseFunc(save_session)
     
     print("Game started! Good luck!\n")
     glutMainLoop()
@@ -0,0 +1,323 @@
+import argparse
+import time
+
+import numpy as np
+
+import game_logic as logic
+from collision import CollisionWorld, move_circles
+from entity_store import FLAG_LOCKED, KIND_BOX, KIND_CLUE, KIND_FRUIT, KIND_KEY
+
+# N independent copies of the game held as NumPy arrays and advanced together.
+# Each step applies the same rules as interact() followed by simulation_step()
+# in game_logic, one vectorized operation per rule instead of one Python call
+# per environment.
+
+ACTION_FORWARD = 1
+ACTION_BACKWARD = 2
+ACTION_LEFT = 4
+ACTION_RIGHT = 8
+ACTION_ROTATE_LEFT = 16
+ACTION_ROTATE_RIGHT = 32
+ACTION_INTERACT = 64
+ACTION_CAMERA = 128
+
+class BatchLayout:
+    # Room layout shared by every environment, flattened into arrays.
+    def __init__(self, store, switches, colors, required_fruits, room2_colliders=(), sequence_length=None):
+        count = store.count
+        kinds = store.kinds[:count]
+        positions = store.positions[:count].astype(np.float64)
+
+        self.fruit_names = list(store.fruit_names)
+        for name in required_fruits:
+            if name not in self.fruit_names:
+                self.fruit_names.append(name)
+        fruit_bits = np.array([1 << i for i in range(len(self.fruit_names))] + [0], dtype=np.int64)
+        self.required_mask = int(sum(1 << self.fruit_names.index(name) for name in required_fruits))
+
+        box_rows = np.flatnonzero(kinds == KIND_BOX)
+        key_rows = np.flatnonzero(kinds == KIND_KEY)
+        fruit_rows = np.flatnonzero(kinds == KIND_FRUIT)
+        clue_rows = np.flatnonzero(kinds == KIND_CLUE)
+
+        box_size = store.kind_sizes[KIND_BOX]
+        self.box_x = positions[box_rows, 0]
+        self.box_z = positions[box_rows, 2]
+        self.box_locked = (store.flags[box_rows] & FLAG_LOCKED) != 0
+        self.box_fruit_bits = fruit_bits[store.fruit_ids[box_rows]]
+        self.fruit_bits = fruit_bits[store.fruit_ids[fruit_rows]]
+        self.key_count = len(key_rows)
+        self.fruit_count = len(fruit_rows)
+
+        # Interactables in get_nearby_object() priority order.
+        rows = np.concatenate([clue_rows, box_rows, key_rows, fruit_rows])
+        self.inter_x = positions[rows, 0]
+        self.inter_z = positions[rows, 2]
+        self.inter_kind = kinds[rows].astype(np.int8)
+        self.inter_slot = np.concatenate([np.arange(len(clue_rows)), np.arange(len(box_rows)),
+                                          np.arange(len(key_rows)), np.arange(len(fruit_rows))])
+
+        self.switch_x = np.array([switch["pos"][0] / 100.0 for switch in switches])
+        self.switch_z = np.array([switch["pos"][1] / 100.0 for switch in switches])
+        self.switch_color = np.array([colors.index(switch["color"]) for switch in switches])
+        self.color_count = len(colors)
+        self.sequence_length = sequence_length or len(colors)
+
+        # Colliders per room in CollisionWorld candidate order (walls and
+        # gate, switches and buzzer, then boxes), padded with disabled rows.
+        rooms = []
+        for room in (0, 1):
+            world = CollisionWorld()
+            self.gate = world.add_room_walls(logic.ROOM_SIZE, logic.GATE_WIDTH)
+            colliders = list(world.boxes)
+            if room == 1:
+                colliders += [(x / 100.0, z / 100.0, w / 100.0, d / 100.0) for x, z, w, d in room2_colliders]
+            else:
+                colliders += [(x, z, box_size[0] / 2, box_size[2] / 2) for x, z in zip(self.box_x, self.box_z)]
+            rooms.append(colliders)
+        width = max(len(colliders) for colliders in rooms)
+        table = np.zeros((2, width, 4))
+        self.collider_enabled = np.zeros((2, width), dtype=bool)
+        for room, colliders in enumerate(rooms):
+            table[room, :len(colliders)] = colliders
+            self.collider_enabled[room, :len(colliders)] = True
+        self.collider_x, self.collider_z, self.collider_hx, self.collider_hz = table.transpose(2, 0, 1)
+
+    @classmethod
+    def from_game_logic(cls):
+        logic.initialize_room1_objects()
+        if not logic.ROOM2_COLLIDERS:
+            logic.rebuild_room2_colliders()
+        return cls(logic.room_entities, logic.color_switches, logic.AVAILABLE_COLORS,
+                   logic.GameState().required_fruits, logic.ROOM2_COLLIDERS,
+                   logic.current_level.sequence_length)
+
+class BatchEnv:
+    def __init__(self, count, layout=None, seed=None, third_person=False):
+        self.count = count
+        self.layout = layout or BatchLayout.from_game_logic()
+        self.rng = np.random.default_rng(seed)
+        layout = self.layout
+
+        self.player_x = np.zeros(count)
+        self.player_z = np.zeros(count)
+        self.rotation_y = np.zeros(count)
+        self.third_person = np.full(count, third_person, dtype=bool)
+        self.room = np.zeros(count, dtype=np.int8)
+        self.keys_found = np.zeros(count, dtype=np.int32)
+        self.fruit_mask = np.zeros(count, dtype=np.int64)
+        self.box_locked = np.zeros((count, len(layout.box_x)), dtype=bool)
+        self.box_opened = np.zeros((count, len(layout.box_x)), dtype=bool)
+        self.key_collected = np.zeros((count, layout.key_count), dtype=bool)
+        self.fruit_collected = np.zeros((count, layout.fruit_count), dtype=bool)
+        self.gate_open = np.zeros((count, 2), dtype=bool)
+        self.gate_progress = np.zeros((count, 2))
+        self.color_sequence = np.zeros((count, layout.color_count), dtype=np.int8)
+        self.sequence_progress = np.zeros(count, dtype=np.int8)
+        self.sequence_correct = np.zeros(count, dtype=bool)
+        self.last_switch_time = np.zeros(count)
+        self.sim_time = np.zeros(count)
+        self.time_remaining = np.zeros(count, dtype=np.int32)
+        self.game_completed = np.zeros(count, dtype=bool)
+        self.game_over = np.zeros(count, dtype=bool)
+        self.final_score = np.zeros(count, dtype=np.int32)
+        self.reset()
+
+    @property
+    def done(self):
+        return self.game_completed | self.game_over
+
+    def reset(self, envs=None):
+        envs = np.arange(self.count) if envs is None else np.asarray(envs)
+        self.player_x[envs] = 0.0
+        self.player_z[envs] = 5.0
+        self.rotation_y[envs] = 0.0
+        self.room[envs] = 0
+        self.keys_found[envs] = 0
+        self.fruit_mask[envs] = 0
+        self.box_locked[envs] = self.layout.box_locked
+        self.box_opened[envs] = False
+        self.key_collected[envs] = False
+        self.fruit_collected[envs] = False
+        self.gate_open[envs] = False
+        self.gate_progress[envs] = 0.0
+        self.color_sequence[envs] = self.rng.random((len(envs), self.layout.color_count)).argsort(axis=1)
+        self.sequence_progress[envs] = 0
+        self.sequence_correct[envs] = False
+        self.last_switch_time[envs] = -logic.SWITCH_COOLDOWN
+        self.sim_time[envs] = 0.0
+        self.time_remaining[envs] = logic.TIME_LIMIT
+        self.game_completed[envs] = False
+        self.game_over[envs] = False
+        self.final_score[envs] = 0
+
+    def reset_done(self):
+        envs = np.flatnonzero(self.done)
+        if len(envs):
+            self.reset(envs)
+        return len(envs)
+
+    def step(self, actions):
+        actions = np.broadcast_to(np.asarray(actions, dtype=np.uint8), (self.count,))
+        self.third_person ^= (actions & ACTION_CAMERA) != 0
+        interacting = np.flatnonzero(actions & ACTION_INTERACT)
+        if len(interacting):
+            in_room2 = self.room[interacting] == 1
+            self.interact_room1(interacting[~in_room2])
+            self.interact_room2(interacting[in_room2])
+
+        self.update_player_movement(actions)
+        self.advance()
+
+    def interact_room1(self, envs):
+        if not len(envs):
+            return
+        layout = self.layout
+        distance = np.sqrt((self.player_x[envs, None] - layout.inter_x) ** 2 +
+                           (self.player_z[envs, None] - layout.inter_z) ** 2)
+        hit = distance < 2.0
+
+        key_columns = layout.inter_kind == KIND_KEY
+        fruit_columns = layout.inter_kind == KIND_FRUIT
+        hit[:, key_columns] &= ~self.key_collected[envs]
+        hit[:, fruit_columns] &= ~self.fruit_collected[envs]
+
+        has_target = hit.any(axis=1)
+        envs = envs[has_target]
+        target = hit[has_target].argmax(axis=1)
+        kind = layout.inter_kind[target]
+        slot = layout.inter_slot[target]
+
+        picked = kind == KIND_KEY
+        self.key_collected[envs[picked], slot[picked]] = True
+        self.keys_found[envs[picked]] += 1
+
+        picked = kind == KIND_FRUIT
+        self.fruit_collected[envs[picked], slot[picked]] = True
+        self.fruit_mask[envs[picked]] |= layout.fruit_bits[slot[picked]]
+
+        picked = kind == KIND_BOX
+        box_envs, box = envs[picked], slot[picked]
+        locked = self.box_locked[box_envs, box]
+        unlock = locked & (self.keys_found[box_envs] > 0)
+        open_plain = ~locked & ~self.box_opened[box_envs, box]
+        self.box_locked[box_envs[unlock], box[unlock]] = False
+        self.keys_found[box_envs[unlock]] -= 1
+        opened = unlock | open_plain
+        self.box_opened[box_envs[opened], box[opened]] = True
+        self.fruit_mask[box_envs[opened]] |= layout.box_fruit_bits[box[opened]]
+
+        required = layout.required_mask
+        self.gate_open[:, 0] |= (self.fruit_mask & required) == required
+
+    def interact_room2(self, envs):
+        envs = envs[self.sim_time[envs] - self.last_switch_time[envs] >= logic.SWITCH_COOLDOWN]
+        if not len(envs):
+            return
+        layout = self.layout
+
+        buzzer_distance = np.sqrt(self.player_x[envs] ** 2 + self.player_z[envs] ** 2)
+        buzzed = self.sequence_correct[envs] & ~self.gate_open[envs, 1] & (buzzer_distance < 1.0)
+        self.gate_open[envs[buzzed], 1] = True
+        envs = envs[~buzzed]
+
+        distance = np.sqrt((self.player_x[envs, None] - layout.switch_x) ** 2 +
+                           (self.player_z[envs, None] - layout.switch_z) ** 2)
+        distance[distance >= 1.0] = np.inf
+        nearest = distance.argmin(axis=1)
+        has_switch = np.isfinite(distance[np.arange(len(envs)), nearest])
+        envs, switch = envs[has_switch], nearest[has_switch]
+        self.last_switch_time[envs] = self.sim_time[envs]
+
+        progress = self.sequence_progress[envs]
+        length = layout.sequence_length
+        expected = self.color_sequence[envs, np.minimum(progress, length - 1)]
+        valid = (progress < length) & (layout.switch_color[switch] == expected)
+
+        good = envs[valid]
+        self.sequence_progress[good] += 1
+        self.sequence_correct[good] = self.sequence_progress[good] == length
+        bad = envs[~valid]
+        self.sequence_progress[bad] = 0
+        self.sequence_correct[bad] = False
+
+    def update_player_movement(self, actions):
+        forward = (actions & ACTION_FORWARD) != 0
+        backward = (actions & ACTION_BACKWARD) != 0
+        left = (actions & ACTION_LEFT) != 0
+        right = (actions & ACTION_RIGHT) != 0
+        rotate_left = (actions & ACTION_ROTATE_LEFT) != 0
+        rotate_right = (actions & ACTION_ROTATE_RIGHT) != 0
+
+        self.rotation_y -= rotate_left * logic.ROTATION_SPEED
+        self.rotation_y += rotate_right * logic.ROTATION_SPEED
+
+        moving = forward | backward | left | right
+        angle = np.radians(self.rotation_y)
+        cos_step = np.cos(angle) * logic.MOVE_SPEED
+        sin_step = np.sin(angle) * logic.MOVE_SPEED
+
+        first_dx = forward * cos_step - backward * cos_step + left * sin_step - right * sin_step
+        first_dz = forward * sin_step - backward * sin_step - left * cos_step + right * cos_step
+        third_dx = -(forward * sin_step) + backward * sin_step - left * cos_step + right * cos_step
+        third_dz = -(forward * cos_step) + backward * cos_step + left * sin_step - right * sin_step
+        dx = np.where(self.third_person, third_dx, first_dx)
+        dz = np.where(self.third_person, third_dz, first_dz)
+
+        envs = np.flatnonzero(moving)
+        if not len(envs):
+            return
+        layout = self.layout
+        room = self.room[envs].astype(np.intp)
+        enabled = layout.collider_enabled[room]
+        enabled[:, layout.gate] = ~self.gate_open[envs, room]
+        self.player_x[envs], self.player_z[envs] = move_circles(
+            self.player_x[envs], self.player_z[envs], dx[envs], dz[envs], logic.PLAYER_RADIUS,
+            layout.collider_x[room], layout.collider_z[room], layout.collider_hx[room],
+            layout.collider_hz[room], enabled)
+
+    def advance(self):
+        entering = (self.room == 0) & self.gate_open[:, 0] & (self.player_z > logic.ROOM_SIZE / 2 + 0.5)
+        self.room[entering] = 1
+        self.player_z[entering] = -logic.ROOM_SIZE / 2 + 2.0
+        self.player_x[entering] = 0.0
+
+        envs = np.arange(self.count)
+        room = self.room.astype(np.intp)
+        opening = self.gate_open[envs, room] & (self.gate_progress[envs, room] < 1.0)
+        self.gate_progress[envs[opening], room[opening]] += 0.02
+
+        self.sim_time += logic.SIM_DT
+        self.time_remaining = np.maximum(0, logic.TIME_LIMIT - self.sim_time.astype(np.int32))
+
+        self.game_over |= (self.time_remaining <= 0) & ~self.gate_open.all(axis=1)
+
+        finished = self.gate_open[:, 1] & ~self.game_completed
+        self.game_completed |= finished
+        self.final_score[finished] = self.time_remaining[finished]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure batched environment throughput")
+    parser.add_argument("--envs", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logic.VERBOSE = False
+    env = BatchEnv(args.envs, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    actions = rng.integers(0, 128, size=(args.steps, args.envs), dtype=np.uint8)
+
+    start = time.perf_counter()
+    resets = 0
+    for step_actions in actions:
+        env.step(step_actions)
+        resets += env.reset_done()
+    elapsed = time.perf_counter() - start
+
+    total = args.envs * args.steps
+    print(f"envs: {args.envs}  steps: {args.steps}  resets: {resets}  elapsed: {elapsed:.2f}s  "
+          f"env-steps/s: {total / elapsed:,.0f}")
+
+if __name__ == "__main__":
+    main()
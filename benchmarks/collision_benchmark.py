@@ -0,0 +1,86 @@
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collision import CollisionWorld, sweep_boxes
+from entity_store import EntityStore, KIND_BOX, KIND_SIZES
+from spatial_index import PackedGrid
+
+# Per-tick cost of moving the player through rooms of growing size at a
+# constant box density: the grid broadphase against a brute-force sweep of
+# every collider. The broadphase cost should stay flat as boxes are added.
+
+PLAYER_RADIUS = 0.5
+MOVE_SPEED = 0.15
+SPACING = 3.0
+
+def box_world(count, seed):
+    rng = np.random.default_rng(seed)
+    side = math.sqrt(count) * SPACING
+    positions = np.zeros((count, 3), dtype=np.float32)
+    positions[:, 0] = rng.uniform(-side / 2, side / 2, count)
+    positions[:, 2] = rng.uniform(-side / 2, side / 2, count)
+    store = EntityStore()
+    store.adopt(np.full(count, KIND_BOX, dtype=np.int8), np.zeros(count, dtype=np.uint8),
+                np.full(count, -1, dtype=np.int16), np.full(count, -1, dtype=np.int32), positions, [], [])
+    w, h, d = KIND_SIZES[KIND_BOX]
+    grid = PackedGrid.build(np.arange(count), positions[:, 0], positions[:, 2], w / 2, d / 2)
+    world = CollisionWorld()
+    world.set_props(grid, store, w / 2, d / 2)
+    return world, store, side
+
+def walk(world, side, ticks, seed):
+    rng = random.Random(seed)
+    x = z = 0.0
+    while world.overlaps(x, z, PLAYER_RADIUS):
+        x, z = rng.uniform(-side / 4, side / 4), rng.uniform(-side / 4, side / 4)
+    angle = rng.uniform(0, 2 * math.pi)
+    world.tests = 0
+    started = time.perf_counter()
+    for _ in range(ticks):
+        angle += rng.uniform(-0.3, 0.3)
+        if abs(x) > side / 2 or abs(z) > side / 2:
+            angle = math.atan2(-z, -x)
+        x, z = world.move(x, z, math.cos(angle) * MOVE_SPEED, math.sin(angle) * MOVE_SPEED, PLAYER_RADIUS)
+    return (time.perf_counter() - started) / ticks, world.tests / ticks
+
+def brute_force(store, ticks, seed):
+    # One sweep per tick against every box, as a single vectorized call.
+    rng = random.Random(seed)
+    count = store.count
+    w, h, d = KIND_SIZES[KIND_BOX]
+    bx = store.positions[None, :count, 0].astype(np.float64)
+    bz = store.positions[None, :count, 2].astype(np.float64)
+    hx = np.full_like(bx, w / 2)
+    hz = np.full_like(bz, d / 2)
+    enabled = np.ones_like(bx, dtype=bool)
+    started = time.perf_counter()
+    for _ in range(ticks):
+        angle = rng.uniform(0, 2 * math.pi)
+        step = np.array([[math.cos(angle) * MOVE_SPEED]]), np.array([[math.sin(angle) * MOVE_SPEED]])
+        sweep_boxes(np.zeros((1, 1)), np.zeros((1, 1)), step[0], step[1], PLAYER_RADIUS, bx, bz, hx, hz, enabled)
+    return (time.perf_counter() - started) / ticks
+
+def main():
+    parser = argparse.ArgumentParser(description="Collision broadphase scaling benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'boxes':>8} {'grid us/tick':>13} {'tests/tick':>11} {'brute us/tick':>14}")
+    for count in args.counts:
+        world, store, side = box_world(count, args.seed)
+        per_tick, tests = walk(world, side, args.ticks, args.seed)
+        brute = brute_force(store, max(args.ticks // 10, 50), args.seed)
+        print(f"{count:>8} {per_tick * 1e6:>13.1f} {tests:>11.1f} {brute * 1e6:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entity_store import EntityStore, KIND_BOX, KIND_FRUIT, KIND_KEY
+
+# Compares the struct-of-arrays EntityStore against the plain-object layout
+# Room 1 used before (one __dict__ object plus a position list per prop).
+
+class LegacyFruit:
+    def __init__(self, fruit_type, position):
+        self.type = fruit_type
+        self.position = list(position)
+        self.collected = False
+        self.size = 0.3
+        self.color = (0.5, 0.5, 0.5)
+
+class LegacyBox:
+    def __init__(self, position, locked=False, contains_fruit=None, riddle=""):
+        self.position = list(position)
+        self.locked = locked
+        self.opened = False
+        self.contains_fruit = contains_fruit
+        self.size = (1.0, 0.8, 1.0)
+        self.riddle = riddle
+
+class LegacyKey:
+    def __init__(self, position, clue_text=""):
+        self.position = list(position)
+        self.collected = False
+        self.size = 0.2
+        self.clue_text = clue_text
+
+RIDDLES = ["I am red and keep doctors away.", "Yellow and curved.", "Purple and small."]
+FRUITS = ["apple", "banana", "orange", "grape"]
+
+def random_layout(count, seed):
+    rng = random.Random(seed)
+    layout = []
+    for i in range(count):
+        position = (rng.uniform(-500, 500), rng.uniform(0, 1), rng.uniform(-500, 500))
+        layout.append((i % 3, position, rng.choice(FRUITS), rng.choice(RIDDLES)))
+    return layout
+
+def build_legacy(layout):
+    objects = []
+    for kind, position, fruit, riddle in layout:
+        # Each object owns its coordinates, as it would after a level load.
+        position = [c + 0.0 for c in position]
+        if kind == 0:
+            objects.append(LegacyBox(position, locked=True, contains_fruit=fruit, riddle=riddle))
+        elif kind == 1:
+            objects.append(LegacyFruit(fruit, position))
+        else:
+            objects.append(LegacyKey(position, clue_text=riddle))
+    return objects
+
+def build_store(layout):
+    store = EntityStore()
+    kinds = [KIND_BOX, KIND_FRUIT, KIND_KEY]
+    for kind, position, fruit, riddle in layout:
+        store.add(kinds[kind], position, fruit=fruit if kind < 2 else None,
+                  text=riddle if kind != 1 else None)
+    return store
+
+def measure(builder, layout):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = builder(layout)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Entity store memory and query benchmark")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    layout = random_layout(args.count, args.seed)
+    legacy, legacy_bytes = measure(build_legacy, layout)
+    store, store_bytes = measure(build_store, layout)
+    everything = list(range(store.count))
+
+    legacy_radius = timed(lambda: [obj for obj in legacy
+                                   if (obj.position[0] - 10) ** 2 + (obj.position[2] - 10) ** 2 < 400],
+                          args.repeat)
+    store_radius = timed(lambda: store.within_radius(everything, 10, 10, 20), args.repeat)
+    legacy_visible = timed(lambda: [obj for obj in legacy
+                                    if isinstance(obj, LegacyFruit) and not obj.collected],
+                           args.repeat)
+    store_visible = timed(lambda: store.visible(KIND_FRUIT), args.repeat)
+
+    print(f"entities:            {args.count}")
+    print(f"objects   bytes/ent: {legacy_bytes / args.count:8.1f}")
+    print(f"store     bytes/ent: {store_bytes / args.count:8.1f}  (arrays only: {store.nbytes() / args.count:.1f})")
+    print(f"memory reduction:    {legacy_bytes / store_bytes:8.1f}x")
+    print(f"radius filter   objects {legacy_radius * 1000:8.3f} ms  store {store_radius * 1000:8.3f} ms")
+    print(f"visible filter  objects {legacy_visible * 1000:8.3f} ms  store {store_visible * 1000:8.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game_logic as logic
+from event_log import console_line, json_line
+
+# How long game ticks take when console output goes to a reader that
+# stalls now and then (a log collector on the other end of a pipe), with
+# say() printing directly as before against say() and event() queuing to
+# the event log's writer thread. Each tick emits a message and a typed
+# event, far more than a real game does, so drops show up too.
+
+class StallingStream:
+    # Accepts writes, but every `every`-th one blocks for `stall` seconds.
+    def __init__(self, stall, every):
+        self.stall = stall
+        self.every = every
+        self.writes = 0
+        self.lines = 0
+
+    def write(self, text):
+        self.writes += 1
+        self.lines += text.count("\n")
+        if self.writes % self.every == 0:
+            time.sleep(self.stall)
+        return len(text)
+
+    def flush(self):
+        pass
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+def run(buffered, ticks, stall, every, capacity):
+    stream = StallingStream(stall, every)
+    logic.VERBOSE = True
+    logic.events = logic.EventLog(capacity=capacity)
+    if buffered:
+        logic.events.start([(stream, console_line), (stream, json_line)])
+    stdout, sys.stdout = sys.stdout, stream
+    durations = []
+    try:
+        started = time.perf_counter()
+        for tick in range(ticks):
+            before = time.perf_counter()
+            logic.say(f"Tick {tick}: nothing happened")
+            logic.event("switch_pressed", color="red", correct=True, progress=1)
+            durations.append(time.perf_counter() - before)
+            # The rest of a 60 Hz tick, without actually waiting for it.
+            while time.perf_counter() < started + (tick + 1) * logic.SIM_DT / 20:
+                pass
+        logic.events.stop()
+    finally:
+        sys.stdout = stdout
+    return {
+        "p50_us": percentile(durations, 0.5) * 1e6,
+        "p99_us": percentile(durations, 0.99) * 1e6,
+        "max_ms": max(durations) * 1000,
+        "lines": stream.lines,
+        "dropped": logic.events.dropped,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Game-thread cost of console output to a stalling reader")
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument("--stall", type=float, default=0.05, help="seconds each stall lasts")
+    parser.add_argument("--every", type=int, default=500, help="writes between stalls")
+    parser.add_argument("--capacity", type=int, default=4096)
+    args = parser.parse_args()
+
+    print(f"{'output':>9} {'p50 us':>8} {'p99 us':>8} {'max ms':>8} {'lines':>7} {'dropped':>8}")
+    for buffered in (False, True):
+        m = run(buffered, args.ticks, args.stall, args.every, args.capacity)
+        print(f"{'queued' if buffered else 'print':>9} {m['p50_us']:8.1f} {m['p99_us']:8.1f} {m['max_ms']:8.2f} "
+              f"{m['lines']:7} {m['dropped']:8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game_logic as logic
+from simulation_thread import GameSnapshot, SimulationThread
+
+# Simulation pacing and input latency while frames get slower, for the old
+# loop (GLUT timer: catch-up ticks, then draw) against the simulation thread.
+# No GL: a frame is a stand-in that spends part of its time in Python, which
+# holds the GIL, and the rest in the rasterizer, which does not. Key events
+# arrive on a fixed schedule but, as with GLUT, are only delivered between
+# frames. Latency is from an event's arrival to the start of the first frame
+# whose snapshot shows its effect.
+
+class TimerLoop:
+    # The fixed-step accumulator the GLUT-timer loop used: as many ticks as
+    # have come due since the last frame, at most MAX_SIM_STEPS.
+    def __init__(self, step=logic.SIM_DT, max_steps=logic.MAX_SIM_STEPS):
+        self.step = step
+        self.max_steps = max_steps
+        self.last_time = None
+        self.accumulator = 0.0
+
+    def advance(self, now):
+        if self.last_time is None:
+            self.last_time = now
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        steps = min(int(self.accumulator / self.step), self.max_steps)
+        self.accumulator -= steps * self.step
+        if steps == self.max_steps:
+            self.accumulator = min(self.accumulator, self.step)
+        return steps
+
+def render(frame_ms, python_share):
+    spin_until = time.perf_counter() + frame_ms * python_share / 1000
+    while time.perf_counter() < spin_until:
+        pass
+    time.sleep(frame_ms * (1 - python_share) / 1000)
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+def run(threaded, frame_ms, python_share, seconds, press_every, seed):
+    logic.VERBOSE = False
+    logic.new_game(seed)
+    tick_times = []
+    pending = []  # (arrival, first tick that shows it)
+
+    def tick():
+        tick_times.append(time.perf_counter())
+        logic.simulation_step()
+
+    def press(arrival, pressed):
+        # Turning changes the pose on every tick, even against a wall.
+        logic.game.rotate_left = pressed
+        pending.append((arrival, len(tick_times) + 1))
+
+    simulation = SimulationThread(tick).start() if threaded else None
+    clock = TimerLoop()
+    snapshot = None
+    latencies = []
+    frames = 0
+    pressed = False
+    started = time.perf_counter()
+    next_event = started + press_every
+    while True:
+        now = time.perf_counter()
+        if now >= started + seconds:
+            break
+        if simulation is None:
+            for _ in range(clock.advance(now)):
+                tick()
+            snapshot = GameSnapshot(snapshot, len(tick_times))
+        else:
+            snapshot = simulation.settled()
+        for event in list(pending):
+            if snapshot.tick >= event[1]:
+                latencies.append(now - event[0])
+                pending.remove(event)
+
+        render(frame_ms, python_share)
+        frames += 1
+        now = time.perf_counter()
+        while next_event <= now:
+            pressed = not pressed
+            if simulation is None:
+                press(next_event, pressed)
+            else:
+                simulation.submit(press, next_event, pressed)
+            next_event += press_every
+    elapsed = time.perf_counter() - started
+    if simulation is not None:
+        simulation.stop()
+
+    intervals = [(b - a) * 1000 for a, b in zip(tick_times, tick_times[1:])]
+    return {
+        "fps": frames / elapsed,
+        "ticks_per_second": len(tick_times) / elapsed,
+        "tick_p50_ms": percentile(intervals, 0.5),
+        "tick_p99_ms": percentile(intervals, 0.99),
+        "latency_mean_ms": sum(latencies) / max(len(latencies), 1) * 1000,
+        "latency_p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation pacing and input latency under slow frames")
+    parser.add_argument("--frame-ms", type=float, nargs="+", default=[5, 20, 50, 100])
+    parser.add_argument("--python-share", type=float, default=0.3,
+                        help="fraction of a frame spent in Python rather than the rasterizer")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--press-every", type=float, default=0.137, help="seconds between key events")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"target: {1 / logic.SIM_DT:.0f} ticks/s, one every {logic.SIM_DT * 1000:.1f} ms")
+    print(f"{'frame ms':>8} {'loop':>8} {'fps':>6} {'ticks/s':>8} {'tick p50':>9} {'tick p99':>9} "
+          f"{'input ms':>9} {'input p95':>10}")
+    for frame_ms in args.frame_ms:
+        for threaded in (False, True):
+            m = run(threaded, frame_ms, args.python_share, args.seconds, args.press_every, args.seed)
+            print(f"{frame_ms:8.0f} {'thread' if threaded else 'timer':>8} {m['fps']:6.1f} "
+                  f"{m['ticks_per_second']:8.1f} {m['tick_p50_ms']:9.2f} {m['tick_p99_ms']:9.2f} "
+                  f"{m['latency_mean_ms']:9.1f} {m['latency_p95_ms']:10.1f}")
+
+if __name__ == "__main__":
+    main()
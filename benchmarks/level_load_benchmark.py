@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game_logic as logic
+from levels import DEFAULT_LEVEL, compile_level, load_level, LevelData
+
+# Time from "here is a level file" to a playable Room 1 (props in the store,
+# both grids built) for a large generated level, loaded from JSON and from
+# its compiled .pplc form.
+
+FRUITS = ["apple", "banana", "orange", "grape"]
+RIDDLES = ["I am red and keep doctors away.", "Yellow and curved.", "Purple and small."]
+
+def generated_level(count, seed):
+    rng = random.Random(seed)
+    with open(DEFAULT_LEVEL) as f:
+        data = json.load(f)
+    props = []
+    for i in range(count):
+        position = [rng.uniform(-500, 500), rng.choice([0, 0.5]), rng.uniform(-500, 500)]
+        kind = ("box", "key", "clue", "fruit")[i % 4]
+        prop = {"kind": kind, "pos": position}
+        if kind in ("box", "fruit"):
+            prop["fruit"] = rng.choice(FRUITS)
+        if kind != "fruit":
+            prop["text"] = rng.choice(RIDDLES)
+        if kind == "box" and rng.random() < 0.5:
+            prop["locked"] = True
+        props.append(prop)
+    data["rooms"][0]["props"] = props
+    return data
+
+def time_load(path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        logic.use_level(load_level(path))
+        logic.initialize_room1_objects()
+        logic.rebuild_room1_index()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs compiled level load benchmark")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    logic.VERBOSE = False
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "big.json")
+        compiled_path = os.path.join(tmp, "big.pplc")
+        with open(json_path, "w") as f:
+            json.dump(generated_level(args.count, args.seed), f)
+        start = time.perf_counter()
+        compile_level(LevelData.load(json_path), compiled_path)
+        compile_time = time.perf_counter() - start
+
+        json_time = time_load(json_path, args.repeat)
+        compiled_time = time_load(compiled_path, args.repeat)
+        json_size = os.path.getsize(json_path)
+        compiled_size = os.path.getsize(compiled_path)
+        logic.use_level(load_level(DEFAULT_LEVEL))
+
+    print(f"props:            {args.count}")
+    print(f"file size   json {json_size / 1e6:8.2f} MB  compiled {compiled_size / 1e6:8.2f} MB")
+    print(f"compile time:     {compile_time * 1000:8.1f} ms")
+    print(f"load to playable  json {json_time * 1000:8.1f} ms  compiled {compiled_time * 1000:8.1f} ms")
+    print(f"speedup:          {json_time / compiled_time:8.1f}x")
+
+if __name__ == "__main__":
+    main()
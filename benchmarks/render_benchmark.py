@@ -0,0 +1,232 @@
+import argparse
+import importlib.util
+import json
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Renders the game offscreen through Mesa's software rasterizer (EGL
+# surfaceless or OSMesa; no window, no GPU) while flying scripted camera
+# paths through both rooms in both camera modes. Reports wall and CPU time
+# per frame, draw calls and vertices submitted, and fails (exit status 1)
+# when a result crosses a threshold, so it can gate a build:
+#
+#   python benchmarks/render_benchmark.py --json render.json \
+#       --thresholds benchmarks/render_thresholds.json
+#
+# Every path is first run once under gl_accounting, then timed with the
+# wrappers removed. Caches are not cleared between paths, as in a session,
+# so a display list shows up as compiled only in the first path that draws
+# it. glutSwapBuffers is replaced by glFinish, so a frame's time
+# includes rasterization. CPU time is for the whole process, including
+# Mesa's rasterizer threads; python_ms is the calling thread alone.
+
+PATHS = [("room1", "first_person"), ("room1", "third_person"),
+         ("room2", "first_person"), ("room2", "third_person")]
+ORBIT_RADIUS = 5.0
+ORBIT_TURNS = 1.0
+
+def select_platform(platform):
+    # Must run before anything imports OpenGL: the platform is picked once.
+    os.environ["PYOPENGL_PLATFORM"] = platform
+    os.environ.setdefault("LIBGL_ALWAYS_SOFTWARE", "1")
+    if platform == "egl":
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+    try:
+        importlib.import_module("OpenGL.GL")
+    except Exception as error:
+        raise SystemExit(f"PyOpenGL cannot use the {platform} platform here ({error!r})")
+
+def create_context(platform, width, height):
+    if platform == "osmesa":
+        try:
+            from OpenGL import arrays, osmesa
+            from OpenGL.GL import GL_UNSIGNED_BYTE
+            context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+        except Exception as error:
+            raise SystemExit(f"OSMesa is not available ({error}); try --platform egl")
+        buffer = arrays.GLubyteArray.zeros((height, width, 4))
+        if not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, width, height):
+            raise SystemExit("OSMesaMakeCurrent failed")
+        return context, buffer
+
+    import ctypes
+    from OpenGL import EGL
+    from OpenGL import GL
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not EGL.eglInitialize(display, None, None):
+        raise SystemExit("eglInitialize failed; is Mesa's EGL installed?")
+    config = EGL.EGLConfig()
+    matched = EGL.EGLint()
+    attributes = (EGL.EGLint * 5)(EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                                  EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_NONE)
+    EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(matched))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if not context or not EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context):
+        raise SystemExit("could not create a surfaceless EGL context")
+
+    # No default framebuffer without a surface, so render into an FBO.
+    GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, GL.glGenFramebuffers(1))
+    color, depth = GL.glGenRenderbuffers(2)
+    GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, color)
+    GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_RGBA8, width, height)
+    GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0, GL.GL_RENDERBUFFER, color)
+    GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, depth)
+    GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_DEPTH_COMPONENT24, width, height)
+    GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT, GL.GL_RENDERBUFFER, depth)
+    GL.glViewport(0, 0, width, height)
+    return display, context
+
+def load_game():
+    spec = importlib.util.spec_from_file_location("puzzle_prison", os.path.join(ROOT, "Puzzle Prison.py"))
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+
+    # GLUT has no window here. Its bitmap fonts need one, so text goes
+    # through glBitmap with a solid glyph of about the same size instead.
+    from OpenGL import GL
+    glyph = bytes([0xFF, 0xC0]) * 18
+    game.glutBitmapCharacter = lambda font, char: GL.glBitmap(10, 18, 0, 4, 10, 0, glyph)
+    game.glutSwapBuffers = GL.glFinish
+    game.glutPostRedisplay = lambda: None
+    game.glutTimerFunc = lambda *args: None
+    return game
+
+def enter_room(game, room, camera_mode, seed):
+    game.new_game(seed)
+    game.game.camera_mode = camera_mode
+    if room == "room2":
+        game.game.current_room = 1
+        game.install_room(1)
+        game.rebuild_room1_index()
+
+def fly(game, frames, offset=0):
+    # An orbit around the room centre, heading along the circle.
+    state = game.game
+    for frame in range(offset, offset + frames):
+        angle = 2 * math.pi * ORBIT_TURNS * frame / frames
+        state.save_previous_state()
+        state.player_x = ORBIT_RADIUS * math.cos(angle)
+        state.player_z = ORBIT_RADIUS * math.sin(angle)
+        state.player_rotation_y = math.degrees(angle) + 90
+        game.sim_clock.alpha = 1.0
+        yield
+
+def count_path(game, accounting, frames):
+    accounting.reset()
+    for _ in fly(game, frames):
+        game.display()
+        accounting.end_frame()
+    return {f"{name}_per_frame": value for name, value in accounting.per_frame().items()}
+
+def time_path(game, frames, warmup):
+    for _ in fly(game, warmup):
+        game.display()
+    wall = []
+    cpu_started = time.process_time()
+    thread_started = time.thread_time()
+    for _ in fly(game, frames):
+        started = time.perf_counter()
+        game.display()
+        wall.append(time.perf_counter() - started)
+    cpu = time.process_time() - cpu_started
+    thread = time.thread_time() - thread_started
+    wall.sort()
+    mean = sum(wall) / frames
+    return {
+        "fps": 1.0 / mean,
+        "wall_ms_per_frame": mean * 1000,
+        "p95_ms_per_frame": wall[min(frames - 1, int(frames * 0.95))] * 1000,
+        "cpu_ms_per_frame": cpu / frames * 1000,
+        "python_ms_per_frame": thread / frames * 1000,
+    }
+
+def check(results, thresholds):
+    # Keys are "max_<metric>" or "min_<metric>"; "default" applies to every
+    # path and a path's own entry overrides it.
+    failures = []
+    for path, metrics in results.items():
+        limits = dict(thresholds.get("default", {}), **thresholds.get(path, {}))
+        for key, limit in limits.items():
+            bound, metric = key.split("_", 1)
+            if metric not in metrics:
+                raise SystemExit(f"unknown metric in threshold {key!r}")
+            value = metrics[metric]
+            if (bound == "max" and value > limit) or (bound == "min" and value < limit):
+                failures.append(f"{path}: {metric} {value:.2f} breaks {key} {limit}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Offscreen software-rendered frame benchmark")
+    parser.add_argument("--platform", choices=["egl", "osmesa"], default="egl")
+    parser.add_argument("--frames", type=int, default=120, help="timed frames per path")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    parser.add_argument("--thresholds", metavar="PATH", help="JSON file of per-path limits")
+    parser.add_argument("--by-function", action="store_true", help="print GL calls per draw function for each path")
+    args = parser.parse_args()
+
+    select_platform(args.platform)
+    game = load_game()
+    from gl_accounting import GLAccounting
+    width, height = game.WINDOW_WIDTH, game.WINDOW_HEIGHT
+    # Held until the last frame: with OSMesa this includes the buffer
+    # being rendered into, which must not be freed while it is current.
+    context = create_context(args.platform, width, height)
+    game.logic.VERBOSE = False
+    game.init_opengl()
+    from OpenGL.GL import GL_RENDERER, GL_UNPACK_ALIGNMENT, glGetString, glPixelStorei
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    renderer = glGetString(GL_RENDERER).decode()
+
+    results = {}
+    tables = {}
+    accounting = GLAccounting(game).install()
+    for room, camera_mode in PATHS:
+        enter_room(game, room, camera_mode, args.seed)
+        results[f"{room}_{camera_mode}"] = count_path(game, accounting, args.frames)
+        tables[f"{room}_{camera_mode}"] = accounting.table()
+    accounting.remove()
+    for room, camera_mode in PATHS:
+        enter_room(game, room, camera_mode, args.seed)
+        results[f"{room}_{camera_mode}"].update(time_path(game, args.frames, args.warmup))
+    del context
+
+    print(f"renderer: {renderer}  {width}x{height}  frames/path: {args.frames}")
+    print(f"{'path':26} {'fps':>7} {'ms/frame':>9} {'p95 ms':>7} {'cpu ms':>7} {'py ms':>6} "
+          f"{'gl calls':>8} {'draws':>6} {'verts':>8} {'state':>6} {'bitmaps':>8}")
+    for path, m in results.items():
+        print(f"{path:26} {m['fps']:7.1f} {m['wall_ms_per_frame']:9.2f} {m['p95_ms_per_frame']:7.2f} "
+              f"{m['cpu_ms_per_frame']:7.2f} {m['python_ms_per_frame']:6.2f} {m['gl_calls_per_frame']:8.0f} "
+              f"{m['draw_calls_per_frame']:6.0f} {m['vertices_per_frame']:8.0f} "
+              f"{m['state_changes_per_frame']:6.0f} {m['bitmaps_per_frame']:8.0f}")
+    if args.by_function:
+        for path, table in tables.items():
+            print(f"\n{path}")
+            print("\n".join(table))
+
+    report = {"platform": args.platform, "renderer": renderer, "width": width,
+              "height": height, "frames": args.frames, "paths": results}
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            failures = check(results, json.load(f))
+        for failure in failures:
+            print(f"FAIL {failure}")
+        if failures:
+            sys.exit(1)
+        print("all thresholds met")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game_logic as logic
+from levels import DEFAULT_LEVEL, LevelData, compile_level, load_level
+
+# Walks a long chain of generated rooms: in each room the gate opens, the
+# player spends a couple of seconds (paced at SIM_HZ, as in the game)
+# walking to it and then steps through. Reports the worst handoff tick (the
+# step that swaps rooms) with and without prefetching, and traced memory
+# after every room to show that only the current and next room stay resident.
+# Prefetching only hides a room's build time if the build finishes within
+# the walk window; a larger room (or a shorter walk) stalls the handoff on
+# the unfinished build, which shows up as stalls and a long worst handoff.
+
+FRUITS = ["apple", "banana", "orange", "grape"]
+
+def chain_level(rooms, props, seed):
+    rng = random.Random(seed)
+    data = {"name": "chain", "required_fruits": ["apple"], "rooms": []}
+    for number in range(rooms):
+        room_props = []
+        for i in range(props):
+            kind = ("box", "key", "clue", "fruit")[i % 4]
+            prop = {"kind": kind, "pos": [rng.uniform(-9, 9), 0, rng.uniform(-9, 9)]}
+            if kind in ("box", "fruit"):
+                prop["fruit"] = rng.choice(FRUITS)
+            if kind != "fruit":
+                prop["text"] = f"room {number} prop {i}"
+            room_props.append(prop)
+        data["rooms"].append({"offset_y": -400 * number, "props": room_props,
+                              "gate_to": number + 1 if number + 1 < rooms else None})
+    return data
+
+def walk(ticks):
+    started = time.perf_counter()
+    for tick in range(ticks):
+        logic.simulation_step()
+        delay = started + (tick + 1) * logic.SIM_DT - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+def tour(walk_ticks):
+    # One pass through every room; returns the slowest handoff in ms.
+    logic.new_game(0)
+    worst = 0.0
+    memory = []
+    for room in range(len(logic.ROOM_OFFSETS) - 1):
+        logic.open_gate(room)
+        walk(walk_ticks)
+        logic.game.player_x = 0.0
+        logic.game.player_z = logic.ROOM_SIZE / 2 + 1.0
+        started = time.perf_counter()
+        logic.simulation_step()
+        worst = max(worst, time.perf_counter() - started)
+        memory.append(tracemalloc.get_traced_memory()[0])
+    return worst * 1000, memory
+
+def main():
+    parser = argparse.ArgumentParser(description="Room streaming handoff and memory benchmark")
+    parser.add_argument("--rooms", type=int, default=12)
+    parser.add_argument("--props", type=int, default=40000)
+    parser.add_argument("--walk-ticks", type=int, default=120, help="ticks between gate opening and handoff")
+    parser.add_argument("--tours", type=int, default=3)
+    parser.add_argument("--compiled", action="store_true", help="stream from a compiled .pplc level")
+    args = parser.parse_args()
+
+    logic.VERBOSE = False
+    with tempfile.TemporaryDirectory() as tmp:
+        level = LevelData.from_json(chain_level(args.rooms, args.props, 1))
+        if args.compiled:
+            path = os.path.join(tmp, "chain.pplc")
+            compile_level(level, path)
+            level = load_level(path)
+
+        tracemalloc.start()
+        for prefetching in (False, True):
+            logic.use_level(level)
+            logic.residency.prefetching = prefetching
+            handoffs, memory = [], []
+            for _ in range(args.tours):
+                worst, samples = tour(args.walk_ticks)
+                handoffs.append(worst)
+                memory.extend(samples)
+            residency = logic.residency
+            label = "prefetch" if prefetching else "no prefetch"
+            print(f"{label:12} worst handoff {max(handoffs):8.2f} ms  stalls {residency.stalls:3}  "
+                  f"cold loads {residency.cold_loads:3}  evictions {residency.evictions:3}  "
+                  f"resident {residency.resident()}")
+            print(f"{'':12} traced memory per room  min {min(memory) / 1e6:7.1f} MB  "
+                  f"max {max(memory) / 1e6:7.1f} MB  last {memory[-1] / 1e6:7.1f} MB")
+        tracemalloc.stop()
+        logic.use_level(load_level(DEFAULT_LEVEL))
+
+    print(f"rooms: {args.rooms}  props/room: {args.props}  tours: {args.tours}")
+
+if __name__ == "__main__":
+    main()
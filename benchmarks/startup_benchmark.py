@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from render_benchmark import create_context, load_game, select_platform
+
+import mesh_cache
+
+# Time from main() to the first finished frame, offscreen, each run in a
+# fresh process so nothing is already built or imported. "cold" starts with
+# no mesh cache (the meshes are generated and the cache written), "warm"
+# with the cache left by the run before. Creating the EGL context stands in
+# for glutCreateWindow.
+
+def child(platform, seed, cache):
+    started = time.perf_counter()
+    select_platform(platform)
+    game = load_game()
+    imported = time.perf_counter()
+    mesh_cache.MESH_CACHE = cache
+
+    load_static_meshes = game.load_static_meshes
+    timings = {}
+    def timed_load():
+        began = time.perf_counter()
+        timings["cached"] = load_static_meshes()
+        timings["meshes_ms"] = (time.perf_counter() - began) * 1000
+    game.load_static_meshes = timed_load
+
+    main_started = time.perf_counter()
+    create_context(platform, game.WINDOW_WIDTH, game.WINDOW_HEIGHT)
+    game.logic.VERBOSE = False
+    game.init_opengl()
+    game.new_game(seed)
+    game.simulation = game.SimulationThread(game.simulation_tick).start()
+    game.display()
+    first_frame = time.perf_counter()
+    game.simulation.stop()
+    print(json.dumps(dict(timings, import_ms=(imported - started) * 1000,
+                          first_frame_ms=(first_frame - main_started) * 1000)))
+
+def run(platform, seed, cache):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", cache,
+                             "--platform", platform, "--seed", str(seed)],
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time to the first frame")
+    parser.add_argument("--platform", choices=["egl", "osmesa"], default="egl")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--child", metavar="CACHE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.platform, args.seed, args.child)
+        return
+
+    print(f"{'cache':>6} {'import ms':>10} {'main to frame ms':>17} {'meshes ms':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = os.path.join(directory, "mesh_cache.ppmc")
+        for mode in ("cold", "warm"):
+            runs = []
+            for _ in range(args.runs):
+                if mode == "cold" and os.path.exists(cache):
+                    os.remove(cache)
+                runs.append(run(args.platform, args.seed, cache))
+            print(f"{mode:>6} {statistics.median(r['import_ms'] for r in runs):10.1f} "
+                  f"{statistics.median(r['first_frame_ms'] for r in runs):17.1f} "
+                  f"{statistics.median(r['meshes_ms'] for r in runs):10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import math
+
+import numpy as np
+
+from spatial_index import SpatialGrid
+
+# Player movement as a swept circle against axis-aligned boxes (walls, the
+# gate, props, switches and the buzzer), with slide response: on contact the
+# circle stops just short of the surface and the rest of the step continues
+# along it, up to SLIDE_ITERATIONS times. A box grown by the circle radius
+# has rounded corners, so each box is swept as two slabs (grown along x and
+# along z) plus four corner circles, and the earliest hit wins.
+#
+# sweep_box() and sweep_boxes() are the same test for one circle and for a
+# batch of them (see batch_env.py); they are written to produce identical
+# results, so keep them in step.
+
+WALL_THICKNESS = 1.0
+SLIDE_ITERATIONS = 3
+SKIN = 1e-4
+
+def sweep_slab(x, z, dx, dz, x0, z0, x1, z1):
+    # Entry time of a point moving (dx, dz) into the rectangle, as
+    # (t, along_x), or None. The point starts outside it.
+    if dx == 0.0:
+        if not x0 <= x <= x1:
+            return None
+        near_x, far_x = -math.inf, math.inf
+    else:
+        near_x, far_x = (x0 - x) / dx, (x1 - x) / dx
+        if near_x > far_x:
+            near_x, far_x = far_x, near_x
+    if dz == 0.0:
+        if not z0 <= z <= z1:
+            return None
+        near_z, far_z = -math.inf, math.inf
+    else:
+        near_z, far_z = (z0 - z) / dz, (z1 - z) / dz
+        if near_z > far_z:
+            near_z, far_z = far_z, near_z
+    near = max(near_x, near_z)
+    if near > min(far_x, far_z) or not 0.0 <= near <= 1.0:
+        return None
+    return near, near_x > near_z
+
+def sweep_corner(x, z, dx, dz, cx, cz, radius):
+    mx, mz = x - cx, z - cz
+    a = dx * dx + dz * dz
+    b = mx * dx + mz * dz
+    c = mx * mx + mz * mz - radius * radius
+    disc = b * b - a * c
+    if b >= 0.0 or disc < 0.0:
+        return None
+    t = (-b - math.sqrt(disc)) / a
+    if not 0.0 <= t <= 1.0:
+        return None
+    return t
+
+def sweep_box(x, z, dx, dz, radius, bx, bz, hx, hz):
+    # First contact of the circle with the box as (t, nx, nz), or None.
+    qx = min(max(x, bx - hx), bx + hx)
+    qz = min(max(z, bz - hz), bz + hz)
+    ox, oz = x - qx, z - qz
+    d2 = ox * ox + oz * oz
+    if d2 < radius * radius:
+        # Already touching: only block motion further in.
+        if d2 == 0.0 or dx * ox + dz * oz >= 0.0:
+            return None
+        length = math.sqrt(d2)
+        return 0.0, ox / length, oz / length
+
+    best = None
+    for x0, z0, x1, z1 in ((bx - hx - radius, bz - hz, bx + hx + radius, bz + hz),
+                           (bx - hx, bz - hz - radius, bx + hx, bz + hz + radius)):
+        hit = sweep_slab(x, z, dx, dz, x0, z0, x1, z1)
+        if hit is not None and (best is None or hit[0] < best[0]):
+            t, along_x = hit
+            if along_x:
+                best = (t, -1.0 if dx > 0.0 else 1.0, 0.0)
+            else:
+                best = (t, 0.0, -1.0 if dz > 0.0 else 1.0)
+    for cx, cz in ((bx - hx, bz - hz), (bx + hx, bz - hz), (bx - hx, bz + hz), (bx + hx, bz + hz)):
+        t = sweep_corner(x, z, dx, dz, cx, cz, radius)
+        if t is not None and (best is None or t < best[0]):
+            best = (t, (x + dx * t - cx) / radius, (z + dz * t - cz) / radius)
+    return best
+
+class CollisionWorld:
+    # Fixed colliders (walls, gate, switches, buzzer) sit in their own small
+    # grid; props come from the room's box grid, which already exists.
+    def __init__(self, cell_size=2.0):
+        self.boxes = []
+        self.enabled = []
+        self.grid = SpatialGrid(cell_size)
+        self.props = None
+        self.prop_store = None
+        self.prop_half = (0.0, 0.0)
+        self.gate = None
+        self.tests = 0
+
+    def add_box(self, x, z, half_x, half_z):
+        index = len(self.boxes)
+        self.boxes.append((x, z, half_x, half_z))
+        self.enabled.append(True)
+        self.grid.insert(index, x, z, half_x, half_z)
+        return index
+
+    def add_room_walls(self, room_size, gate_width, thickness=WALL_THICKNESS):
+        # Four walls around the room, the one at +z split by the gate.
+        half = room_size / 2
+        outer = half + thickness
+        middle = half + thickness / 2
+        self.add_box(-middle, 0.0, thickness / 2, outer)
+        self.add_box(middle, 0.0, thickness / 2, outer)
+        self.add_box(0.0, -middle, outer, thickness / 2)
+        post = (outer - gate_width / 2) / 2
+        self.add_box(-(gate_width / 2 + post), middle, post, thickness / 2)
+        self.add_box(gate_width / 2 + post, middle, post, thickness / 2)
+        self.gate = self.add_box(0.0, middle, gate_width / 2, thickness / 2)
+        return self.gate
+
+    def set_props(self, grid, store, half_x, half_z):
+        self.props = grid
+        self.prop_store = store
+        self.prop_half = (half_x, half_z)
+
+    def set_gate_open(self, is_open):
+        self.enabled[self.gate] = not is_open
+
+    def candidates(self, min_x, min_z, max_x, max_z):
+        # Fixed colliders first, then props, each in insertion order.
+        found = [self.boxes[entry.obj] for entry in self.grid.query_box(min_x, min_z, max_x, max_z)
+                 if self.enabled[entry.obj]]
+        if self.props is not None:
+            half_x, half_z = self.prop_half
+            positions = self.prop_store.positions
+            for index in self.props.query_ids(min_x, min_z, max_x, max_z):
+                x, _, z = positions[index]
+                found.append((float(x), float(z), half_x, half_z))
+        return found
+
+    def sweep(self, x, z, dx, dz, radius):
+        reach = radius + SKIN
+        boxes = self.candidates(min(x, x + dx) - reach, min(z, z + dz) - reach,
+                                max(x, x + dx) + reach, max(z, z + dz) + reach)
+        self.tests += len(boxes)
+        best = None
+        for bx, bz, hx, hz in boxes:
+            hit = sweep_box(x, z, dx, dz, radius, bx, bz, hx, hz)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+        return best
+
+    def move(self, x, z, dx, dz, radius):
+        for _ in range(SLIDE_ITERATIONS):
+            if dx == 0.0 and dz == 0.0:
+                break
+            hit = self.sweep(x, z, dx, dz, radius)
+            if hit is None:
+                return x + dx, z + dz
+            t, nx, nz = hit
+            t = max(t - SKIN / math.sqrt(dx * dx + dz * dz), 0.0)
+            x += dx * t
+            z += dz * t
+            dx *= 1.0 - t
+            dz *= 1.0 - t
+            into = dx * nx + dz * nz
+            dx -= nx * into
+            dz -= nz * into
+        return x, z
+
+    def overlaps(self, x, z, radius):
+        for bx, bz, hx, hz in self.candidates(x - radius, z - radius, x + radius, z + radius):
+            qx = min(max(x, bx - hx), bx + hx)
+            qz = min(max(z, bz - hz), bz + hz)
+            if (x - qx) ** 2 + (z - qz) ** 2 < radius * radius:
+                return True
+        return False
+
+def sweep_slabs(x, z, dx, dz, x0, z0, x1, z1):
+    # sweep_slab() over arrays; returns (t, along_x) with t = inf on a miss.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        moving_x = dx != 0.0
+        a_x, b_x = (x0 - x) / dx, (x1 - x) / dx
+        inside_x = (x0 <= x) & (x <= x1)
+        near_x = np.where(moving_x, np.minimum(a_x, b_x), np.where(inside_x, -np.inf, np.inf))
+        far_x = np.where(moving_x, np.maximum(a_x, b_x), np.where(inside_x, np.inf, -np.inf))
+        moving_z = dz != 0.0
+        a_z, b_z = (z0 - z) / dz, (z1 - z) / dz
+        inside_z = (z0 <= z) & (z <= z1)
+        near_z = np.where(moving_z, np.minimum(a_z, b_z), np.where(inside_z, -np.inf, np.inf))
+        far_z = np.where(moving_z, np.maximum(a_z, b_z), np.where(inside_z, np.inf, -np.inf))
+    near = np.maximum(near_x, near_z)
+    hit = (near <= np.minimum(far_x, far_z)) & (near >= 0.0) & (near <= 1.0)
+    return np.where(hit, near, np.inf), near_x > near_z
+
+def sweep_boxes(x, z, dx, dz, radius, bx, bz, hx, hz, enabled):
+    # sweep_box() for n circles against their own rows of m boxes. Positions
+    # and steps have shape (n, 1), boxes (n, m). Returns the earliest hit per
+    # circle as (t, nx, nz) with t = inf where nothing is hit.
+    qx = np.minimum(np.maximum(x, bx - hx), bx + hx)
+    qz = np.minimum(np.maximum(z, bz - hz), bz + hz)
+    ox, oz = x - qx, z - qz
+    d2 = ox * ox + oz * oz
+    touching = d2 < radius * radius
+    pressing = touching & (d2 != 0.0) & (dx * ox + dz * oz < 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        length = np.sqrt(d2)
+        touch_nx, touch_nz = ox / length, oz / length
+
+    times, normals_x, normals_z = [], [], []
+    away_x = np.broadcast_to(np.where(dx > 0.0, -1.0, 1.0), bx.shape)
+    away_z = np.broadcast_to(np.where(dz > 0.0, -1.0, 1.0), bx.shape)
+    zero = np.zeros_like(bx)
+    for x0, z0, x1, z1 in ((bx - hx - radius, bz - hz, bx + hx + radius, bz + hz),
+                           (bx - hx, bz - hz - radius, bx + hx, bz + hz + radius)):
+        t, along_x = sweep_slabs(x, z, dx, dz, x0, z0, x1, z1)
+        times.append(t)
+        normals_x.append(np.where(along_x, away_x, zero))
+        normals_z.append(np.where(along_x, zero, away_z))
+    a = dx * dx + dz * dz
+    for cx, cz in ((bx - hx, bz - hz), (bx + hx, bz - hz), (bx - hx, bz + hz), (bx + hx, bz + hz)):
+        mx, mz = x - cx, z - cz
+        b = mx * dx + mz * dz
+        c = mx * mx + mz * mz - radius * radius
+        disc = b * b - a * c
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (-b - np.sqrt(disc)) / a
+            hit = (b < 0.0) & (disc >= 0.0) & (t >= 0.0) & (t <= 1.0)
+            t = np.where(hit, t, np.inf)
+            normals_x.append((x + dx * t - cx) / radius)
+            normals_z.append((z + dz * t - cz) / radius)
+        times.append(t)
+
+    times = np.stack(times, axis=-1)
+    first = times.argmin(axis=-1)[..., None]
+    t = np.take_along_axis(times, first, -1)[..., 0]
+    nx = np.take_along_axis(np.stack(normals_x, axis=-1), first, -1)[..., 0]
+    nz = np.take_along_axis(np.stack(normals_z, axis=-1), first, -1)[..., 0]
+    t = np.where(touching, np.where(pressing, 0.0, np.inf), t)
+    nx = np.where(touching, touch_nx, nx)
+    nz = np.where(touching, touch_nz, nz)
+    t = np.where(enabled, t, np.inf)
+
+    rows = np.arange(len(t))
+    box = t.argmin(axis=1)
+    return t[rows, box], nx[rows, box], nz[rows, box]
+
+def move_circles(x, z, dx, dz, radius, bx, bz, hx, hz, enabled):
+    # CollisionWorld.move() for arrays of circles; x, z, dx, dz have shape (n,).
+    x, z, dx, dz = x.copy(), z.copy(), dx.copy(), dz.copy()
+    active = np.ones(len(x), dtype=bool)
+    for _ in range(SLIDE_ITERATIONS):
+        active &= (dx != 0.0) | (dz != 0.0)
+        rows = np.flatnonzero(active)
+        if not len(rows):
+            break
+        t, nx, nz = sweep_boxes(x[rows, None], z[rows, None], dx[rows, None], dz[rows, None], radius,
+                                bx[rows], bz[rows], hx[rows], hz[rows], enabled[rows])
+        free = np.isinf(t)
+        done = rows[free]
+        x[done] += dx[done]
+        z[done] += dz[done]
+        active[done] = False
+
+        rows, t, nx, nz = rows[~free], t[~free], nx[~free], nz[~free]
+        rx, rz = dx[rows], dz[rows]
+        t = np.maximum(t - SKIN / np.sqrt(rx * rx + rz * rz), 0.0)
+        x[rows] += rx * t
+        z[rows] += rz * t
+        rx = rx * (1.0 - t)
+        rz = rz * (1.0 - t)
+        into = rx * nx + rz * nz
+        dx[rows] = rx - nx * into
+        dz[rows] = rz - nz * into
+    return x, z
@@ -0,0 +1,54 @@
+import math
+
+import numpy as np
+
+# View-frustum tests for the renderer. Matrices follow gluPerspective and
+# gluLookAt, written row-major so clip = projection @ view @ point; the six
+# planes are read straight off the rows of the combined matrix.
+
+def perspective_matrix(fovy, aspect, near, far):
+    f = 1.0 / math.tan(math.radians(fovy) / 2)
+    return np.array([
+        [f / aspect, 0.0, 0.0, 0.0],
+        [0.0, f, 0.0, 0.0],
+        [0.0, 0.0, (far + near) / (near - far), 2 * far * near / (near - far)],
+        [0.0, 0.0, -1.0, 0.0],
+    ])
+
+def look_at_matrix(eye, center, up=(0.0, 1.0, 0.0)):
+    eye = np.asarray(eye, dtype=np.float64)
+    forward = np.asarray(center, dtype=np.float64) - eye
+    forward /= np.linalg.norm(forward)
+    side = np.cross(forward, up)
+    side /= np.linalg.norm(side)
+    up = np.cross(side, forward)
+    return np.array([
+        [side[0], side[1], side[2], -side @ eye],
+        [up[0], up[1], up[2], -up @ eye],
+        [-forward[0], -forward[1], -forward[2], forward @ eye],
+        [0.0, 0.0, 0.0, 1.0],
+    ])
+
+class Frustum:
+    def __init__(self, clip):
+        planes = np.array([clip[3] + clip[0], clip[3] - clip[0],
+                           clip[3] + clip[1], clip[3] - clip[1],
+                           clip[3] + clip[2], clip[3] - clip[2]])
+        planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+        self.normals = planes[:, :3]
+        self.offsets = planes[:, 3]
+        self.plane_list = planes.tolist()
+
+    @classmethod
+    def from_camera(cls, fovy, aspect, near, far, eye, center, up=(0.0, 1.0, 0.0)):
+        return cls(perspective_matrix(fovy, aspect, near, far) @ look_at_matrix(eye, center, up))
+
+    def sphere_visible(self, x, y, z, radius):
+        for a, b, c, d in self.plane_list:
+            if a * x + b * y + c * z + d < -radius:
+                return False
+        return True
+
+    def spheres_visible(self, centers, radii):
+        distances = centers @ self.normals.T + self.offsets
+        return np.all(distances >= -np.asarray(radii)[:, None], axis=1)
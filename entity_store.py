@@ -0,0 +1,258 @@
+import numpy as np
+
+# Struct-of-arrays storage for room props. Every entity is a row index into
+# a few NumPy arrays; Fruit/Box/Key/Clue objects are thin views over a row,
+# so large generated rooms cost a few dozen bytes per prop and distance,
+# collision and visibility filters run as single array operations.
+
+KIND_CLUE = 0
+KIND_BOX = 1
+KIND_KEY = 2
+KIND_FRUIT = 3
+KIND_NAMES = ["clue", "box", "key", "fruit"]
+
+# Props of one kind all share a footprint, so sizes are stored per kind.
+KIND_SIZES = [(0.3, 0.3, 0.3), (1.0, 0.8, 1.0), (0.2, 0.2, 0.2), (0.3, 0.3, 0.3)]
+
+FLAG_COLLECTED = 1
+FLAG_OPENED = 2
+FLAG_LOCKED = 4
+FLAG_READ = 8
+
+class EntityStore:
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.kinds = np.zeros(capacity, dtype=np.int8)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.fruit_ids = np.full(capacity, -1, dtype=np.int16)
+        self.text_ids = np.full(capacity, -1, dtype=np.int32)
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.kind_sizes = np.array(KIND_SIZES, dtype=np.float64)
+        self.fruit_names = []
+        self.texts = []
+        self.lookup = {}
+        # Bumped on every change other than to flags (see frozen()).
+        self.version = 0
+
+    def grow(self, capacity):
+        for name in ("kinds", "flags", "fruit_ids", "text_ids", "positions"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def intern(self, table, value):
+        if value is None:
+            return -1
+        if self.lookup is None:
+            self.index_strings()
+        key = (id(table), value)
+        code = self.lookup.get(key)
+        if code is None:
+            code = len(table)
+            table.append(value)
+            self.lookup[key] = code
+        return code
+
+    def add(self, kind, position, flags=0, fruit=None, text=None):
+        if self.count == len(self.kinds):
+            self.grow(2 * len(self.kinds))
+        index = self.count
+        self.kinds[index] = kind
+        self.flags[index] = flags
+        self.fruit_ids[index] = self.intern(self.fruit_names, fruit)
+        self.text_ids[index] = self.intern(self.texts, text)
+        self.positions[index] = position
+        self.count += 1
+        self.version += 1
+        return index
+
+    def extend(self, kinds, positions, flags, fruits, texts):
+        # add() for a whole batch: the arrays are filled in one go and each
+        # distinct string is interned once, in order of first appearance.
+        count = len(kinds)
+        if self.count + count > len(self.kinds):
+            self.grow(max(2 * len(self.kinds), self.count + count))
+        rows = slice(self.count, self.count + count)
+        self.kinds[rows] = kinds
+        self.flags[rows] = flags
+        self.positions[rows] = positions
+        for table, values, ids in ((self.fruit_names, fruits, self.fruit_ids), (self.texts, texts, self.text_ids)):
+            codes = {value: self.intern(table, value) for value in dict.fromkeys(values)}
+            ids[rows] = [codes[value] for value in values]
+        self.count += count
+        self.version += 1
+        return np.arange(rows.start, rows.stop)
+
+    def adopt(self, kinds, flags, fruit_ids, text_ids, positions, fruit_names, texts):
+        # Take over ready-made arrays (e.g. views into a compiled level).
+        # Flags and positions change during play, so those are copied; the
+        # rest may stay read-only since grow() copies before any add().
+        self.count = len(kinds)
+        self.kinds = kinds
+        self.flags = np.array(flags, dtype=np.uint8)
+        self.fruit_ids = fruit_ids
+        self.text_ids = text_ids
+        self.positions = np.array(positions, dtype=np.float32)
+        self.fruit_names[:] = fruit_names
+        self.texts[:] = texts
+        self.lookup = None
+        self.version += 1
+
+    def index_strings(self):
+        # Deferred after adopt() until something is interned.
+        self.lookup = {(id(self.fruit_names), name): code for code, name in enumerate(self.fruit_names)}
+        self.lookup.update({(id(self.texts), text): code for code, text in enumerate(self.texts)})
+
+    def clear(self):
+        self.count = 0
+        self.fruit_names.clear()
+        self.texts.clear()
+        self.lookup = {}
+        self.version += 1
+
+    def frozen(self, previous=None):
+        # A read-only copy that another thread can keep using while this
+        # store changes. Flags are copied every time; everything else is
+        # shared with previous (an earlier frozen copy) unless it changed.
+        copy = object.__new__(EntityStore)
+        copy.count = self.count
+        copy.flags = self.flags[:self.count].copy()
+        copy.flags.flags.writeable = False
+        copy.kind_sizes = self.kind_sizes
+        copy.lookup = None
+        copy.version = self.version
+        if previous is not None and previous.version == self.version and previous.source is self:
+            copy.kinds, copy.fruit_ids, copy.text_ids, copy.positions = (
+                previous.kinds, previous.fruit_ids, previous.text_ids, previous.positions)
+            copy.fruit_names, copy.texts = previous.fruit_names, previous.texts
+        else:
+            for name in ("kinds", "fruit_ids", "text_ids", "positions"):
+                array = getattr(self, name)[:self.count].copy()
+                array.flags.writeable = False
+                setattr(copy, name, array)
+            copy.fruit_names, copy.texts = tuple(self.fruit_names), tuple(self.texts)
+        copy.source = self
+        return copy
+
+    def nbytes(self):
+        arrays = (self.kinds, self.flags, self.fruit_ids, self.text_ids, self.positions)
+        return sum(array[:self.count].nbytes for array in arrays)
+
+    def of_kind(self, kind):
+        return np.flatnonzero(self.kinds[:self.count] == kind)
+
+    def visible(self, kind):
+        live = self.kinds[:self.count] == kind
+        live &= (self.flags[:self.count] & FLAG_COLLECTED) == 0
+        return np.flatnonzero(live)
+
+    def within_radius(self, indices, x, z, radius):
+        indices = np.asarray(indices, dtype=np.intp)
+        dx = self.positions[indices, 0] - x
+        dz = self.positions[indices, 2] - z
+        return indices[dx * dx + dz * dz < radius * radius]
+
+    def uncollected(self, indices):
+        indices = np.asarray(indices, dtype=np.intp)
+        return indices[(self.flags[indices] & FLAG_COLLECTED) == 0]
+
+    def first_by_kind(self, indices):
+        # Lowest kind wins, then insertion order within a kind.
+        order = np.lexsort((indices, self.kinds[indices]))
+        return int(indices[order[0]])
+
+    def overlaps_square(self, indices, x, z, half):
+        indices = np.asarray(indices, dtype=np.intp)
+        sizes = self.kind_sizes[self.kinds[indices]]
+        reach_x = sizes[:, 0] / 2 + half
+        reach_z = sizes[:, 2] / 2 + half
+        return bool(np.any((np.abs(self.positions[indices, 0] - x) < reach_x) &
+                           (np.abs(self.positions[indices, 2] - z) < reach_z)))
+
+class EntityView:
+    __slots__ = ("store", "index")
+    kind = None
+
+    def attach(self, store, position, flags=0, fruit=None, text=None):
+        self.store = store
+        self.index = store.add(self.kind, position, flags, fruit, text)
+
+    @classmethod
+    def at(cls, store, index):
+        view = object.__new__(cls)
+        view.store = store
+        view.index = index
+        return view
+
+    @property
+    def position(self):
+        return self.store.positions[self.index]
+
+    @position.setter
+    def position(self, value):
+        self.store.positions[self.index] = value
+        self.store.version += 1
+
+    def __eq__(self, other):
+        return (isinstance(other, EntityView) and
+                self.store is other.store and self.index == other.index)
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+def flag_property(flag):
+    def getter(self):
+        return bool(self.store.flags[self.index] & flag)
+
+    def setter(self, value):
+        if value:
+            self.store.flags[self.index] |= flag
+        else:
+            self.store.flags[self.index] &= ~flag & 0xFF
+
+    return property(getter, setter)
+
+def text_property():
+    def getter(self):
+        code = self.store.text_ids[self.index]
+        return self.store.texts[code] if code >= 0 else ""
+
+    return property(getter)
+
+def fruit_property():
+    def getter(self):
+        code = self.store.fruit_ids[self.index]
+        return self.store.fruit_names[code] if code >= 0 else None
+
+    return property(getter)
+
+class KindList:
+    # List-like view over one kind of entity, in insertion order.
+    def __init__(self, store, kind, view_class):
+        self.store = store
+        self.kind = kind
+        self.view_class = view_class
+
+    def indices(self):
+        return self.store.of_kind(self.kind)
+
+    def append(self, view):
+        # Constructing an entity already registers it in the store.
+        if view.store is not self.store or view.kind != self.kind:
+            raise ValueError("entity belongs to a different store or kind")
+
+    def views(self, indices):
+        return [self.view_class.at(self.store, int(index)) for index in indices]
+
+    def visible(self):
+        return self.views(self.store.visible(self.kind))
+
+    def __iter__(self):
+        return iter(self.views(self.indices()))
+
+    def __len__(self):
+        return len(self.indices())
+
+    def __getitem__(self, position):
+        return self.view_class.at(self.store, int(self.indices()[position]))
@@ -0,0 +1,111 @@
+import collections
+import json
+import sys
+import threading
+import time
+
+# Game events (a key picked up, a box opened, a switch pressed, ...) as
+# typed records, written out by a background thread so that a slow or
+# stalled reader of stdout or the log file never holds up the game.
+# emit() only appends to a deque, which needs no lock on its own; the
+# writer takes records off the other end in batches every `interval`
+# seconds. The queue is bounded: once `capacity` records are waiting, new
+# ones are dropped and counted, and the writer reports the count in a
+# "dropped" record of its own. Until start() is called nothing is queued.
+
+EVENT_TYPES = frozenset({
+    "message",  # console text, formerly printed directly
+    "clue_read", "key_picked", "box_opened", "box_locked", "fruit_collected", "room_solved",
+    "switch_pressed", "room_entered", "game_completed", "time_up", "camera_changed", "dropped",
+})
+
+def json_line(record):
+    return json.dumps(record, separators=(",", ":"))
+
+def console_line(record):
+    # Only the console text; typed records are left to the JSON log.
+    return record["text"] if record["event"] == "message" else None
+
+class EventLog:
+    def __init__(self, capacity=4096, batch=256, interval=0.05):
+        self.capacity = capacity
+        self.batch = batch
+        self.interval = interval
+        self.queue = collections.deque()
+        self.sinks = []  # (stream, format) pairs
+        self.running = False
+        self.emitted = 0
+        self.dropped = 0
+        self.reported_drops = 0
+        self.written = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def emit(self, event, **fields):
+        # False when no writer is running, so callers can fall back.
+        if not self.running:
+            return False
+        if event not in EVENT_TYPES:
+            raise ValueError(f"unknown event type {event!r}")
+        if len(self.queue) >= self.capacity:
+            self.dropped += 1
+            return True
+        self.queue.append({"event": event, "time": round(time.time(), 3), **fields})
+        self.emitted += 1
+        return True
+
+    def start(self, sinks=None):
+        # sinks: (stream, format) pairs; format returns a line or None to skip.
+        if self.running:
+            return self
+        self.sinks = list(sinks) if sinks is not None else [(sys.stdout, console_line)]
+        self.stopping.clear()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="event log", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        # Stops accepting records, then writes whatever is still queued.
+        if not self.running:
+            return
+        self.running = False
+        self.stopping.set()
+        if threading.current_thread() is not self.thread:
+            self.thread.join()
+
+    def take(self):
+        records = []
+        while len(records) < self.batch:
+            try:
+                records.append(self.queue.popleft())
+            except IndexError:
+                break
+        if self.dropped > self.reported_drops:
+            records.append({"event": "dropped", "time": round(time.time(), 3),
+                            "count": self.dropped - self.reported_drops})
+            self.reported_drops = self.dropped
+        return records
+
+    def write(self, records):
+        for stream, format in self.sinks:
+            lines = [line for line in map(format, records) if line is not None]
+            if not lines:
+                continue
+            try:
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except (OSError, ValueError):
+                pass  # a closed pipe or file must not take the writer down
+        self.written += len(records)
+
+    def run(self):
+        while True:
+            stopping = self.stopping.wait(self.interval)
+            while True:
+                records = self.take()
+                if not records:
+                    break
+                self.write(records)
+            if stopping:
+                return
@@ -0,0 +1,87 @@
+import csv
+import time
+
+import numpy as np
+
+# Per-phase frame timings kept in a fixed-size ring buffer. Phases are
+# timed back to back with lap(): each lap records the time since the
+# previous mark, so instrumenting a function costs one perf_counter() call
+# per phase and nothing is allocated per frame. Times are CPU-side wall
+# clock in milliseconds; GL work queued by a phase may land in a later one
+# (usually the buffer swap). Counters are per-frame integers (such as
+# sphere tessellations) stored beside the timings and exported with them.
+
+class FrameProfiler:
+    def __init__(self, phases, capacity=1024, counters=(), row="frame"):
+        self.phases = list(phases)
+        self.row = row  # what one recorded row is, for the CSV header
+        self.column = {name: i for i, name in enumerate(self.phases)}
+        self.samples = np.zeros((capacity, len(self.phases)))
+        self.frame_ids = np.zeros(capacity, dtype=np.int64)
+        self.current = np.zeros(len(self.phases))
+        self.counters = list(counters)
+        self.counter_column = {name: i for i, name in enumerate(self.counters)}
+        self.counts = np.zeros((capacity, len(self.counters)), dtype=np.int64)
+        self.current_counts = np.zeros(len(self.counters), dtype=np.int64)
+        self.frames = 0
+        self.last = time.perf_counter()
+
+    @property
+    def capacity(self):
+        return len(self.samples)
+
+    def mark(self):
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.current[self.column[phase]] += (now - self.last) * 1000.0
+        self.last = now
+
+    def count(self, counter, value):
+        self.current_counts[self.counter_column[counter]] = value
+
+    def end_frame(self):
+        slot = self.frames % self.capacity
+        self.samples[slot] = self.current
+        self.counts[slot] = self.current_counts
+        self.frame_ids[slot] = self.frames
+        self.current[:] = 0.0
+        self.current_counts[:] = 0
+        self.frames += 1
+
+    def ordered(self):
+        # Recorded rows, oldest first.
+        count = min(self.frames, self.capacity)
+        start = self.frames - count
+        slots = np.arange(start, self.frames) % self.capacity
+        return self.frame_ids[slots], self.samples[slots]
+
+    def ordered_counts(self):
+        count = min(self.frames, self.capacity)
+        slots = np.arange(self.frames - count, self.frames) % self.capacity
+        return self.counts[slots]
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        _, samples = self.ordered()
+        if not len(samples):
+            return {}
+        table = np.percentile(samples, quantiles, axis=0)
+        return {phase: table[:, i] for i, phase in enumerate(self.phases)}
+
+    def summary_lines(self, quantiles=(50, 95, 99)):
+        header = "phase".ljust(14) + "".join(f"p{q:<7}" for q in quantiles)
+        lines = [header]
+        for phase, values in self.percentiles(quantiles).items():
+            lines.append(phase.ljust(14) + "".join(f"{value:<8.2f}" for value in values))
+        return lines
+
+    def write_csv(self, path):
+        frame_ids, samples = self.ordered()
+        counts = self.ordered_counts()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([self.row] + [phase + "_ms" for phase in self.phases] + self.counters)
+            for frame, row, counted in zip(frame_ids.tolist(), samples.tolist(), counts.tolist()):
+                writer.writerow([frame] + [f"{value:.4f}" for value in row] + counted)
+        return len(frame_ids)
@@ -0,0 +1,617 @@
+# Everything in this module is plain game logic and must not import OpenGL,
+# so the game can be stepped headlessly (see headless.py).
+
+import math
+import random
+
+from entity_store import (EntityStore, EntityView, KindList, KIND_BOX, KIND_CLUE, KIND_FRUIT,
+                          KIND_KEY, KIND_NAMES, KIND_SIZES, FLAG_COLLECTED, FLAG_LOCKED, FLAG_OPENED,
+                          FLAG_READ, flag_property, fruit_property, text_property)
+from collision import CollisionWorld
+from event_log import EventLog
+from levels import DEFAULT_LEVEL, load_level
+from room_streaming import RoomResidency
+from spatial_index import SpatialGrid
+
+ROOM_SIZE = 20.0
+WALL_HEIGHT = 8.0
+TIME_LIMIT = 60
+FLOOR_Z = 0.0
+GATE_WIDTH = 3.0
+GATE_HEIGHT = 4.0
+
+PLAYER_HEIGHT = 1.7
+PLAYER_RADIUS = 0.5
+MOVE_SPEED = 0.15
+ROTATION_SPEED = 2.0
+MOUSE_SENSITIVITY = 0.2
+
+# Game logic advances in fixed steps of SIM_DT seconds, independent of the
+# frame rate (see simulation_thread.py). When ticks fall behind, up to
+# MAX_SIM_STEPS are run to catch up; anything beyond that is dropped.
+SIM_HZ = 60
+SIM_DT = 1.0 / SIM_HZ
+MAX_SIM_STEPS = 5
+
+COLOR_APPLE = (0.9, 0.1, 0.1)
+COLOR_BANANA = (0.95, 0.9, 0.2)
+COLOR_ORANGE = (1.0, 0.5, 0.0)
+COLOR_GRAPE = (0.5, 0.0, 0.5)
+
+# Set to False to silence console output, e.g. for headless runs.
+VERBOSE = True
+
+# Typed game events and console text; the game starts its writer so that
+# nothing here waits on stdout. Without one (headless tools), say() prints.
+events = EventLog()
+
+def say(text=""):
+    if VERBOSE and not events.emit("message", text=text):
+        print(text)
+
+def event(kind, **fields):
+    events.emit(kind, sim_time=round(game.sim_time, 3), room=game.current_room, **fields)
+
+# Filled in from the level file by use_level() at the bottom of this module.
+REQUIRED_FRUITS = []
+ROOM_OFFSETS = []
+GATE_LINKS = {}
+current_level = None
+residency = None
+
+class GameState:
+    def __init__(self):
+        self.player_x = 0.0
+        self.player_y = PLAYER_HEIGHT
+        self.player_z = 5.0
+        self.player_rotation_y = 0.0
+        self.player_rotation_x = 0.0
+        self.camera_mode = "first_person"
+        self.camera_distance = 5.0
+        self.move_forward = False
+        self.move_backward = False
+        self.move_left = False
+        self.move_right = False
+        self.rotate_left = False
+        self.rotate_right = False
+        self.sim_time = 0.0
+        self.time_remaining = TIME_LIMIT
+        self.current_room = 0
+        self.gate_open = [False] * len(ROOM_OFFSETS)
+        self.gate_opening_progress = [0.0] * len(ROOM_OFFSETS)
+        self.gate_open_time = [0] * len(ROOM_OFFSETS)
+        self.collected_fruits = []
+        self.required_fruits = list(REQUIRED_FRUITS)
+        self.keys_found = 0
+        self.held_object = None
+        self.nearby_interactive = None
+        self.current_message = ""
+        self.message_timer = 0
+        self.message_duration = 3.0
+        self.final_score = 0
+        self.game_completed = False
+        self.game_over = False
+        self.prev_player_x = self.player_x
+        self.prev_player_z = self.player_z
+        self.prev_player_rotation_y = self.player_rotation_y
+        self.prev_gate_opening_progress = list(self.gate_opening_progress)
+
+    def save_previous_state(self):
+        self.prev_player_x = self.player_x
+        self.prev_player_z = self.player_z
+        self.prev_player_rotation_y = self.player_rotation_y
+        self.prev_gate_opening_progress = list(self.gate_opening_progress)
+
+game = GameState()
+
+class SimulationClock:
+    # How far the frame being drawn is between the previous tick and the
+    # current one; SimulationThread.alpha() sets it before each frame.
+    def __init__(self):
+        self.alpha = 0.0
+
+    def lerp(self, previous, current):
+        return previous + (current - previous) * self.alpha
+
+sim_clock = SimulationClock()
+
+
+# ROOM 1: FRUIT PUZZLE
+
+FRUIT_COLORS = {
+    "apple": COLOR_APPLE,
+    "banana": COLOR_BANANA,
+    "orange": COLOR_ORANGE,
+    "grape": COLOR_GRAPE
+}
+
+# Room 1 props live in a struct-of-arrays EntityStore; these classes are
+# views over one row of it and keep the attributes the game code expects.
+room_entities = EntityStore()
+
+class Fruit(EntityView):
+    __slots__ = ()
+    kind = KIND_FRUIT
+    size = KIND_SIZES[KIND_FRUIT][0]
+    type = fruit_property()
+    collected = flag_property(FLAG_COLLECTED)
+
+    def __init__(self, fruit_type, position, store=room_entities):
+        self.attach(store, position, fruit=fruit_type)
+
+    @property
+    def color(self):
+        return FRUIT_COLORS.get(self.type, (0.5, 0.5, 0.5))
+
+class Box(EntityView):
+    __slots__ = ()
+    kind = KIND_BOX
+    size = KIND_SIZES[KIND_BOX]
+    locked = flag_property(FLAG_LOCKED)
+    opened = flag_property(FLAG_OPENED)
+    contains_fruit = fruit_property()
+    riddle = text_property()
+
+    def __init__(self, position, locked=False, contains_fruit=None, riddle="", store=room_entities):
+        self.attach(store, position, FLAG_LOCKED if locked else 0, fruit=contains_fruit, text=riddle)
+
+class Key(EntityView):
+    __slots__ = ()
+    kind = KIND_KEY
+    size = KIND_SIZES[KIND_KEY][0]
+    collected = flag_property(FLAG_COLLECTED)
+    clue_text = text_property()
+
+    def __init__(self, position, clue_text="", store=room_entities):
+        self.attach(store, position, text=clue_text)
+
+class Clue(EntityView):
+    __slots__ = ()
+    kind = KIND_CLUE
+    size = KIND_SIZES[KIND_CLUE][0]
+    read = flag_property(FLAG_READ)
+    text = text_property()
+
+    def __init__(self, position, text, store=room_entities):
+        self.attach(store, position, text=text)
+
+ENTITY_VIEWS = [Clue, Box, Key, Fruit]
+
+boxes = KindList(room_entities, KIND_BOX, Box)
+fruits = KindList(room_entities, KIND_FRUIT, Fruit)
+keys = KindList(room_entities, KIND_KEY, Key)
+clues = KindList(room_entities, KIND_CLUE, Clue)
+
+# The props of the room the player is in; the residency manager holds the
+# built rooms (see room_streaming.py).
+room_content = None
+
+def install_room(number):
+    global room_content
+    room_content = residency.acquire(number)
+    room_content.install(room_entities)
+    residency.retain({number, GATE_LINKS.get(number)})
+
+def initialize_room1_objects():
+    install_room(0)
+
+# Room 1 props are indexed by store row in a uniform grid so interaction and
+# collision checks only look at objects near the player. Collected keys and
+# fruits are dropped from the interaction index; boxes and clues stay
+# interactable. Entity kinds are numbered in interaction priority order.
+INTERACT_RANGE = 2.0
+interaction_index = SpatialGrid(cell_size=INTERACT_RANGE)
+box_collision_index = SpatialGrid(cell_size=2.0)
+
+def rebuild_room1_index():
+    # Compiled levels ship both grids prebuilt.
+    global interaction_index, box_collision_index
+    grids = room_content.packed_grids(room_entities) if room_content is not None else None
+    if grids is not None:
+        interaction_index, box_collision_index = grids
+        rebuild_collision_world()
+        return
+    
+    interaction_index = SpatialGrid(cell_size=INTERACT_RANGE)
+    box_collision_index = SpatialGrid(cell_size=2.0)
+    for index in range(room_entities.count):
+        x, y, z = room_entities.positions[index]
+        if room_entities.flags[index] & FLAG_COLLECTED == 0:
+            interaction_index.insert(index, x, z)
+        if room_entities.kinds[index] == KIND_BOX:
+            w, h, d = KIND_SIZES[KIND_BOX]
+            box_collision_index.insert(index, x, z, w/2, d/2)
+    rebuild_collision_world()
+
+def get_nearby_object():
+    px, pz = game.player_x, game.player_z
+    candidates = interaction_index.query_ids(
+        px - INTERACT_RANGE, pz - INTERACT_RANGE, px + INTERACT_RANGE, pz + INTERACT_RANGE)
+    if not candidates:
+        return None
+    
+    nearby = room_entities.uncollected(room_entities.within_radius(candidates, px, pz, INTERACT_RANGE))
+    if not len(nearby):
+        return None
+    
+    index = room_entities.first_by_kind(nearby)
+    kind = room_entities.kinds[index]
+    return (KIND_NAMES[kind], ENTITY_VIEWS[kind].at(room_entities, index))
+
+def interact_room1():
+    nearby = get_nearby_object()
+    
+    if nearby:
+        obj_type, obj = nearby
+        
+        if obj_type == "clue":
+            obj.read = True
+            game.current_message = obj.text
+            game.message_timer = game.sim_time
+            say(f"Clue: {obj.text}")
+            event("clue_read", index=obj.index)
+        
+        elif obj_type == "key":
+            obj.collected = True
+            interaction_index.remove(obj.index)
+            game.keys_found += 1
+            if obj.clue_text:
+                game.current_message = obj.clue_text
+                game.message_timer = game.sim_time
+            say(f"Picked up a key! Keys found: {game.keys_found}")
+            event("key_picked", index=obj.index, keys=game.keys_found)
+            if obj.clue_text:
+                say(f"Key hint: {obj.clue_text}")
+        
+        elif obj_type == "box":
+            if obj.locked and game.keys_found > 0:
+                obj.locked = False
+                obj.opened = True
+                game.keys_found -= 1
+                say("Unlocked the box!")
+                event("box_opened", index=obj.index, unlocked=True, fruit=obj.contains_fruit, keys=game.keys_found)
+                if obj.riddle:
+                    say(f"Box riddle: {obj.riddle}")
+                
+                if obj.contains_fruit:
+                    game.collected_fruits.append(obj.contains_fruit)
+                    say(f"Found and collected a {obj.contains_fruit}! ({len(game.collected_fruits)}/{len(game.required_fruits)})")
+                    event("fruit_collected", fruit=obj.contains_fruit, collected=len(game.collected_fruits))
+                    game.current_message = f"You got a {obj.contains_fruit}!"
+                    game.message_timer = game.sim_time
+                    check_puzzle_solved()
+            
+            elif not obj.locked and not obj.opened:
+                obj.opened = True
+                event("box_opened", index=obj.index, unlocked=False, fruit=obj.contains_fruit, keys=game.keys_found)
+                if obj.riddle:
+                    say(f"Box riddle: {obj.riddle}")
+                    game.current_message = obj.riddle
+                    game.message_timer = game.sim_time
+                if obj.contains_fruit:
+                    game.collected_fruits.append(obj.contains_fruit)
+                    say(f"Found and collected a {obj.contains_fruit}! ({len(game.collected_fruits)}/{len(game.required_fruits)})")
+                    event("fruit_collected", fruit=obj.contains_fruit, collected=len(game.collected_fruits))
+                    game.current_message = f"You got a {obj.contains_fruit}!"
+                    game.message_timer = game.sim_time
+                    check_puzzle_solved()
+            
+            elif obj.locked:
+                if obj.riddle:
+                    game.current_message = obj.riddle
+                    game.message_timer = game.sim_time
+                    say(f"Box riddle: {obj.riddle}")
+                say("This box is locked! Find a key to open it.")
+                event("box_locked", index=obj.index)
+        
+        elif obj_type == "fruit":
+            obj.collected = True
+            interaction_index.remove(obj.index)
+            game.collected_fruits.append(obj.type)
+            say(f"Collected {obj.type}! ({len(game.collected_fruits)}/{len(game.required_fruits)})")
+            event("fruit_collected", fruit=obj.type, collected=len(game.collected_fruits))
+            check_puzzle_solved()
+
+def check_puzzle_solved():
+    collected_types = set(game.collected_fruits)
+    required_types = set(game.required_fruits)
+    
+    if required_types.issubset(collected_types):
+        if not game.gate_open[0]:
+            open_gate(0)
+            event("room_solved")
+            say("\n" + "="*50)
+            say("ROOM 1 PUZZLE SOLVED! The gate is opening...")
+            say("="*50 + "\n")
+
+def check_box_collision(x, z, box):
+    box_x, box_y, box_z = box.position
+    w, h, d = box.size
+    return (abs(x - box_x) < (w/2 + PLAYER_RADIUS) and
+            abs(z - box_z) < (d/2 + PLAYER_RADIUS))
+
+# ROOM 2: COLOR SEQUENCE PUZZLE
+
+COLOR_SEQUENCE = ['red', 'blue', 'green', 'yellow']
+AVAILABLE_COLORS = []
+color_switches = []
+current_sequence = []
+sequence_correct = False
+SWITCH_COOLDOWN = 0.5
+last_switch_time = -SWITCH_COOLDOWN
+ROOM2_COLLIDERS = []
+player_pos = [0, 0, 0]
+
+def randomize_color_sequence(rng=random):
+    global COLOR_SEQUENCE
+    COLOR_SEQUENCE = [AVAILABLE_COLORS[i] for i in range(len(AVAILABLE_COLORS))]
+    for i in range(len(COLOR_SEQUENCE)):
+        swap_idx = rng.randint(0, len(COLOR_SEQUENCE) - 1)
+        COLOR_SEQUENCE[i], COLOR_SEQUENCE[swap_idx] = COLOR_SEQUENCE[swap_idx], COLOR_SEQUENCE[i]   
+    if current_level.sequence_length is not None:
+        del COLOR_SEQUENCE[current_level.sequence_length:]
+    say(f"Room 2 - Color sequence: {COLOR_SEQUENCE}")
+
+def rebuild_room2_colliders():
+    global ROOM2_COLLIDERS
+    ROOM2_COLLIDERS = []
+    for switch in color_switches:
+        x, y = switch["pos"]
+        ROOM2_COLLIDERS.append((x, y, 30, 30))
+    ROOM2_COLLIDERS.append((0, 0, 35, 35))
+    rebuild_collision_world()
+
+def room_offset_y(room_num):
+    return ROOM_OFFSETS[room_num]
+
+def try_activate_switch():
+    global current_sequence, sequence_correct, last_switch_time
+    
+    if game.current_room != 1:
+        return
+    
+    if game.sim_time - last_switch_time < SWITCH_COOLDOWN:
+        return
+    
+    room_base_y = room_offset_y(game.current_room)
+    
+    if sequence_correct and not game.gate_open[1]:
+        if activate_buzzer(room_base_y):
+            return
+    
+    nearest_switch = find_nearest_switch(room_base_y)
+    if nearest_switch:
+        handle_switch_activation(nearest_switch)
+
+def activate_buzzer(room_base_y):
+    buzzer_x, buzzer_z = 0, 0
+    buzzer_dist = calculate_distance(game.player_x, game.player_z, buzzer_x, buzzer_z)
+    
+    if buzzer_dist < 1.0:
+        update_gate_status()
+        return True
+    return False
+
+def find_nearest_switch(room_base_y):
+    nearest_switch = None
+    nearest_dist = float('inf')
+    
+    for switch in color_switches:
+        x, y = switch["pos"]
+        world_x = x / 100.0
+        world_z = y / 100.0
+        dist = calculate_distance(game.player_x, game.player_z, world_x, world_z)
+        
+        if dist < 1.0 and dist < nearest_dist:
+            nearest_dist = dist
+            nearest_switch = switch
+    
+    return nearest_switch
+
+def calculate_distance(x1, y1, x2, y2):
+    return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+
+def handle_switch_activation(nearest_switch):
+    global current_sequence, sequence_correct, last_switch_time
+    
+    last_switch_time = game.sim_time
+    expected_next = len(current_sequence)
+    
+    if is_valid_switch_activation(nearest_switch, expected_next):
+        nearest_switch["active"] = True
+        current_sequence.append(nearest_switch["color"])
+        say(f"Activated {nearest_switch['color']} switch. Sequence: {current_sequence}")
+        event("switch_pressed", color=nearest_switch["color"], correct=True, progress=len(current_sequence))
+        
+        if len(current_sequence) == len(COLOR_SEQUENCE):
+            sequence_correct = True
+            say("Color sequence complete! Go to central buzzer and press F")
+    else:
+        event("switch_pressed", color=nearest_switch["color"], correct=False, progress=0)
+        say(f"Wrong switch! Expected {COLOR_SEQUENCE[expected_next] if expected_next < len(COLOR_SEQUENCE) else 'none'}, got {nearest_switch['color']}")
+        reset_color_sequence()
+
+def is_valid_switch_activation(nearest_switch, expected_next):
+    return (expected_next < len(COLOR_SEQUENCE) and
+            nearest_switch["color"] == COLOR_SEQUENCE[expected_next])
+
+def update_gate_status():
+    open_gate(1)
+    game.gate_open_time[1] = game.sim_time
+    say(f"Buzzer activated! Game complete!")
+
+def reset_color_sequence():
+    clear_current_sequence()
+    deactivate_all_switches()
+
+def clear_current_sequence():
+    global current_sequence, sequence_correct
+    current_sequence = []
+    sequence_correct = False
+
+def deactivate_all_switches():
+    for switch in color_switches:
+        switch["active"] = False
+
+# Shared game logic functions:
+
+def open_gate(room):
+    # Start building the room behind the gate while the player walks to it.
+    game.gate_open[room] = True
+    residency.prefetch(GATE_LINKS.get(room))
+
+# Walls, the gate, props and the Room 2 switches and buzzer (ROOM2_COLLIDERS,
+# centre and half size in 1/100 units) all block movement; see collision.py.
+collision_world = CollisionWorld()
+
+def rebuild_collision_world():
+    global collision_world
+    world = CollisionWorld()
+    world.add_room_walls(ROOM_SIZE, GATE_WIDTH)
+    if game.current_room == 1:
+        for x, z, half_x, half_z in ROOM2_COLLIDERS:
+            world.add_box(x / 100.0, z / 100.0, half_x / 100.0, half_z / 100.0)
+    w, h, d = KIND_SIZES[KIND_BOX]
+    world.set_props(box_collision_index, room_entities, w/2, d/2)
+    collision_world = world
+
+def can_move_to(new_x, new_z):
+    collision_world.set_gate_open(game.gate_open[game.current_room])
+    return not collision_world.overlaps(new_x, new_z, PLAYER_RADIUS)
+
+def interact():
+    if game.current_room == 1:
+        try_activate_switch()
+        return
+    
+    interact_room1()
+
+def update_player_movement():
+    if game.camera_mode == "first_person":
+        if game.rotate_left:
+            game.player_rotation_y -= ROTATION_SPEED
+        if game.rotate_right:
+            game.player_rotation_y += ROTATION_SPEED
+    else:
+        if game.rotate_left:
+            game.player_rotation_y -= ROTATION_SPEED
+        if game.rotate_right:
+            game.player_rotation_y += ROTATION_SPEED
+    
+    if game.move_forward or game.move_backward or game.move_left or game.move_right:
+        angle = math.radians(game.player_rotation_y)
+        
+        dx = 0
+        dz = 0
+        
+        if game.camera_mode == "first_person":
+            if game.move_forward:
+                dx += math.cos(math.radians(game.player_rotation_y)) * MOVE_SPEED
+                dz += math.sin(math.radians(game.player_rotation_y)) * MOVE_SPEED
+            if game.move_backward:
+                dx -= math.cos(math.radians(game.player_rotation_y)) * MOVE_SPEED
+                dz -= math.sin(math.radians(game.player_rotation_y)) * MOVE_SPEED
+            if game.move_left:
+                dx += math.sin(math.radians(game.player_rotation_y)) * MOVE_SPEED
+                dz -= math.cos(math.radians(game.player_rotation_y)) * MOVE_SPEED
+            if game.move_right:
+                dx -= math.sin(math.radians(game.player_rotation_y)) * MOVE_SPEED
+                dz += math.cos(math.radians(game.player_rotation_y)) * MOVE_SPEED
+        else:
+            if game.move_forward:
+                dx -= math.sin(angle) * MOVE_SPEED
+                dz -= math.cos(angle) * MOVE_SPEED
+            if game.move_backward:
+                dx += math.sin(angle) * MOVE_SPEED
+                dz += math.cos(angle) * MOVE_SPEED
+            if game.move_left:
+                dx -= math.cos(angle) * MOVE_SPEED
+                dz += math.sin(angle) * MOVE_SPEED
+            if game.move_right:
+                dx += math.cos(angle) * MOVE_SPEED
+                dz -= math.sin(angle) * MOVE_SPEED
+        
+        collision_world.set_gate_open(game.gate_open[game.current_room])
+        game.player_x, game.player_z = collision_world.move(game.player_x, game.player_z,
+                                                            dx, dz, PLAYER_RADIUS)
+
+def simulation_step():
+    game.save_previous_state()
+    update_player_movement()
+    
+    next_room = GATE_LINKS.get(game.current_room)
+    if next_room is not None and game.gate_open[game.current_room]:
+        if game.player_z > ROOM_SIZE/2 + 0.5:
+            game.current_room = next_room
+            install_room(next_room)
+            rebuild_room1_index()
+            game.player_z = -ROOM_SIZE/2 + 2.0
+            game.player_x = 0.0
+            game.save_previous_state()
+            event("room_entered")
+            say("\n" + "="*60)
+            say(" "*15 + "ENTERING ROOM 2")
+            say("="*60)
+            say("\nROOM 2: Color Sequence Puzzle")
+            say("-" * 60)
+            say(f"Sequence to follow: {COLOR_SEQUENCE}")
+            say("  - Activate the colored switches in the correct order")
+            say("  - Press F near each switch to activate it")
+            say("  - After completing the sequence, activate the central buzzer")
+            say("="*60 + "\n")
+    
+    if game.gate_open[game.current_room] and game.gate_opening_progress[game.current_room] < 1.0:
+        game.gate_opening_progress[game.current_room] += 0.02
+    
+    game.sim_time += SIM_DT
+    game.time_remaining = max(0, TIME_LIMIT - int(game.sim_time))
+    
+    if game.time_remaining <= 0 and not all(game.gate_open) and not game.game_over:
+        game.game_over = True
+        event("time_up", fruits=len(game.collected_fruits), switches=len(current_sequence))
+        say("\nTIME'S UP! Game Over.")
+    
+    final_room = game.current_room not in GATE_LINKS
+    if final_room and game.gate_open[game.current_room] and not game.game_completed:
+        game.game_completed = True
+        game.final_score = game.time_remaining
+        event("game_completed", score=game.final_score)
+        say("\n" + "="*60)
+        say(" "*15 + "CONGRATULATIONS!")
+        say("="*60)
+        say("\nYou have escaped the Puzzle Prison!")
+        say("Both rooms completed successfully!")
+        say(f"Your Score: {game.final_score} seconds remaining!")
+        say("="*60 + "\n")
+
+def new_game(seed=None):
+    # The same seed always produces the same session (see replay.py).
+    global last_switch_time
+    rng = random.Random(seed)
+    
+    game.__init__()
+    initialize_room1_objects()
+    rebuild_room1_index()
+    reset_color_sequence()
+    last_switch_time = -SWITCH_COOLDOWN
+    randomize_color_sequence(rng)
+    rebuild_room2_colliders()
+
+def use_level(level):
+    # Lists are updated in place since other modules import them by name.
+    global current_level, residency, room_content
+    current_level = level
+    if residency is not None:
+        residency.shutdown()
+    residency = RoomResidency(level)
+    room_content = None
+    REQUIRED_FRUITS[:] = level.required_fruits
+    ROOM_OFFSETS[:] = [room.offset_y for room in level.rooms]
+    GATE_LINKS.clear()
+    GATE_LINKS.update({number: room.gate_to for number, room in enumerate(level.rooms)
+                       if room.gate_to is not None})
+    color_switches[:] = level.switch_states()
+    AVAILABLE_COLORS[:] = level.colors()
+    game.__init__()
+
+use_level(load_level(DEFAULT_LEVEL))
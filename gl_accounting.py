@@ -0,0 +1,169 @@
+import sys
+from collections import defaultdict
+
+from OpenGL.GL import GL_COMPILE_AND_EXECUTE
+
+# Opt-in accounting of the GL calls the renderer makes from Python.
+# install() replaces entry points in a module's namespace (the renderer
+# star-imports them, so its functions look them up there) with wrappers
+# that count each call against the function that made it. Besides raw
+# calls, each frame tallies the work they stand for: draw calls, vertices,
+# state changes and bitmap glyphs. Work recorded into a display list is
+# credited to the functions that compiled it every time the list is called,
+# so a cached draw shows up as draws but not as Python calls. Calls made
+# from the module's GL_HELPERS (shared drawing helpers) are charged to the
+# function that called the helper.
+
+ENTRY_POINTS = ("glBegin", "glEnd", "glVertex3f", "glNormal3f", "glColor3f",
+                "glPushMatrix", "glPopMatrix", "glTranslatef", "glRotatef", "glScalef",
+                "glLoadIdentity", "glMatrixMode", "glEnable", "glDisable",
+                "glBindBuffer", "glEnableClientState", "glDisableClientState",
+                "glVertexPointer", "glNormalPointer", "glColorPointer",
+                "glBufferData", "glBufferSubData",
+                "glDrawArrays", "glMultiDrawArrays", "glDrawElements", "glNewList", "glEndList", "glCallList",
+                "glRasterPos2f", "gluSphere", "gluCylinder", "glutBitmapCharacter")
+STATE_CHANGES = {"glColor3f", "glPushMatrix", "glPopMatrix", "glTranslatef", "glRotatef", "glScalef",
+                 "glLoadIdentity", "glMatrixMode", "glEnable", "glDisable", "glBindBuffer",
+                 "glEnableClientState", "glDisableClientState", "glVertexPointer",
+                 "glNormalPointer", "glColorPointer", "glRasterPos2f"}
+WORK_KINDS = ("draw_calls", "vertices", "state_changes", "bitmaps")
+
+class FrameCounts:
+    def __init__(self):
+        self.calls = defaultdict(int)  # (function, entry point) -> calls
+        self.work = defaultdict(int)  # (function, kind) -> amount
+
+    def add(self, other):
+        for key, value in other.calls.items():
+            self.calls[key] += value
+        for key, value in other.work.items():
+            self.work[key] += value
+
+    def totals(self):
+        totals = dict.fromkeys(("gl_calls",) + WORK_KINDS, 0)
+        totals["gl_calls"] = sum(self.calls.values())
+        for (function, kind), value in self.work.items():
+            totals[kind] += value
+        return totals
+
+    def by_function(self):
+        functions = defaultdict(lambda: {"gl_calls": 0, **dict.fromkeys(WORK_KINDS, 0), "entry_points": {}})
+        for (function, entry), value in self.calls.items():
+            functions[function]["gl_calls"] += value
+            functions[function]["entry_points"][entry] = value
+        for (function, kind), value in self.work.items():
+            functions[function][kind] += value
+        return dict(functions)
+
+class GLAccounting:
+    def __init__(self, module, entry_points=ENTRY_POINTS):
+        self.module = module
+        self.entry_points = [name for name in entry_points if hasattr(module, name)]
+        self.helpers = set(getattr(module, "GL_HELPERS", ()))
+        self.originals = {}
+        self.lists = {}
+        self.compiling = None  # (list id, also executes, recorded work) inside glNewList
+        self.reset()
+
+    def reset(self):
+        self.current = FrameCounts()
+        self.last = FrameCounts()
+        self.summed = FrameCounts()
+        self.frames = 0
+
+    def install(self):
+        for name in self.entry_points:
+            if name not in self.originals:
+                self.originals[name] = getattr(self.module, name)
+                setattr(self.module, name, self.wrapper(name, self.originals[name]))
+        return self
+
+    def remove(self):
+        for name, original in self.originals.items():
+            setattr(self.module, name, original)
+        self.originals.clear()
+
+    def end_frame(self):
+        self.last = self.current
+        self.summed.add(self.current)
+        self.current = FrameCounts()
+        self.frames += 1
+
+    def wrapper(self, name, original):
+        handler = getattr(self, "on_" + name, None)
+        state_change = name in STATE_CHANGES
+        def counted(*args):
+            frame = sys._getframe(1)
+            while frame.f_code.co_name in self.helpers:
+                frame = frame.f_back
+            function = frame.f_code.co_name
+            self.current.calls[function, name] += 1
+            if state_change:
+                self.credit(function, "state_changes", 1)
+            if handler is not None:
+                handler(function, *args)
+            return original(*args)
+        counted.__name__ = name
+        return counted
+
+    def credit(self, function, kind, amount):
+        if self.compiling is not None:
+            self.compiling[2][function, kind] += amount
+            if not self.compiling[1]:
+                return
+        self.current.work[function, kind] += amount
+
+    def on_glBegin(self, function, mode):
+        self.credit(function, "draw_calls", 1)
+
+    def on_glVertex3f(self, function, *args):
+        self.credit(function, "vertices", 1)
+
+    def on_glDrawArrays(self, function, mode, first, count):
+        self.credit(function, "draw_calls", 1)
+        self.credit(function, "vertices", count)
+
+    def on_glMultiDrawArrays(self, function, mode, firsts, counts, draws):
+        self.credit(function, "draw_calls", 1)
+        self.credit(function, "vertices", int(sum(counts[:draws])))
+
+    def on_glDrawElements(self, function, mode, count, kind, indices):
+        self.credit(function, "draw_calls", 1)
+        self.credit(function, "vertices", count)
+
+    def on_gluSphere(self, function, *args):
+        self.credit(function, "draw_calls", 1)
+
+    on_gluCylinder = on_gluSphere
+
+    def on_glutBitmapCharacter(self, function, font, char):
+        self.credit(function, "bitmaps", 1)
+
+    def on_glNewList(self, function, list_id, mode):
+        self.compiling = (list_id, mode == GL_COMPILE_AND_EXECUTE, defaultdict(int))
+
+    def on_glEndList(self, function):
+        if self.compiling is not None:
+            self.lists[self.compiling[0]] = dict(self.compiling[2])
+            self.compiling = None
+
+    def on_glCallList(self, function, list_id):
+        for (recorded_by, kind), amount in self.lists.get(list_id, {}).items():
+            self.credit(recorded_by, kind, amount)
+
+    def per_frame(self):
+        frames = max(self.frames, 1)
+        return {kind: value / frames for kind, value in self.summed.totals().items()}
+
+    def table(self):
+        # Per-function means over every recorded frame.
+        counts, frames = self.summed, max(self.frames, 1)
+        rows = sorted(counts.by_function().items(), key=lambda item: -item[1]["gl_calls"])
+        lines = [f"{'function':24} {'gl calls':>9} {'draws':>7} {'vertices':>9} {'state':>7} {'bitmaps':>8}  top entry points"]
+        for function, row in rows + [("total", counts.totals())]:
+            busiest = sorted(row.get("entry_points", {}).items(), key=lambda item: -item[1])[:3]
+            entries = ", ".join(f"{entry} {value / frames:.1f}" for entry, value in busiest)
+            lines.append(f"{function:24} {row['gl_calls'] / frames:9.1f} {row['draw_calls'] / frames:7.1f} "
+                         f"{row['vertices'] / frames:9.1f} {row['state_changes'] / frames:7.1f} "
+                         f"{row['bitmaps'] / frames:8.1f}  {entries}")
+        return lines
@@ -0,0 +1,83 @@
+import argparse
+import random
+import time
+
+import game_logic as logic
+
+# Steps the game without GLUT or OpenGL, for regression runs and bots on
+# machines with no display. Game logic keeps its state in module globals,
+# so only one HeadlessGame should be active per process.
+
+MOVE_INPUTS = {
+    "forward": "move_forward",
+    "backward": "move_backward",
+    "left": "move_left",
+    "right": "move_right",
+    "rotate_left": "rotate_left",
+    "rotate_right": "rotate_right",
+}
+INPUTS = tuple(MOVE_INPUTS) + ("interact", "camera")
+
+class HeadlessGame:
+    def __init__(self, seed=None, verbose=False):
+        logic.VERBOSE = verbose
+        self.ticks = 0
+        self.reset(seed)
+
+    @property
+    def state(self):
+        return logic.game
+
+    @property
+    def done(self):
+        return logic.game.game_completed or logic.game.game_over
+
+    def reset(self, seed=None):
+        logic.new_game(seed)
+        self.ticks = 0
+        return logic.game
+
+    def step(self, inputs=()):
+        game = logic.game
+        for name, flag in MOVE_INPUTS.items():
+            setattr(game, flag, name in inputs)
+
+        if "camera" in inputs:
+            game.camera_mode = "third_person" if game.camera_mode == "first_person" else "first_person"
+        if "interact" in inputs:
+            logic.interact()
+
+        logic.simulation_step()
+        self.ticks += 1
+        return game
+
+def random_inputs(rng):
+    inputs = {name for name in MOVE_INPUTS if rng.random() < 0.3}
+    if rng.random() < 0.05:
+        inputs.add("interact")
+    return inputs
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Puzzle Prison game logic without a window")
+    parser.add_argument("--ticks", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    headless = HeadlessGame(seed=args.seed, verbose=args.verbose)
+    episodes = 1
+
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        headless.step(random_inputs(rng))
+        if headless.done:
+            headless.reset()
+            episodes += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"ticks: {args.ticks}  episodes: {episodes}  "
+          f"elapsed: {elapsed:.2f}s  ticks/s: {args.ticks / elapsed:,.0f}")
+
+if __name__ == "__main__":
+    main()
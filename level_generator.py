@@ -0,0 +1,422 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import game_logic as logic
+from entity_store import KIND_BOX, KIND_NAMES, KIND_SIZES
+from levels import LevelData
+from solver import EXIT_Z, ROOM1_CELL, NavGrid
+
+# Procedural levels for stress runs. Each one is the same JSON a level file
+# holds (see levels/prison.json), so LevelData.from_json() turns it into
+# the Room 1 props and Room 2 switches the game installs. Room 1 gets boxes
+# (some locked), keys, clues and loose fruits, with distractor fruits such
+# as grape among the required ones; Room 2 gets a number of switches, their
+# layout and how long the sequence is.
+#
+# Levels are generated and checked a batch at a time, and batches are
+# spread over worker processes. Batch n always comes from the seed and n
+# alone, so the output does not depend on the number of workers.
+#
+# A level is kept only if:
+#   - keys: there are at least as many keys as locked boxes holding a
+#     required fruit, and every required fruit has a source. Keys lie on
+#     the floor and open any locked box, so a key can never end up inside
+#     a locked box;
+#   - Room 1: the player can walk from the spawn to the gate, and to a spot
+#     where interacting picks each prop. Clues and boxes are never removed,
+#     so a prop is unreachable if every spot in its range is also in range
+#     of a clue or box that takes priority over it. Walkability is a flood
+#     fill over the solver's navigation grid;
+#   - Room 2: every switch and the buzzer are far enough from each other,
+#     the walls and the spawn that the player fits between any two of them
+#     and can reach each one.
+
+FRUITS = list(logic.FRUIT_COLORS)
+RIDDLES = {
+    "apple": "I am red and keep doctors away. What am I?",
+    "banana": "Yellow and curved, monkeys love me.",
+    "orange": "I am round and orange, and so is my name.",
+    "grape": "Purple and small, I grow in bunches.",
+}
+SWITCH_COLORS = {
+    "red": (0.9, 0.1, 0.1), "blue": (0.1, 0.1, 0.9), "green": (0.1, 0.9, 0.1),
+    "yellow": (0.95, 0.95, 0.1), "purple": (0.6, 0.2, 0.8), "cyan": (0.1, 0.8, 0.8),
+    "white": (0.9, 0.9, 0.9), "pink": (0.95, 0.5, 0.7),
+}
+SWITCH_NAMES = list(SWITCH_COLORS)
+
+ROOM1_SPAWN = (logic.GameState().player_x, logic.GameState().player_z)
+ROOM2_SPAWN = (0.0, -logic.ROOM_SIZE / 2 + 2.0)
+BUZZER_HALF = 0.35  # the larger collider in rebuild_room2_colliders(); switches are 0.3
+# Room 2 obstacles are small squares: inside a circle of radius half * sqrt(2).
+# When those circles, grown by the player's radius, neither overlap nor
+# touch the walls, the free space is connected, and it comes within reach
+# (1.0) of every switch and the buzzer.
+ROOM2_CLEARANCE = BUZZER_HALF * np.sqrt(2) + logic.PLAYER_RADIUS
+
+class Settings:
+    # (low, high) ranges are inclusive.
+    def __init__(self, boxes=(4, 8), locked=0.5, spare_keys=(0, 1), clues=(1, 3), loose_fruits=(0, 2),
+                 required_fruits=(2, 3), switches=(3, 6), sequence=(3, 6), spacing=3.0, jitter=0.4,
+                 switch_spacing=2.5, switch_jitter=0.2):
+        self.boxes = boxes
+        self.locked = locked
+        self.spare_keys = spare_keys
+        self.clues = clues
+        self.loose_fruits = loose_fruits
+        self.required_fruits = required_fruits
+        self.switches = switches
+        self.sequence = sequence
+        self.spacing = spacing
+        self.jitter = jitter
+        self.switch_spacing = switch_spacing
+        self.switch_jitter = switch_jitter
+
+def lattice(spacing, limit):
+    # Points `spacing` apart, centred on the room, at most `limit` from it.
+    count = int(2 * limit // spacing) + 1
+    axis = (np.arange(count) - (count - 1) / 2) * spacing
+    z, x = np.meshgrid(axis, axis, indexing="ij")
+    return np.stack([x.ravel(), z.ravel()], axis=1)
+
+class Draws:
+    # Every random number a batch needs, drawn as arrays up front so the
+    # per-level code below only indexes lists.
+    def __init__(self, rng, settings, size, slots, switch_slots):
+        def counts(bounds):
+            return rng.integers(bounds[0], bounds[1] + 1, size).tolist()
+
+        def orders(width):
+            return np.argsort(rng.random((size, width)), axis=1).tolist()
+
+        most = max(settings.boxes[1], len(FRUITS))
+        self.fruit_order = orders(len(FRUITS))
+        self.required = counts(settings.required_fruits)
+        self.loose_required = (rng.random((size, len(FRUITS))) < 0.2).tolist()
+        self.loose = counts(settings.loose_fruits)
+        self.loose_picks = rng.integers(0, len(FRUITS), (size, settings.loose_fruits[1])).tolist()
+        self.boxes = counts(settings.boxes)
+        self.filler_picks = rng.integers(0, len(FRUITS), (size, most)).tolist()
+        self.filled = (rng.random((size, most)) < 0.5).tolist()
+        self.box_order = orders(most)
+        self.locked = (rng.random((size, most)) < settings.locked).tolist()
+        self.spare_keys = counts(settings.spare_keys)
+        self.clues = counts(settings.clues)
+        self.slot_order = orders(len(slots))
+        self.spots = np.round(slots + rng.uniform(-settings.jitter, settings.jitter, (size,) + slots.shape), 2).tolist()
+        self.switches = counts(settings.switches)
+        self.color_order = orders(len(SWITCH_COLORS))
+        self.switch_order = orders(len(switch_slots))
+        jitter = rng.uniform(-settings.switch_jitter, settings.switch_jitter, (size,) + switch_slots.shape)
+        self.switch_spots = np.rint((switch_slots + jitter) * 100).astype(int).tolist()
+        self.sequence = counts(settings.sequence)
+
+def room1_props(draws, n, box_slots):
+    fruits = [FRUITS[i] for i in draws.fruit_order[n]]
+    required = sorted(fruits[:draws.required[n]])
+    distractors = fruits[draws.required[n]:]
+    loose = [fruit for fruit, flag in zip(required, draws.loose_required[n]) if flag]
+    if distractors:
+        loose += [distractors[pick % len(distractors)] for pick in draws.loose_picks[n][:draws.loose[n]]]
+
+    boxed = [fruit for fruit in required if fruit not in loose]
+    box_count = max(draws.boxes[n], len(boxed))
+    fillers = [distractors[pick % len(distractors)] if distractors and filled else None
+               for pick, filled in zip(draws.filler_picks[n], draws.filled[n])]
+    contents = boxed + fillers[:box_count - len(boxed)]
+    contents = [contents[i] for i in draws.box_order[n] if i < box_count]
+    locked = draws.locked[n][:box_count]
+    needed = sum(1 for fruit, lock in zip(contents, locked) if lock and fruit in required)
+    key_count = needed + draws.spare_keys[n]
+    clue_count = draws.clues[n]
+
+    order = draws.slot_order[n]
+    box_rows = [slot for slot in order if box_slots[slot]][:box_count]
+    taken = set(box_rows)
+    others = [slot for slot in order if slot not in taken][:clue_count + key_count + len(loose)]
+    if len(box_rows) < box_count or len(others) < clue_count + key_count + len(loose):
+        return None, required
+    spots = draws.spots[n]
+
+    # Props go in interaction priority order (clues, boxes, keys, fruits),
+    # which is what Room1Checker.check() assumes.
+    clue_texts = [f"Collect: {', '.join(fruit.capitalize() for fruit in required)} to escape!",
+                  "Dark boxes are locked. Keys open any of them.",
+                  f"There are {key_count} keys somewhere in this room."]
+    props = [{"kind": "clue", "pos": [spots[slot][0], 0.5, spots[slot][1]], "text": clue_texts[number % len(clue_texts)]}
+             for number, slot in enumerate(others[:clue_count])]
+    for slot, fruit, lock in zip(box_rows, contents, locked):
+        prop = {"kind": "box", "pos": [spots[slot][0], 0, spots[slot][1]],
+                "text": RIDDLES[fruit] if fruit else "This box is empty."}
+        if lock:
+            prop["locked"] = True
+        if fruit:
+            prop["fruit"] = fruit
+        props.append(prop)
+    rest = others[clue_count:]
+    props += [{"kind": "key", "pos": [spots[slot][0], 0.5, spots[slot][1]], "text": "This key opens a locked box."}
+              for slot in rest[:key_count]]
+    props += [{"kind": "fruit", "pos": [spots[slot][0], 0.3, spots[slot][1]], "fruit": fruit}
+              for slot, fruit in zip(rest[key_count:], loose)]
+    return props, required
+
+def room2_switches(draws, n):
+    count = min(draws.switches[n], len(SWITCH_COLORS), len(draws.switch_order[n]))
+    colors = [SWITCH_NAMES[i] for i in draws.color_order[n][:count]]
+    spots = draws.switch_spots[n]
+    switches = [{"pos": spots[slot], "color": color, "col": list(SWITCH_COLORS[color])}
+                for slot, color in zip(draws.switch_order[n], colors)]
+    return switches, min(draws.sequence[n], count)
+
+class Room1Checker:
+    def __init__(self):
+        # Walls and the open gate only; boxes are added per level.
+        grid = NavGrid(ROOM1_CELL)
+        if grid.cols > 64:
+            raise ValueError("Room 1 is too wide for one 64-bit mask per grid row")
+        self.rows, self.cols = grid.rows, grid.cols
+        self.x = grid.x.astype(np.float32)
+        self.z = grid.z.astype(np.float32)
+        self.free = grid.free
+        self.start = grid.cell_at(*ROOM1_SPAWN)
+        self.exit = grid.z > EXIT_Z
+        self.box_half = (KIND_SIZES[KIND_BOX][0] / 2 + logic.PLAYER_RADIUS,
+                         KIND_SIZES[KIND_BOX][2] / 2 + logic.PLAYER_RADIUS)
+
+    def pack(self, cells):
+        # (levels, rows * cols) bools -> (levels, rows) uint64 row masks.
+        rows = cells.reshape(len(cells), self.rows, self.cols)
+        packed = np.packbits(rows, axis=2, bitorder="little")
+        padded = np.zeros((len(cells), self.rows, 8), dtype=np.uint8)
+        padded[:, :, :packed.shape[2]] = packed
+        return padded.view(np.uint64)[:, :, 0]
+
+    def unpack(self, masks):
+        bits = np.unpackbits(masks.view(np.uint8).reshape(len(masks), self.rows, 8), axis=2, bitorder="little")
+        return bits[:, :, :self.cols].reshape(len(masks), -1).astype(bool)
+
+    def flood(self, free):
+        # Cells reachable from the spawn through 4-connected free cells,
+        # grown one cell per step with every level of the batch at once.
+        free = self.pack(free)
+        reached = np.zeros_like(free)
+        row, col = divmod(self.start, self.cols)
+        reached[:, row] = free[:, row] & np.uint64(1 << col)
+        one = np.uint64(1)
+        while True:
+            grown = reached | (reached << one) | (reached >> one)
+            grown[:, 1:] |= reached[:, :-1]
+            grown[:, :-1] |= reached[:, 1:]
+            grown &= free
+            if np.array_equal(grown, reached):
+                return self.unpack(reached)
+            reached = grown
+
+    def window(self, px, pz, extent):
+        # Indices of the square of cells around each (px, pz) that holds
+        # every cell centre within `extent` of it; (levels, cells) clipped
+        # to the grid, so edge cells may repeat.
+        width = int(np.ceil(2 * extent / ROOM1_CELL)) + 1
+        half = logic.ROOM_SIZE / 2
+        steps = np.arange(width)
+        cols = np.floor((px - extent + half) / ROOM1_CELL - 0.5).astype(np.int32)[:, None] + steps
+        rows = np.floor((pz - extent + half) / ROOM1_CELL - 0.5).astype(np.int32)[:, None] + steps
+        cols = np.clip(cols, 0, self.cols - 1)
+        rows = np.clip(rows, 0, self.rows - 1)
+        return (rows[:, :, None] * self.cols + cols[:, None, :]).reshape(len(px), width * width)
+
+    def check(self, kinds, positions):
+        # kinds (levels, props) with -1 padding, positions (levels, props, 2).
+        # Only the cells near each prop are looked at.
+        count, props = kinds.shape
+        levels = np.arange(count)[:, None]
+        px = positions[:, :, 0].astype(np.float32)
+        pz = positions[:, :, 1].astype(np.float32)
+
+        blocked = np.zeros((count, len(self.x)), dtype=bool)
+        for prop in range(props):
+            boxes = np.flatnonzero(kinds[:, prop] == KIND_BOX)
+            cells = self.window(px[boxes, prop], pz[boxes, prop], max(self.box_half))
+            inside = ((np.abs(self.x[cells] - px[boxes, prop, None]) < self.box_half[0]) &
+                      (np.abs(self.z[cells] - pz[boxes, prop, None]) < self.box_half[1]))
+            blocked[boxes[:, None], cells] |= inside
+        reached = self.flood(self.free & ~blocked)
+        ok = reached[:, self.start] & (reached & self.exit).any(axis=1)
+
+        shadow = np.zeros_like(reached)
+        reach = logic.INTERACT_RANGE ** 2
+        for prop in range(props):
+            present = kinds[:, prop] >= 0
+            cells = self.window(px[:, prop], pz[:, prop], logic.INTERACT_RANGE)
+            in_range = (self.x[cells] - px[:, prop, None]) ** 2 + (self.z[cells] - pz[:, prop, None]) ** 2 < reach
+            ok &= ~present | (reached[levels, cells] & in_range & ~shadow[levels, cells]).any(axis=1)
+            permanent = (present & (kinds[:, prop] <= KIND_BOX))[:, None]
+            shadow[levels, cells] |= in_range & permanent
+        return ok
+
+def check_room2(levels):
+    # Spacing check over every level's switches plus the buzzer at the centre.
+    width = max(len(level["rooms"][1]["switches"]) for level in levels) + 1
+    points = np.full((len(levels), width, 2), np.nan)
+    for n, level in enumerate(levels):
+        switches = level["rooms"][1]["switches"]
+        points[n, 1:len(switches) + 1] = [(s["pos"][0] / 100.0, s["pos"][1] / 100.0) for s in switches]
+    points[:, 0] = 0.0
+    present = ~np.isnan(points[:, :, 0])
+    gaps = np.linalg.norm(points[:, :, None] - points[:, None, :], axis=3)
+    gaps[:, np.arange(width), np.arange(width)] = np.inf
+    apart = np.where(present[:, :, None] & present[:, None, :], gaps >= 2 * ROOM2_CLEARANCE, True).all(axis=(1, 2))
+    inside = np.where(present, np.abs(points).max(axis=2) <= logic.ROOM_SIZE / 2 - ROOM2_CLEARANCE - logic.PLAYER_RADIUS,
+                      True).all(axis=1)
+    spawn = np.where(present, np.linalg.norm(points - ROOM2_SPAWN, axis=2) >= ROOM2_CLEARANCE, True).all(axis=1)
+    return apart & inside & spawn
+
+def keys_consistent(level):
+    props = level["rooms"][0]["props"]
+    required = set(level["required_fruits"])
+    keys = sum(1 for prop in props if prop["kind"] == "key")
+    needed = sum(1 for prop in props if prop["kind"] == "box" and prop.get("locked") and prop.get("fruit") in required)
+    sources = {prop.get("fruit") for prop in props if prop["kind"] in ("box", "fruit")}
+    return keys >= needed and required <= sources
+
+def generate_batch(seed, number, size, settings):
+    # (levels that passed, candidates rejected) for batch `number`.
+    rng = np.random.default_rng([seed, number])
+    limit = logic.ROOM_SIZE / 2 - 1.0 - settings.jitter
+    slots = lattice(settings.spacing, limit)
+    spawn_distance = np.hypot(slots[:, 0] - ROOM1_SPAWN[0], slots[:, 1] - ROOM1_SPAWN[1])
+    box_slots = (spawn_distance > np.hypot(*checker().box_half) + settings.jitter).tolist()
+    switch_slots = lattice(settings.switch_spacing, logic.ROOM_SIZE / 2 - 2.0)
+    switch_slots = switch_slots[np.hypot(*switch_slots.T) > 2.0]
+    draws = Draws(rng, settings, size, slots, switch_slots)
+
+    candidates = []
+    for n in range(size):
+        props, required = room1_props(draws, n, box_slots)
+        if props is None:
+            continue
+        switches, length = room2_switches(draws, n)
+        candidates.append({
+            "name": f"Generated {seed}-{number}-{n}",
+            "required_fruits": required,
+            "rooms": [
+                {"name": "Fruit Puzzle", "offset_y": 0, "gate_to": 1, "props": props},
+                {"name": "Color Sequence", "offset_y": -400, "gate_to": None,
+                 "switches": switches, "sequence_length": length},
+            ],
+        })
+    if not candidates:
+        return [], size
+
+    width = max(len(level["rooms"][0]["props"]) for level in candidates)
+    kinds = np.full((len(candidates), width), -1, dtype=np.int8)
+    positions = np.zeros((len(candidates), width, 2))
+    codes = {name: kind for kind, name in enumerate(KIND_NAMES)}
+    for n, level in enumerate(candidates):
+        props = level["rooms"][0]["props"]
+        kinds[n, :len(props)] = [codes[prop["kind"]] for prop in props]
+        positions[n, :len(props)] = [(prop["pos"][0], prop["pos"][2]) for prop in props]
+    ok = checker().check(kinds, positions) & check_room2(candidates)
+    ok &= np.array([keys_consistent(level) for level in candidates])
+    return [level for level, keep in zip(candidates, ok) if keep], size - int(ok.sum())
+
+room1_checker = None
+
+def checker():
+    global room1_checker
+    if room1_checker is None:
+        room1_checker = Room1Checker()
+    return room1_checker
+
+def generate(count, seed=0, settings=None, batch=512, workers=1):
+    # Yields (levels, rejected) per batch until `count` levels have passed.
+    settings = settings or Settings()
+    produced = 0
+    number = 0
+    if workers <= 1:
+        while produced < count:
+            levels, rejected = generate_batch(seed, number, batch, settings)
+            number += 1
+            levels = levels[:count - produced]
+            produced += len(levels)
+            yield levels, rejected
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = []
+        while produced < count:
+            while len(pending) < 2 * workers:
+                pending.append(pool.submit(generate_batch, seed, number, batch, settings))
+                number += 1
+            levels, rejected = pending.pop(0).result()
+            levels = levels[:count - produced]
+            produced += len(levels)
+            yield levels, rejected
+        for future in pending:
+            future.cancel()
+
+def generate_levels(count, seed=0, settings=None, batch=512, workers=1):
+    # The first `count` levels for `seed`, as LevelData.
+    return [LevelData.from_json(level) for levels, rejected in generate(count, seed, settings, batch, workers)
+            for level in levels]
+
+def solve_sample(levels, seed):
+    # Cross-check against the full solver: installs each level and plans an escape.
+    import solver
+    stats = solver.SolverStats()
+    escaped = in_time = 0
+    for level in levels:
+        logic.use_level(LevelData.from_json(level))
+        logic.new_game(seed)
+        plan = solver.solve_current_level(stats)
+        escaped += bool(plan.steps)
+        in_time += plan.solvable
+    return escaped, in_time
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate validated Puzzle Prison levels")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=512, help="candidates generated and checked together")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--boxes", type=int, nargs=2, default=(4, 8), metavar=("LOW", "HIGH"))
+    parser.add_argument("--switches", type=int, nargs=2, default=(3, 6), metavar=("LOW", "HIGH"))
+    parser.add_argument("--spacing", type=float, default=3.0, help="Room 1 prop lattice spacing")
+    parser.add_argument("--out", metavar="DIR", help="write each level as DIR/level_NNNNN.json")
+    parser.add_argument("--solve", type=int, default=0, metavar="N", help="run the solver on the first N levels")
+    args = parser.parse_args()
+
+    logic.VERBOSE = False
+    settings = Settings(boxes=tuple(args.boxes), switches=tuple(args.switches), spacing=args.spacing)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    kept, rejected, sample = 0, 0, []
+    started = time.perf_counter()
+    for levels, batch_rejected in generate(args.count, args.seed, settings, args.batch, args.workers):
+        rejected += batch_rejected
+        for level in levels:
+            if args.out:
+                with open(os.path.join(args.out, f"level_{kept:05d}.json"), "w") as f:
+                    json.dump(level, f, indent=1)
+            if len(sample) < args.solve:
+                sample.append(level)
+            kept += 1
+    elapsed = time.perf_counter() - started
+    print(f"levels: {kept}  rejected: {rejected}  workers: {args.workers}  elapsed: {elapsed:.2f}s  "
+          f"levels/s: {kept / elapsed:,.0f}")
+
+    if sample:
+        escaped, in_time = solve_sample(sample, args.seed)
+        print(f"solver: {escaped}/{len(sample)} escapable, {in_time}/{len(sample)} within {logic.TIME_LIMIT}s")
+        if escaped < len(sample):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
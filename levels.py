@@ -0,0 +1,290 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from entity_store import (EntityStore, KIND_BOX, KIND_CLUE, KIND_FRUIT, KIND_KEY, KIND_NAMES,
+                          KIND_SIZES, FLAG_COLLECTED, FLAG_LOCKED)
+from spatial_index import PackedGrid
+
+# Level files. A level is authored as JSON (see levels/prison.json): the
+# rooms in order with their vertical offset and the room their gate leads
+# to, each room's props in insertion order, the Room 2 switch layout and
+# the fruits needed to open the first gate. A room with switches may give a
+# sequence_length shorter than its switch count; by default the sequence
+# uses every switch once. `python levels.py compile` turns
+# it into a .pplc file that also carries every room's prop arrays, both of
+# its grids and its box mesh batch, so loading one is a single memory map
+# plus a handful of np.frombuffer views instead of rebuilding Python objects.
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+DEFAULT_LEVEL = os.path.join(LEVEL_DIR, "prison.json")
+
+MAGIC = b"PPLC"
+VERSION = 2
+PREAMBLE = struct.Struct("<4sHHI")
+ALIGN = 64
+
+INTERACT_CELL = 2.0
+COLLISION_CELL = 2.0
+
+KIND_CODES = {name: kind for kind, name in enumerate(KIND_NAMES)}
+
+# One box as 12 triangles, each vertex (x, y, z, nx, ny, nz) around a unit
+# cube resting on y = 0.
+BOX_FACES = [
+    ((0, 0, 1), [(-1, 0, 1), (1, 0, 1), (1, 2, 1), (-1, 2, 1)]),
+    ((0, 0, -1), [(-1, 0, -1), (-1, 2, -1), (1, 2, -1), (1, 0, -1)]),
+    ((-1, 0, 0), [(-1, 0, -1), (-1, 0, 1), (-1, 2, 1), (-1, 2, -1)]),
+    ((1, 0, 0), [(1, 0, -1), (1, 2, -1), (1, 2, 1), (1, 0, 1)]),
+    ((0, 1, 0), [(-1, 2, -1), (-1, 2, 1), (1, 2, 1), (1, 2, -1)]),
+    ((0, -1, 0), [(-1, 0, -1), (1, 0, -1), (1, 0, 1), (-1, 0, 1)]),
+]
+BOX_TEMPLATE = np.array([corners[i] + normal for normal, corners in BOX_FACES
+                         for i in (0, 1, 2, 0, 2, 3)], dtype=np.float32)
+BOX_TEMPLATE[:, :3] *= np.array(KIND_SIZES[KIND_BOX], dtype=np.float32) / 2
+
+def box_mesh(positions):
+    vertices = np.tile(BOX_TEMPLATE, (len(positions), 1)).reshape(len(positions), len(BOX_TEMPLATE), 6)
+    vertices[:, :, :3] += np.asarray(positions, dtype=np.float32)[:, None, :]
+    return vertices.reshape(-1, 6)
+
+def build_grids(store):
+    count = store.count
+    positions = store.positions[:count]
+    live = np.flatnonzero((store.flags[:count] & FLAG_COLLECTED) == 0)
+    interaction = PackedGrid.build(live, positions[live, 0], positions[live, 2], cell_size=INTERACT_CELL)
+    boxes = store.of_kind(KIND_BOX)
+    w, h, d = KIND_SIZES[KIND_BOX]
+    collision = PackedGrid.build(boxes, positions[boxes, 0], positions[boxes, 2], w/2, d/2,
+                                 cell_size=COLLISION_CELL)
+    return interaction, collision
+
+STORE_ARRAYS = ("kinds", "flags", "fruit_ids", "text_ids", "positions")
+GRID_ARRAYS = ("cell_start", "members", "ids", "bounds", "alive")
+GRID_NAMES = ("interaction", "collision")
+
+class RoomContent:
+    # One room's props, both grids and its box mesh. Built once and never
+    # modified; install() hands a store its own copy of the mutable parts.
+    def __init__(self, number, arrays, fruit_names, texts, grids, box_mesh):
+        self.number = number
+        self.arrays = arrays
+        self.fruit_names = fruit_names
+        self.texts = texts
+        self.grids = grids
+        self.box_mesh = box_mesh
+
+    @classmethod
+    def from_store(cls, number, store):
+        count = store.count
+        arrays = {name: getattr(store, name)[:count].copy() for name in STORE_ARRAYS}
+        boxes = store.of_kind(KIND_BOX)
+        return cls(number, arrays, list(store.fruit_names), list(store.texts),
+                   build_grids(store), box_mesh(store.positions[boxes]))
+
+    @property
+    def count(self):
+        return len(self.arrays["kinds"])
+
+    def nbytes(self):
+        grid_bytes = sum(getattr(grid, name).nbytes for grid in self.grids for name in GRID_ARRAYS)
+        return sum(array.nbytes for array in self.arrays.values()) + grid_bytes + self.box_mesh.nbytes
+
+    def warm(self):
+        # Touch one byte per page so a memory-mapped room is read in now
+        # rather than on the first frame that needs it.
+        arrays = list(self.arrays.values()) + [self.box_mesh]
+        arrays += [getattr(grid, name) for grid in self.grids for name in GRID_ARRAYS]
+        for array in arrays:
+            if array.nbytes:
+                int(array.reshape(-1).view(np.uint8)[::mmap.PAGESIZE].sum())
+        return self
+
+    def install(self, store):
+        a = self.arrays
+        store.adopt(a["kinds"], a["flags"], a["fruit_ids"], a["text_ids"], a["positions"],
+                    self.fruit_names, self.texts)
+
+    def packed_grids(self, store):
+        # Only valid while the store holds exactly these props.
+        if store.count != self.count:
+            return None
+        interaction, collision = (grid.copy() for grid in self.grids)
+        interaction.alive[:] = (store.flags[interaction.ids] & FLAG_COLLECTED) == 0
+        return interaction, collision
+
+class Room:
+    def __init__(self, name, offset_y, gate_to=None):
+        self.name = name
+        self.offset_y = offset_y
+        self.gate_to = gate_to
+
+    def to_json(self):
+        return {"name": self.name, "offset_y": self.offset_y, "gate_to": self.gate_to}
+
+class Level:
+    def __init__(self, name, required_fruits, rooms, switches, sequence_length=None):
+        self.name = name
+        self.required_fruits = list(required_fruits)
+        self.rooms = rooms
+        self.switches = switches
+        self.sequence_length = sequence_length
+
+    def switch_states(self):
+        return [{"pos": list(s["pos"]), "color": s["color"], "active": False, "col": tuple(s["col"])}
+                for s in self.switches]
+
+    def colors(self):
+        return [s["color"] for s in self.switches]
+
+class LevelData(Level):
+    # A level parsed from JSON; room_content() builds a room from its props.
+    def __init__(self, name, required_fruits, rooms, switches, props, sequence_length=None):
+        super().__init__(name, required_fruits, rooms, switches, sequence_length)
+        self.props = props
+
+    @classmethod
+    def from_json(cls, data):
+        rooms, switches, props = [], [], []
+        sequence_length = None
+        for number, room in enumerate(data["rooms"]):
+            rooms.append(Room(room.get("name", f"Room {number + 1}"), room["offset_y"], room.get("gate_to")))
+            switches.extend(room.get("switches", []))
+            sequence_length = room.get("sequence_length", sequence_length)
+            for prop in room.get("props", []):
+                if prop["kind"] not in KIND_CODES:
+                    raise ValueError(f"unknown prop kind {prop['kind']!r}")
+            props.append(room.get("props", []))
+        for room in rooms:
+            if room.gate_to is not None and not 0 <= room.gate_to < len(rooms):
+                raise ValueError(f"gate in {room.name!r} leads to missing room {room.gate_to}")
+        if sequence_length is not None and not 0 < sequence_length <= len(switches):
+            raise ValueError(f"sequence_length {sequence_length} does not fit {len(switches)} switches")
+        return cls(data.get("name", ""), data["required_fruits"], rooms, switches, props, sequence_length)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_json(json.load(f))
+
+    def populate(self, store, number=0):
+        store.clear()
+        props = self.props[number]
+        kinds = [KIND_CODES[prop["kind"]] for prop in props]
+        store.extend(kinds,
+                     np.array([prop["pos"] for prop in props], dtype=np.float32).reshape(-1, 3),
+                     [FLAG_LOCKED if prop.get("locked") else 0 for prop in props],
+                     [prop.get("fruit") if kind in (KIND_BOX, KIND_FRUIT) else None
+                      for kind, prop in zip(kinds, props)],
+                     [prop.get("text", "") if kind in (KIND_BOX, KIND_KEY, KIND_CLUE) else None
+                      for kind, prop in zip(kinds, props)])
+
+    def room_content(self, number):
+        store = EntityStore()
+        self.populate(store, number)
+        return RoomContent.from_store(number, store)
+
+class CompiledLevel(Level):
+    # A .pplc file mapped read-only. Room contents are views into the map.
+    def __init__(self, header, data, base):
+        rooms = [Room(room["name"], room["offset_y"], room["gate_to"]) for room in header["rooms"]]
+        super().__init__(header["name"], header["required_fruits"], rooms, header["switches"],
+                         header.get("sequence_length"))
+        self.header = header
+        self.data = data
+        self.arrays = {}
+        for name, (offset, dtype, shape) in header["sections"].items():
+            count = int(np.prod(shape))
+            self.arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=base + offset).reshape(shape)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, header_size = PREAMBLE.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a compiled Puzzle Prison level")
+        header = json.loads(bytes(data[PREAMBLE.size:PREAMBLE.size + header_size]))
+        return cls(header, data, aligned(PREAMBLE.size + header_size))
+
+    def room_content(self, number):
+        meta = self.header["rooms"][number]
+        prefix = f"room{number}."
+        grids = []
+        for name in GRID_NAMES:
+            grid = meta["grids"][name]
+            parts = [self.arrays[f"{prefix}{name}.{part}"] for part in GRID_ARRAYS]
+            grids.append(PackedGrid(grid["cell_size"], grid["origin"], grid["shape"], *parts))
+        arrays = {name: self.arrays[prefix + name] for name in STORE_ARRAYS}
+        return RoomContent(number, arrays, meta["fruit_names"], meta["texts"], grids,
+                           self.arrays[prefix + "box_mesh"])
+
+def aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+def compile_level(level, path):
+    sections, rooms = {}, []
+    for number, room in enumerate(level.rooms):
+        content = level.room_content(number)
+        prefix = f"room{number}."
+        meta = dict(room.to_json(), fruit_names=content.fruit_names, texts=content.texts, grids={})
+        for name, array in content.arrays.items():
+            sections[prefix + name] = array
+        sections[prefix + "box_mesh"] = content.box_mesh
+        for name, grid in zip(GRID_NAMES, content.grids):
+            meta["grids"][name] = {"cell_size": grid.cell_size, "origin": [grid.origin_x, grid.origin_z],
+                                   "shape": [grid.cols, grid.rows]}
+            for part in GRID_ARRAYS:
+                sections[f"{prefix}{name}.{part}"] = getattr(grid, part)
+        rooms.append(meta)
+
+    table, offset = {}, 0
+    for name, array in sections.items():
+        array = np.ascontiguousarray(array)
+        sections[name] = array
+        table[name] = (offset, array.dtype.str, list(array.shape))
+        offset = aligned(offset + array.nbytes)
+    header = json.dumps({
+        "name": level.name,
+        "required_fruits": level.required_fruits,
+        "rooms": rooms,
+        "switches": level.switches,
+        "sequence_length": level.sequence_length,
+        "sections": table,
+    }).encode()
+
+    base = aligned(PREAMBLE.size + len(header))
+    with open(path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, 0, len(header)))
+        f.write(header)
+        for name, array in sections.items():
+            f.seek(base + table[name][0])
+            f.write(array.tobytes())
+        f.truncate(base + offset)
+    return base + offset
+
+def load_level(path=DEFAULT_LEVEL):
+    with open(path, "rb") as f:
+        compiled = f.read(len(MAGIC)) == MAGIC
+    return CompiledLevel.load(path) if compiled else LevelData.load(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile Puzzle Prison levels")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compile_cmd = sub.add_parser("compile", help="compile a JSON level to .pplc")
+    compile_cmd.add_argument("source")
+    compile_cmd.add_argument("-o", "--output", help="defaults to the source path with .pplc")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.source)[0] + ".pplc"
+    size = compile_level(LevelData.load(args.source), output)
+    print(f"wrote {output} ({size:,} bytes)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import mmap
+import os
+
+import numpy as np
+
+from levels import PREAMBLE, aligned
+
+# Generated meshes (unit spheres, cylinders, the baked player body, the room
+# shell) kept on disk between launches. The file has the same layout as a
+# compiled level: a preamble, a JSON header naming each array's offset,
+# dtype and shape, then the arrays themselves, so loading it is one memory
+# map plus a np.frombuffer view per mesh that can go straight to glBufferData.
+# The header also holds a fingerprint of everything the meshes were built
+# from; when it no longer matches, the meshes are rebuilt and the file is
+# rewritten. Bump VERSION when a generator changes in a way its inputs don't show.
+
+MESH_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mesh_cache.ppmc")
+
+MAGIC = b"PPMC"
+VERSION = 1
+
+def fingerprint(inputs):
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+def read_meshes(path, inputs):
+    # The cached arrays, read-only, or None if the file is missing, from
+    # another version or built from different inputs.
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(data) < PREAMBLE.size:
+        return None
+    magic, version, _, header_size = PREAMBLE.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    try:
+        header = json.loads(bytes(data[PREAMBLE.size:PREAMBLE.size + header_size]))
+        if header["fingerprint"] != fingerprint(inputs):
+            return None
+        base = aligned(PREAMBLE.size + header_size)
+        meshes = {}
+        for name, (offset, dtype, shape) in header["sections"].items():
+            count = int(np.prod(shape))
+            meshes[name] = np.frombuffer(data, dtype=dtype, count=count, offset=base + offset).reshape(shape)
+    except (ValueError, KeyError):
+        return None  # truncated or damaged: rebuild it
+    return meshes
+
+def write_meshes(path, inputs, meshes):
+    table, offset = {}, 0
+    for name, array in meshes.items():
+        table[name] = (offset, array.dtype.str, list(array.shape))
+        offset = aligned(offset + array.nbytes)
+    header = json.dumps({"fingerprint": fingerprint(inputs), "sections": table}).encode()
+
+    # Written beside the old file and renamed over it, so a game that still
+    # has the old one mapped keeps reading consistent data.
+    base = aligned(PREAMBLE.size + len(header))
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, 0, len(header)))
+        f.write(header)
+        for name, array in meshes.items():
+            f.seek(base + table[name][0])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(base + offset)
+    try:
+        os.replace(temporary, path)
+    except OSError:
+        os.remove(temporary)
+        raise
+    return base + offset
+
+def load_meshes(inputs, build, path=None):
+    # (meshes, True) from the cache, or (build(), False) after rewriting it.
+    path = path or MESH_CACHE
+    meshes = read_meshes(path, inputs)
+    if meshes is not None:
+        return meshes, True
+    meshes = build()
+    try:
+        write_meshes(path, inputs, meshes)
+    except OSError:
+        pass  # a read-only install just rebuilds them every launch
+    return meshes, False
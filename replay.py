@@ -0,0 +1,194 @@
+import argparse
+import os
+import struct
+import sys
+import time
+
+import game_logic as logic
+from headless import MOVE_INPUTS
+
+# Compact binary input logs. A log holds the session seed, the held-key
+# bitmask for every simulation tick (run-length encoded) and the discrete
+# interact / camera events with the tick they landed before. Since game
+# logic only advances in simulation_step(), feeding the same log back
+# through new_game(seed) reproduces the session exactly.
+
+MAGIC = b"PPRL"
+VERSION = 1
+HEADER = struct.Struct("<4sBQIII")
+RUN = struct.Struct("<BH")
+EVENT = struct.Struct("<IB")
+OUTCOME = struct.Struct("<BBiBdd")
+MAX_RUN = 0xFFFF
+
+KEY_FLAGS = list(MOVE_INPUTS.values())
+
+EVENT_INTERACT = 1
+EVENT_CAMERA = 2
+
+def key_mask(game):
+    mask = 0
+    for bit, flag in enumerate(KEY_FLAGS):
+        if getattr(game, flag):
+            mask |= 1 << bit
+    return mask
+
+def apply_key_mask(game, mask):
+    for bit, flag in enumerate(KEY_FLAGS):
+        setattr(game, flag, bool(mask & (1 << bit)))
+
+def toggle_camera(game):
+    game.camera_mode = "third_person" if game.camera_mode == "first_person" else "first_person"
+
+def outcome(game):
+    return (int(game.game_completed), int(game.game_over), int(game.final_score),
+            int(game.current_room), float(game.player_x), float(game.player_z))
+
+class InputLog:
+    def __init__(self, seed, runs=None, events=None, outcome=None):
+        self.seed = seed
+        self.runs = runs if runs is not None else []
+        self.events = events if events is not None else []
+        self.outcome = outcome
+
+    @property
+    def ticks(self):
+        return sum(length for _, length in self.runs)
+
+    def masks(self):
+        for mask, length in self.runs:
+            for _ in range(length):
+                yield mask
+
+    def to_bytes(self):
+        parts = [HEADER.pack(MAGIC, VERSION, self.seed, self.ticks, len(self.runs), len(self.events))]
+        parts.extend(RUN.pack(mask, length) for mask, length in self.runs)
+        parts.extend(EVENT.pack(tick, kind) for tick, kind in self.events)
+        parts.append(OUTCOME.pack(*self.outcome) if self.outcome else b"")
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, ticks, run_count, event_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a Puzzle Prison input log")
+        offset = HEADER.size
+        runs = [RUN.unpack_from(data, offset + i * RUN.size) for i in range(run_count)]
+        offset += run_count * RUN.size
+        events = [EVENT.unpack_from(data, offset + i * EVENT.size) for i in range(event_count)]
+        offset += event_count * EVENT.size
+        result = OUTCOME.unpack_from(data, offset) if len(data) >= offset + OUTCOME.size else None
+        log = cls(seed, runs, events, result)
+        if log.ticks != ticks:
+            raise ValueError("input log is truncated")
+        return log
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+class InputRecorder:
+    def __init__(self, seed):
+        self.log = InputLog(seed)
+        self.ticks = 0
+
+    def event(self, kind):
+        # Events apply before the next simulation tick.
+        self.log.events.append((self.ticks, kind))
+
+    def sample(self, game):
+        # Call once per tick, right before simulation_step().
+        mask = key_mask(game)
+        runs = self.log.runs
+        if runs and runs[-1][0] == mask and runs[-1][1] < MAX_RUN:
+            runs[-1] = (mask, runs[-1][1] + 1)
+        else:
+            runs.append((mask, 1))
+        self.ticks += 1
+
+    def save(self, path, game=None):
+        if game is not None:
+            self.log.outcome = outcome(game)
+        self.log.save(path)
+        return self.log
+
+class Replayer:
+    def __init__(self, log):
+        self.log = log
+        self.masks = log.masks()
+        self.events = iter(log.events)
+        self.next_event = next(self.events, None)
+        self.tick = 0
+
+    @property
+    def done(self):
+        return self.tick >= self.log.ticks
+
+    def start(self):
+        logic.new_game(self.log.seed)
+        return logic.game
+
+    def step(self):
+        game = logic.game
+        apply_key_mask(game, next(self.masks))
+        while self.next_event is not None and self.next_event[0] <= self.tick:
+            if self.next_event[1] == EVENT_INTERACT:
+                logic.interact()
+            elif self.next_event[1] == EVENT_CAMERA:
+                toggle_camera(game)
+            self.next_event = next(self.events, None)
+        logic.simulation_step()
+        self.tick += 1
+
+def replay(log, realtime=False):
+    replayer = Replayer(log)
+    game = replayer.start()
+    started = time.perf_counter()
+    while not replayer.done:
+        replayer.step()
+        if realtime:
+            delay = started + replayer.tick * logic.SIM_DT - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    return game
+
+def log_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".pprl"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Puzzle Prison input logs")
+    parser.add_argument("paths", nargs="+", help="input logs or directories of .pprl files")
+    parser.add_argument("--realtime", action="store_true", help="pace replay at SIM_HZ")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logic.VERBOSE = args.verbose
+    files = ticks = mismatches = 0
+    started = time.perf_counter()
+    for path in log_paths(args.paths):
+        log = InputLog.load(path)
+        game = replay(log, args.realtime)
+        files += 1
+        ticks += log.ticks
+        if log.outcome is not None and outcome(game) != tuple(log.outcome):
+            mismatches += 1
+            print(f"{path}: outcome {outcome(game)} does not match recorded {tuple(log.outcome)}")
+    elapsed = time.perf_counter() - started
+
+    print(f"logs: {files}  ticks: {ticks}  mismatches: {mismatches}  elapsed: {elapsed:.2f}s  "
+          f"ticks/s: {ticks / elapsed if elapsed else 0:,.0f}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Keeps at most the current room and the one behind its gate in memory.
+# Building a room (props, grids, box mesh) happens on a single worker
+# thread: prefetch() is called the moment a gate opens, so by the time the
+# player walks through it acquire() only collects a finished result. Rooms
+# that are neither current nor next are dropped by retain().
+# Prefetching only hides a build that finishes before the player reaches
+# the gate. A JSON room is built from NumPy arrays filled in one pass
+# (about 0.4 s for 40k props); the worker shares the GIL with the game, so
+# much larger rooms, or slower machines, should be compiled to .pplc first,
+# which only maps the arrays in.
+
+class RoomResidency:
+    def __init__(self, level, workers=1, prefetching=True):
+        self.level = level
+        self.prefetching = prefetching
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="room-prefetch")
+        self.rooms = {}
+        self.builds = 0
+        self.prefetches = 0
+        self.cold_loads = 0
+        self.stalls = 0
+        self.stall_time = 0.0
+        self.evictions = 0
+
+    def build(self, number):
+        self.builds += 1
+        return self.level.room_content(number).warm()
+
+    def prefetch(self, number):
+        if self.prefetching and number is not None and number not in self.rooms:
+            self.rooms[number] = self.executor.submit(self.build, number)
+            self.prefetches += 1
+
+    def resident(self):
+        return sorted(self.rooms)
+
+    def ready(self, number):
+        future = self.rooms.get(number)
+        return future is not None and future.done()
+
+    def acquire(self, number):
+        future = self.rooms.get(number)
+        if future is None:
+            # Never requested (a new game, or prefetching is off): build here.
+            self.cold_loads += 1
+            future = self.rooms[number] = Future()
+            started = time.perf_counter()
+            future.set_result(self.build(number))
+            self.stall_time += time.perf_counter() - started
+            return future.result()
+        if not future.done():
+            # Not prefetched in time; count the wait so it shows up.
+            self.stalls += 1
+            started = time.perf_counter()
+            content = future.result()
+            self.stall_time += time.perf_counter() - started
+            return content
+        return future.result()
+
+    def retain(self, numbers):
+        for number in [n for n in self.rooms if n not in numbers]:
+            future = self.rooms.pop(number)
+            future.cancel()
+            self.evictions += 1
+
+    def resident_bytes(self):
+        return sum(future.result().nbytes() for future in self.rooms.values() if future.done())
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.rooms.clear()
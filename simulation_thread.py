@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+
+import game_logic as logic
+from entity_store import KIND_NAMES
+from frame_profiler import FrameProfiler
+
+# Runs the fixed-rate simulation on its own thread so that a slow frame
+# never delays input or movement, and slow game logic never delays drawing.
+# After every tick the thread publishes an immutable GameSnapshot into one
+# of two slots and then flips which slot is current; display() only reads
+# the current one. Everything else that changes game state (keys, interact,
+# the camera toggle) is submitted as a command and runs on this thread
+# between ticks, so GameState is only ever touched by one thread. A command
+# wakes the thread, which runs the next scheduled tick early rather than
+# adding one, so input is seen by the next frame and the rate still holds.
+# Every tick is timed into its own ring ("simulation" phase), kept apart
+# from the frame phases because ticks and frames run at different rates.
+
+class GameSnapshot:
+    # What the renderer needs from one tick, copied so it can be read while
+    # the next tick runs. Never modified after it is taken.
+    def __init__(self, previous=None, tick=0, due=0.0):
+        game = logic.game
+        self.tick = tick
+        self.due = due
+        self.applied = 0  # commands run before this snapshot was taken
+        for name in ("player_x", "player_y", "player_z", "player_rotation_y", "prev_player_x",
+                     "prev_player_z", "prev_player_rotation_y", "camera_mode", "camera_distance",
+                     "current_room", "keys_found", "current_message", "message_timer",
+                     "message_duration", "sim_time", "time_remaining", "final_score",
+                     "game_completed", "game_over"):
+            setattr(self, name, getattr(game, name))
+        self.gate_open = tuple(game.gate_open)
+        self.gate_opening_progress = tuple(game.gate_opening_progress)
+        self.prev_gate_opening_progress = tuple(game.prev_gate_opening_progress)
+        self.collected_fruits = tuple(game.collected_fruits)
+        self.required_fruits = tuple(game.required_fruits)
+
+        self.store = logic.room_entities.frozen(previous.store if previous is not None else None)
+        self.room_content = logic.room_content
+        self.resident_rooms = tuple(logic.residency.resident())
+        self.nearby = None
+        if game.current_room == 0:
+            nearby = logic.get_nearby_object()
+            if nearby is not None:
+                self.nearby = nearby[1].index
+
+        self.switches = tuple(dict(switch) for switch in logic.color_switches)
+        self.current_sequence = tuple(logic.current_sequence)
+        self.color_sequence = tuple(logic.COLOR_SEQUENCE)
+        self.sequence_correct = logic.sequence_correct
+
+    def nearby_object(self):
+        # (kind name, view) over this snapshot's props, like get_nearby_object().
+        if self.nearby is None:
+            return None
+        kind = self.store.kinds[self.nearby]
+        return KIND_NAMES[kind], logic.ENTITY_VIEWS[kind].at(self.store, self.nearby)
+
+class SimulationThread:
+    def __init__(self, tick, step=logic.SIM_DT, max_steps=logic.MAX_SIM_STEPS):
+        self.tick = tick
+        self.step = step
+        self.max_steps = max_steps
+        self.commands = queue.SimpleQueue()
+        self.slots = [GameSnapshot(), None]
+        self.current = 0
+        self.stopping = threading.Event()
+        self.wake = threading.Event()
+        self.published = threading.Condition()
+        self.submitted = 0
+        self.applied = 0
+        self.thread = threading.Thread(target=self.run, name="simulation", daemon=True)
+        self.ticks = 0
+        self.dropped_ticks = 0
+        self.slowest_tick = 0.0
+        self.profiler = FrameProfiler(("simulation",), row="tick")
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        if self.thread.is_alive() and threading.current_thread() is not self.thread:
+            self.thread.join()
+
+    def submit(self, command, *args):
+        self.submitted += 1
+        self.commands.put((command, args))
+        self.wake.set()
+
+    def run_commands(self):
+        while True:
+            try:
+                command, args = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            command(*args)
+            self.applied += 1
+
+    def latest(self):
+        return self.slots[self.current]
+
+    def settled(self, timeout=None):
+        # The latest snapshot once it includes every command submitted so
+        # far, waiting at most one tick for it.
+        submitted = self.submitted
+        with self.published:
+            self.published.wait_for(lambda: self.latest().applied >= submitted or not self.thread.is_alive(),
+                                    self.step if timeout is None else timeout)
+        return self.latest()
+
+    def alpha(self, snapshot, now):
+        # How far from snapshot's previous state towards its current one to
+        # draw: frames trail the simulation by one tick so they interpolate.
+        return min(1.0, max(0.0, (now - snapshot.due) / self.step))
+
+    def publish(self, due):
+        back = 1 - self.current
+        snapshot = GameSnapshot(self.slots[self.current], self.ticks, due)
+        snapshot.applied = self.applied
+        self.slots[back] = snapshot
+        with self.published:
+            self.current = back
+            self.published.notify_all()
+
+    def run(self):
+        due = time.perf_counter()
+        while not self.stopping.is_set():
+            self.wake.clear()
+            self.run_commands()
+            started = time.perf_counter()
+            self.profiler.mark()
+            self.tick()
+            self.profiler.lap("simulation")
+            self.profiler.end_frame()
+            self.ticks += 1
+            self.slowest_tick = max(self.slowest_tick, time.perf_counter() - started)
+            self.publish(min(due, started))
+            due += self.step
+
+            self.wake.wait(max(0.0, due - time.perf_counter()))
+            if time.perf_counter() - due > self.max_steps * self.step:
+                # Too far behind to catch up: drop the backlog, as the
+                # GLUT-timer loop did.
+                self.dropped_ticks += int((time.perf_counter() - due) / self.step)
+                due = time.perf_counter()
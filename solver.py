@@ -0,0 +1,411 @@
+import argparse
+import heapq
+import math
+import random
+import time
+
+import numpy as np
+
+import game_logic as logic
+from entity_store import FLAG_LOCKED, KIND_BOX, KIND_CLUE, KIND_FRUIT, KIND_KEY, KIND_NAMES, KIND_SIZES
+
+# Finds the shortest action plan that escapes both rooms. Walking is planned
+# with A* over a navigation grid built from the walls, gate and colliders;
+# the Room 1 puzzle is searched over (keys held, keys taken, boxes opened,
+# fruits collected) with every walk between interaction spots memoized.
+# Time is counted in simulation ticks assuming one MOVE_SPEED step per tick.
+
+# Room 1 targets are reachable from anywhere within INTERACT_RANGE, so a
+# coarse grid is enough; Room 2 switches need to be approached within 1.0
+# past their colliders and get a finer one.
+ROOM1_CELL = 0.5
+ROOM2_CELL = 0.25
+EXIT_Z = logic.ROOM_SIZE / 2 + 0.5
+SQRT2 = math.sqrt(2.0)
+
+class Level:
+    # Everything the solver needs, copied out of the game logic globals.
+    def __init__(self, store, required_fruits, switches, color_sequence, room2_colliders):
+        count = store.count
+        self.kinds = store.kinds[:count].copy()
+        self.positions = store.positions[:count, [0, 2]].astype(np.float64)
+        self.locked = (store.flags[:count] & FLAG_LOCKED) != 0
+        self.fruits = [store.fruit_names[code] if code >= 0 else None for code in store.fruit_ids[:count]]
+        self.required_fruits = list(required_fruits)
+        self.switches = {switch["color"]: (switch["pos"][0] / 100.0, switch["pos"][1] / 100.0)
+                         for switch in switches}
+        self.color_sequence = list(color_sequence)
+        self.room2_colliders = [(x / 100.0, z / 100.0, w / 100.0, d / 100.0)
+                                for x, z, w, d in room2_colliders]
+
+    @classmethod
+    def from_game_logic(cls):
+        if not logic.ROOM2_COLLIDERS:
+            logic.rebuild_room2_colliders()
+        return cls(logic.room_entities, logic.game.required_fruits, logic.color_switches,
+                   logic.COLOR_SEQUENCE, logic.ROOM2_COLLIDERS)
+
+class PlanStep:
+    __slots__ = ("room", "action", "target", "x", "z", "ticks")
+
+    def __init__(self, room, action, target, x, z, ticks):
+        self.room = room
+        self.action = action
+        self.target = target
+        self.x = x
+        self.z = z
+        self.ticks = ticks
+
+    def __repr__(self):
+        return f"<{self.action} {self.target} at ({self.x:.2f}, {self.z:.2f}) +{self.ticks}>"
+
+class Plan:
+    def __init__(self, steps):
+        self.steps = steps
+        self.ticks = sum(step.ticks for step in steps)
+
+    @property
+    def seconds(self):
+        return self.ticks * logic.SIM_DT
+
+    @property
+    def solvable(self):
+        return bool(self.steps) and self.ticks <= logic.TIME_LIMIT * logic.SIM_HZ
+
+class SolverStats:
+    def __init__(self):
+        self.levels = 0
+        self.solvable = 0
+        self.states = 0
+        self.searches = 0
+        self.nodes = 0
+        self.path_hits = 0
+        self.path_misses = 0
+        self.region_hits = 0
+        self.region_misses = 0
+        self.elapsed = 0.0
+
+    def report(self):
+        def rate(hits, misses):
+            total = hits + misses
+            return 100.0 * hits / total if total else 0.0
+
+        per_second = self.levels / self.elapsed if self.elapsed else 0.0
+        return (f"levels: {self.levels}  solvable: {self.solvable}  elapsed: {self.elapsed:.2f}s  "
+                f"levels/s: {per_second:,.1f}\n"
+                f"puzzle states: {self.states}  A* searches: {self.searches}  A* nodes: {self.nodes}\n"
+                f"path cache hit rate: {rate(self.path_hits, self.path_misses):.1f}%  "
+                f"region cache hit rate: {rate(self.region_hits, self.region_misses):.1f}%")
+
+class NavGrid:
+    def __init__(self, cell, blocked_boxes=(), gate_open=True):
+        self.cell = cell
+        half = logic.ROOM_SIZE / 2
+        self.cols = int(round(logic.ROOM_SIZE / cell))
+        self.rows = int(round((logic.ROOM_SIZE + 1.0) / cell))
+        xs = -half + cell * (np.arange(self.cols) + 0.5)
+        zs = -half + cell * (np.arange(self.rows) + 0.5)
+        self.z, self.x = [axis.ravel() for axis in np.meshgrid(zs, xs, indexing="ij")]
+
+        half_room = half - logic.PLAYER_RADIUS
+        # The player's circle has to fit between the gate posts.
+        in_gate = gate_open & (self.z > half_room) & (np.abs(self.x) < logic.GATE_WIDTH / 2 - logic.PLAYER_RADIUS)
+        blocked = ~in_gate & ((np.abs(self.x) > half_room) | (np.abs(self.z) > half_room))
+        for x, z, half_x, half_z in blocked_boxes:
+            blocked |= ((np.abs(self.x - x) < half_x + logic.PLAYER_RADIUS) &
+                        (np.abs(self.z - z) < half_z + logic.PLAYER_RADIUS))
+        self.free = ~blocked
+        self.moves = self.build_moves()
+
+    def build_moves(self):
+        # One (offset, length, usable-from-cell) triple per direction.
+        free = np.zeros((self.rows + 2, self.cols + 2), dtype=bool)
+        free[1:-1, 1:-1] = self.free.reshape(self.rows, self.cols)
+
+        def shifted(d_row, d_col):
+            return free[1 + d_row:self.rows + 1 + d_row, 1 + d_col:self.cols + 1 + d_col]
+
+        moves = []
+        for d_row, d_col in ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)):
+            usable = shifted(0, 0) & shifted(d_row, d_col)
+            if d_row and d_col:
+                # No cutting corners past a blocked cell.
+                usable = usable & shifted(d_row, 0) & shifted(0, d_col)
+            length = self.cell * (SQRT2 if d_row and d_col else 1.0)
+            moves.append((d_row * self.cols + d_col, length, usable.ravel().tolist()))
+        return moves
+
+    def cell_at(self, x, z):
+        half = logic.ROOM_SIZE / 2
+        col = min(max(int((x + half) / self.cell), 0), self.cols - 1)
+        row = min(max(int((z + half) / self.cell), 0), self.rows - 1)
+        return row * self.cols + col
+
+    def astar(self, start, goal, heuristic, stats):
+        # goal and heuristic are per-cell lists; returns (distance, end cell).
+        stats.searches += 1
+        best = [math.inf] * len(goal)
+        best[start] = 0.0
+        # Ties on f go to the entry furthest along, which keeps open areas cheap.
+        frontier = [(heuristic[start], 0.0, start)]
+        moves = self.moves
+        while frontier:
+            _, cost, cell = heapq.heappop(frontier)
+            cost = -cost
+            if goal[cell]:
+                return cost, cell
+            if cost > best[cell]:
+                continue
+            stats.nodes += 1
+            for offset, length, usable in moves:
+                if usable[cell]:
+                    nxt = cell + offset
+                    new_cost = cost + length
+                    if new_cost < best[nxt]:
+                        best[nxt] = new_cost
+                        heapq.heappush(frontier, (new_cost + heuristic[nxt], -new_cost, nxt))
+        return math.inf, None
+
+class Solver:
+    def __init__(self, level, stats=None):
+        self.started = time.perf_counter()
+        self.level = level
+        self.stats = stats or SolverStats()
+        self.path_cache = {}
+        self.region_cache = {}
+
+        boxes = np.flatnonzero(level.kinds == KIND_BOX)
+        box_half = (KIND_SIZES[KIND_BOX][0] / 2, KIND_SIZES[KIND_BOX][2] / 2)
+        self.room1 = NavGrid(ROOM1_CELL, [(level.positions[i, 0], level.positions[i, 1]) + box_half for i in boxes])
+        self.room2 = NavGrid(ROOM2_CELL, level.room2_colliders, gate_open=False)
+
+        # Interaction priority: lowest kind first, then store order.
+        self.order = sorted(range(len(level.kinds)), key=lambda i: (level.kinds[i], i))
+        self.rank = {index: rank for rank, index in enumerate(self.order)}
+        self.collectable = [i for i in range(len(level.kinds)) if level.kinds[i] in (KIND_KEY, KIND_FRUIT)]
+        self.bit = {index: 1 << n for n, index in enumerate(self.collectable)}
+        grid = self.room1
+        self.object_distance = np.hypot(grid.x[None, :] - level.positions[:, 0:1],
+                                        grid.z[None, :] - level.positions[:, 1:2])
+
+        # Collectables that can shadow an object, as a bitmask over self.bit.
+        self.shadow_mask = {}
+        self.always_shadowed = {}
+        for index in range(len(level.kinds)):
+            mask = 0
+            shadowed = np.zeros(len(grid.free), dtype=bool)
+            for other in self.order[:self.rank[index]]:
+                if np.hypot(*(level.positions[other] - level.positions[index])) >= 2 * logic.INTERACT_RANGE:
+                    continue
+                if other in self.bit:
+                    mask |= self.bit[other]
+                else:
+                    shadowed |= self.object_distance[other] < logic.INTERACT_RANGE
+            self.shadow_mask[index] = mask
+            self.always_shadowed[index] = shadowed
+
+    def region(self, index, taken):
+        # Free cells from which interacting picks object `index`.
+        key = (index, taken & self.shadow_mask[index])
+        cached = self.region_cache.get(key)
+        if cached is not None:
+            self.stats.region_hits += 1
+            return cached
+        self.stats.region_misses += 1
+
+        in_range = self.object_distance[index] < logic.INTERACT_RANGE
+        goal = in_range & self.room1.free & ~self.always_shadowed[index]
+        for other, bit in self.bit.items():
+            if self.shadow_mask[index] & bit and not taken & bit:
+                goal &= self.object_distance[other] >= logic.INTERACT_RANGE
+        heuristic = np.maximum(self.object_distance[index] - logic.INTERACT_RANGE, 0.0)
+        cached = (goal.tolist(), heuristic.tolist(), goal.any())
+        self.region_cache[key] = cached
+        return cached
+
+    def walk(self, grid, start, key, goal, heuristic):
+        cached = self.path_cache.get((start, key))
+        if cached is not None:
+            self.stats.path_hits += 1
+            return cached
+        self.stats.path_misses += 1
+        cached = grid.astar(start, goal, heuristic, self.stats)
+        self.path_cache[(start, key)] = cached
+        return cached
+
+    def walk_ticks(self, distance):
+        return math.ceil(distance / logic.MOVE_SPEED - 1e-9)
+
+    def solve_room1(self, start):
+        level = self.level
+        required = {fruit: 1 << n for n, fruit in enumerate(level.required_fruits)}
+        done_mask = (1 << len(required)) - 1
+        escaped = done_mask | 1 << len(required)
+        boxes = [i for i in range(len(level.kinds)) if level.kinds[i] == KIND_BOX]
+        box_bit = {index: 1 << n for n, index in enumerate(boxes)}
+
+        exit_goal = (self.room1.z > EXIT_Z).tolist()
+        exit_heuristic = np.maximum(EXIT_Z - self.room1.z, 0.0).tolist()
+
+        # Lower bound on the ticks left: every missing fruit still has to be
+        # fetched from one of its sources and carried out of the gate.
+        speed = logic.MOVE_SPEED
+        exit_bound = np.floor(np.maximum(EXIT_Z - self.room1.z, 0.0) / speed)
+        fruit_bounds = []
+        for fruit, bit in required.items():
+            bound = np.full(len(self.room1.free), np.inf)
+            for index in range(len(level.kinds)):
+                if level.fruits[index] == fruit:
+                    reach = np.maximum(self.object_distance[index] - logic.INTERACT_RANGE, 0.0)
+                    leave = max(EXIT_Z - level.positions[index, 1] - logic.INTERACT_RANGE, 0.0)
+                    bound = np.minimum(bound, np.floor(reach / speed) + 1 + math.floor(leave / speed))
+            fruit_bounds.append((bit, bound.tolist()))
+        exit_bound = exit_bound.tolist()
+
+        def remaining(cell, found):
+            bound = exit_bound[cell]
+            for bit, fruit_bound in fruit_bounds:
+                if not found & bit and fruit_bound[cell] > bound:
+                    bound = fruit_bound[cell]
+            return bound
+
+        # State: (cell, keys held, collectables taken, boxes opened, required fruits found).
+        begin = (start, 0, 0, 0, 0)
+        best = {begin: 0}
+        parents = {begin: None}
+        frontier = [(remaining(start, 0), 0, begin)]
+        while frontier:
+            _, ticks, state = heapq.heappop(frontier)
+            if ticks > best.get(state, math.inf):
+                continue
+            self.stats.states += 1
+            cell, held, taken, opened, found = state
+            if found == escaped:
+                return self.unwind(parents, state)
+            if found == done_mask:
+                distance, end = self.walk(self.room1, cell, "exit", exit_goal, exit_heuristic)
+                if end is not None:
+                    nxt = (end, held, taken, opened, escaped)
+                    new_ticks = ticks + self.walk_ticks(distance)
+                    if new_ticks < best.get(nxt, math.inf):
+                        best[nxt] = new_ticks
+                        parents[nxt] = (state, None, new_ticks - ticks)
+                        heapq.heappush(frontier, (new_ticks, new_ticks, nxt))
+                continue
+
+            for index in self.order:
+                kind = level.kinds[index]
+                if kind == KIND_CLUE:
+                    continue
+                if index in self.bit and taken & self.bit[index]:
+                    continue
+                if kind == KIND_BOX and (opened & box_bit[index] or
+                                         (level.locked[index] and not held)):
+                    continue
+                goal, heuristic, reachable = self.region(index, taken)
+                if not reachable:
+                    continue
+                distance, end = self.walk(self.room1, cell, (index, taken & self.shadow_mask[index]),
+                                          goal, heuristic)
+                if end is None:
+                    continue
+
+                new_held, new_taken, new_opened = held, taken, opened
+                if kind == KIND_KEY:
+                    new_held += 1
+                    new_taken |= self.bit[index]
+                elif kind == KIND_FRUIT:
+                    new_taken |= self.bit[index]
+                else:
+                    new_opened |= box_bit[index]
+                    if level.locked[index]:
+                        new_held -= 1
+                new_found = found | required.get(level.fruits[index], 0)
+
+                nxt = (end, new_held, new_taken, new_opened, new_found)
+                new_ticks = ticks + self.walk_ticks(distance) + 1
+                if new_ticks < best.get(nxt, math.inf):
+                    best[nxt] = new_ticks
+                    parents[nxt] = (state, index, new_ticks - ticks)
+                    heapq.heappush(frontier, (new_ticks + remaining(end, new_found), new_ticks, nxt))
+        return None
+
+    def unwind(self, parents, state):
+        steps = []
+        while parents[state] is not None:
+            previous, index, ticks = parents[state]
+            cell = state[0]
+            if index is None:
+                steps.append(PlanStep(0, "exit", "gate", self.room1.x[cell], self.room1.z[cell], ticks))
+            else:
+                steps.append(PlanStep(0, "interact", KIND_NAMES[self.level.kinds[index]],
+                                      self.room1.x[cell], self.room1.z[cell], ticks))
+            state = previous
+        steps.reverse()
+        return steps
+
+    def solve_room2(self, start):
+        level = self.level
+        grid = self.room2
+        cooldown = math.ceil(logic.SWITCH_COOLDOWN * logic.SIM_HZ)
+        targets = [(color, level.switches.get(color)) for color in level.color_sequence]
+        targets.append(("buzzer", (0.0, 0.0)))
+
+        steps = []
+        cell = start
+        since_switch = cooldown
+        for name, position in targets:
+            if position is None:
+                return None
+            distance_to = np.hypot(grid.x - position[0], grid.z - position[1])
+            # The nearest switch within reach wins, so stay closer to this one.
+            goal = grid.free & (distance_to < 1.0)
+            for other, (x, z) in level.switches.items():
+                if other != name:
+                    goal &= np.hypot(grid.x - x, grid.z - z) > distance_to
+            heuristic = np.maximum(distance_to - 1.0, 0.0).tolist()
+            distance, end = self.walk(grid, cell, name, goal.tolist(), heuristic)
+            if end is None:
+                return None
+            ticks = max(self.walk_ticks(distance), cooldown - since_switch) + 1
+            steps.append(PlanStep(1, "interact", name, grid.x[end], grid.z[end], ticks))
+            since_switch = 0
+            cell = end
+        return steps
+
+    def solve(self):
+        room1 = self.solve_room1(self.room1.cell_at(0.0, 5.0))
+        room2 = None
+        if room1 is not None:
+            room2 = self.solve_room2(self.room2.cell_at(0.0, -logic.ROOM_SIZE / 2 + 2.0))
+        plan = Plan(room1 + room2 if room2 is not None else [])
+
+        self.stats.levels += 1
+        self.stats.solvable += plan.solvable
+        self.stats.elapsed += time.perf_counter() - self.started
+        return plan
+
+def solve_current_level(stats=None):
+    return Solver(Level.from_game_logic(), stats).solve()
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve Puzzle Prison levels and report search speed")
+    parser.add_argument("--levels", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show-plan", action="store_true")
+    args = parser.parse_args()
+
+    logic.VERBOSE = False
+    stats = SolverStats()
+    rng = random.Random(args.seed)
+    for _ in range(args.levels):
+        logic.new_game(rng.randrange(2 ** 32))
+        plan = solve_current_level(stats)
+    if args.show_plan:
+        for step in plan.steps:
+            print(step)
+        print(f"plan: {plan.ticks} ticks ({plan.seconds:.1f}s of {logic.TIME_LIMIT}s)")
+    print(stats.report())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import math
+
+import numpy as np
+
+# Uniform grid over the X/Z floor plane. Every object is registered in each
+# cell its footprint overlaps, so a query only has to look at the handful of
+# cells around the query area instead of every object in the room.
+
+class GridEntry:
+    def __init__(self, obj, kind, x, z, half_x, half_z, order):
+        self.obj = obj
+        self.kind = kind
+        self.x = x
+        self.z = z
+        self.half_x = half_x
+        self.half_z = half_z
+        self.order = order
+        self.cells = []
+
+class SpatialGrid:
+    def __init__(self, cell_size=2.0):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+        self.next_order = 0
+
+    def cell_range(self, min_x, min_z, max_x, max_z):
+        size = self.cell_size
+        for cx in range(math.floor(min_x / size), math.floor(max_x / size) + 1):
+            for cz in range(math.floor(min_z / size), math.floor(max_z / size) + 1):
+                yield (cx, cz)
+
+    def insert(self, obj, x, z, half_x=0.0, half_z=0.0, kind=None):
+        if obj in self.entries:
+            self.remove(obj)
+        entry = GridEntry(obj, kind, x, z, half_x, half_z, self.next_order)
+        self.next_order += 1
+        for cell in self.cell_range(x - half_x, z - half_z, x + half_x, z + half_z):
+            self.cells.setdefault(cell, []).append(entry)
+            entry.cells.append(cell)
+        self.entries[obj] = entry
+        return entry
+
+    def remove(self, obj):
+        entry = self.entries.pop(obj, None)
+        if entry is None:
+            return False
+        for cell in entry.cells:
+            bucket = self.cells[cell]
+            bucket.remove(entry)
+            if not bucket:
+                del self.cells[cell]
+        return True
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+        self.next_order = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, obj):
+        return obj in self.entries
+
+    def query_box(self, min_x, min_z, max_x, max_z):
+        found = {}
+        for cell in self.cell_range(min_x, min_z, max_x, max_z):
+            for entry in self.cells.get(cell, ()):
+                if (entry.x + entry.half_x > min_x and entry.x - entry.half_x < max_x and
+                        entry.z + entry.half_z > min_z and entry.z - entry.half_z < max_z):
+                    found[entry.order] = entry
+        return [found[order] for order in sorted(found)]
+
+    def query_ids(self, min_x, min_z, max_x, max_z):
+        return [entry.obj for entry in self.query_box(min_x, min_z, max_x, max_z)]
+
+    def query_radius(self, x, z, radius):
+        radius_sq = radius * radius
+        found = []
+        for entry in self.query_box(x - radius, z - radius, x + radius, z + radius):
+            if (entry.x - x) ** 2 + (entry.z - z) ** 2 < radius_sq:
+                found.append(entry)
+        return found
+
+class PackedGrid:
+    # The same grid frozen into flat arrays (CSR layout over a dense block of
+    # cells, column by column), so it can be saved with a compiled level and
+    # used straight from a memory map. Objects are integer ids; removal only
+    # clears the entry's alive flag.
+    def __init__(self, cell_size, origin, shape, cell_start, members, ids, bounds, alive):
+        self.cell_size = cell_size
+        self.origin_x, self.origin_z = origin
+        self.cols, self.rows = shape
+        self.cell_start = cell_start
+        self.members = members
+        self.ids = ids
+        self.bounds = bounds
+        self.alive = alive
+
+    @classmethod
+    def build(cls, ids, xs, zs, half_x=0.0, half_z=0.0, cell_size=2.0):
+        ids = np.asarray(ids, dtype=np.int32)
+        bounds = np.empty((len(ids), 4), dtype=np.float32)
+        bounds[:, 0] = xs
+        bounds[:, 1] = zs
+        bounds[:, 2] = half_x
+        bounds[:, 3] = half_z
+        x, z, hx, hz = bounds.T.astype(np.float64)
+        first_x = np.floor((x - hx) / cell_size).astype(np.int64)
+        last_x = np.floor((x + hx) / cell_size).astype(np.int64)
+        first_z = np.floor((z - hz) / cell_size).astype(np.int64)
+        last_z = np.floor((z + hz) / cell_size).astype(np.int64)
+        if len(ids):
+            origin = (int(first_x.min()), int(first_z.min()))
+            shape = (int(last_x.max()) - origin[0] + 1, int(last_z.max()) - origin[1] + 1)
+        else:
+            origin, shape = (0, 0), (0, 0)
+
+        # Every (entry, cell) pair the entry overlaps, entry by entry and
+        # column by column within an entry, laid out without a Python loop.
+        span_z = last_z - first_z + 1
+        spans = (last_x - first_x + 1) * span_z
+        entries = np.repeat(np.arange(len(ids), dtype=np.int32), spans)
+        step = np.arange(len(entries), dtype=np.int64) - np.repeat(np.cumsum(spans) - spans, spans)
+        cx = first_x[entries] + step // span_z[entries]
+        cz = first_z[entries] + step % span_z[entries]
+        cells = (cx - origin[0]) * shape[1] + (cz - origin[1])
+        order = np.argsort(cells, kind="stable")
+        members = entries[order]
+        counts = np.bincount(cells, minlength=shape[0] * shape[1])
+        cell_start = np.zeros(shape[0] * shape[1] + 1, dtype=np.int32)
+        np.cumsum(counts, out=cell_start[1:])
+        return cls(cell_size, origin, shape, cell_start, members, ids, bounds,
+                   np.ones(len(ids), dtype=np.uint8))
+
+    def copy(self):
+        # Fresh alive flags over shared (possibly memory-mapped) arrays.
+        return PackedGrid(self.cell_size, (self.origin_x, self.origin_z), (self.cols, self.rows),
+                          self.cell_start, self.members, self.ids, self.bounds, self.alive.copy())
+
+    def entry_of(self, obj):
+        hits = np.flatnonzero(self.ids == obj)
+        return int(hits[0]) if len(hits) else None
+
+    def remove(self, obj):
+        entry = self.entry_of(obj)
+        if entry is None or not self.alive[entry]:
+            return False
+        self.alive[entry] = 0
+        return True
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    def __contains__(self, obj):
+        entry = self.entry_of(obj)
+        return entry is not None and bool(self.alive[entry])
+
+    def query_ids(self, min_x, min_z, max_x, max_z):
+        size = self.cell_size
+        col_lo = max(math.floor(min_x / size) - self.origin_x, 0)
+        col_hi = min(math.floor(max_x / size) - self.origin_x, self.cols - 1)
+        row_lo = max(math.floor(min_z / size) - self.origin_z, 0)
+        row_hi = min(math.floor(max_z / size) - self.origin_z, self.rows - 1)
+        if col_lo > col_hi or row_lo > row_hi:
+            return []
+
+        found = set()
+        for col in range(col_lo, col_hi + 1):
+            base = col * self.rows
+            found.update(self.members[self.cell_start[base + row_lo]:self.cell_start[base + row_hi + 1]].tolist())
+        if not found:
+            return []
+
+        entries = np.array(sorted(found), dtype=np.intp)
+        x, z, hx, hz = self.bounds[entries].T
+        hit = ((self.alive[entries] != 0) & (x + hx > min_x) & (x - hx < max_x) &
+               (z + hz > min_z) & (z - hz < max_z))
+        return self.ids[entries[hit]].tolist()
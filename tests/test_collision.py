@@ -0,0 +1,87 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from collision import SKIN, CollisionWorld, move_circles, sweep_box
+from entity_store import EntityStore, KIND_BOX
+from spatial_index import PackedGrid
+
+RADIUS = 0.3
+
+def test_sweep_box_face_hit():
+    t, nx, nz = sweep_box(-2.0, 0.0, 4.0, 0.0, RADIUS, 0.0, 0.0, 0.5, 0.5)
+    assert t == pytest.approx((2.0 - 0.5 - RADIUS) / 4.0)
+    assert (nx, nz) == (-1.0, 0.0)
+
+def test_sweep_box_corner_hit():
+    # Heading for the corner diagonally: the normal points out of the corner.
+    t, nx, nz = sweep_box(-2.0, -2.0, 3.0, 3.0, RADIUS, 0.0, 0.0, 0.5, 0.5)
+    assert nx == pytest.approx(-math.sqrt(0.5)) and nz == pytest.approx(-math.sqrt(0.5))
+    assert math.hypot(-2.0 + 3.0 * t + 0.5, -2.0 + 3.0 * t + 0.5) == pytest.approx(RADIUS)
+
+def test_sweep_box_misses_and_leaving_contact():
+    assert sweep_box(-2.0, 2.0, 4.0, 0.0, RADIUS, 0.0, 0.0, 0.5, 0.5) is None
+    assert sweep_box(-0.7, 0.0, -1.0, 0.0, RADIUS, 0.0, 0.0, 0.5, 0.5) is None
+    assert sweep_box(-0.7, 0.0, 1.0, 0.0, RADIUS, 0.0, 0.0, 0.5, 0.5)[0] == 0.0
+
+def room():
+    world = CollisionWorld()
+    world.add_room_walls(room_size=10.0, gate_width=2.0)
+    return world
+
+def test_move_stops_short_of_a_wall():
+    world = room()
+    x, z = world.move(3.0, 0.0, 5.0, 0.0, RADIUS)
+    assert z == 0.0
+    assert x == pytest.approx(5.0 - RADIUS, abs=2 * SKIN)
+    assert x < 5.0 - RADIUS
+    assert not world.overlaps(x, z, RADIUS)
+
+def test_move_slides_along_a_wall():
+    world = room()
+    x, z = world.move(4.0, 0.0, 2.0, 1.0, RADIUS)
+    assert x == pytest.approx(5.0 - RADIUS, abs=2 * SKIN)
+    assert z == pytest.approx(1.0, abs=1e-3)
+
+def test_fast_moves_do_not_tunnel():
+    world = CollisionWorld()
+    world.add_box(0.0, 0.0, 0.05, 2.0)
+    x, z = world.move(-1.0, 0.0, 50.0, 0.0, RADIUS)
+    assert x < -0.05 - RADIUS + SKIN
+
+def test_gate_blocks_until_opened():
+    world = room()
+    blocked = world.move(0.0, 4.0, 0.0, 3.0, RADIUS)
+    assert blocked[1] < 5.0 - RADIUS
+    world.set_gate_open(True)
+    assert world.move(0.0, 4.0, 0.0, 3.0, RADIUS) == (0.0, 7.0)
+
+def test_props_collide_through_the_room_grid():
+    store = EntityStore()
+    store.add(KIND_BOX, (2.0, 0.0, 0.0))
+    world = room()
+    world.set_props(PackedGrid.build([0], [2.0], [0.0], 0.5, 0.5), store, 0.5, 0.5)
+    x, _ = world.move(0.0, 0.0, 3.0, 0.0, RADIUS)
+    assert x == pytest.approx(1.5 - RADIUS, abs=2 * SKIN)
+
+def test_move_circles_matches_move():
+    rng = random.Random(0)
+    world = room()
+    for _ in range(6):
+        world.add_box(rng.uniform(-4, 4), rng.uniform(-4, 4), rng.uniform(0.2, 1.0), rng.uniform(0.2, 1.0))
+    count = 300
+    x = np.array([rng.uniform(-4.5, 4.5) for _ in range(count)])
+    z = np.array([rng.uniform(-4.5, 4.5) for _ in range(count)])
+    keep = np.array([not world.overlaps(a, b, RADIUS) for a, b in zip(x, z)])
+    x, z = x[keep], z[keep]
+    dx = np.array([rng.uniform(-2, 2) for _ in x])
+    dz = np.array([rng.uniform(-2, 2) for _ in x])
+    boxes = np.array(world.boxes)
+    rows = (len(x), 1)
+    got_x, got_z = move_circles(x, z, dx, dz, RADIUS, *(np.tile(boxes[:, i], rows) for i in range(4)),
+                                np.tile(np.array(world.enabled), rows))
+    for i in range(len(x)):
+        want = world.move(float(x[i]), float(z[i]), float(dx[i]), float(dz[i]), RADIUS)
+        assert (got_x[i], got_z[i]) == pytest.approx(want, abs=1e-9)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from entity_store import (EntityStore, KIND_BOX, KIND_CLUE, KIND_FRUIT, KIND_KEY, FLAG_COLLECTED,
+                          FLAG_LOCKED)
+
+def sample_store():
+    store = EntityStore(capacity=2)
+    store.add(KIND_BOX, (1.0, 0.0, 2.0), FLAG_LOCKED, fruit="apple", text="locked")
+    store.add(KIND_FRUIT, (3.0, 0.0, 0.0), fruit="banana")
+    store.add(KIND_KEY, (0.5, 0.0, 0.5), text="")
+    store.add(KIND_CLUE, (0.0, 0.0, 0.0), text="look under the box")
+    store.add(KIND_FRUIT, (-4.0, 0.0, 1.0), fruit="apple")
+    return store
+
+def test_add_grows_and_interns():
+    store = sample_store()
+    assert store.count == 5 and len(store.kinds) >= 5
+    assert store.fruit_names == ["apple", "banana"]
+    assert store.fruit_ids[:5].tolist() == [0, 1, -1, -1, 0]
+    assert store.texts == ["locked", "", "look under the box"]
+    assert store.text_ids[:5].tolist() == [0, -1, 1, 2, -1]
+
+def test_extend_matches_add():
+    store = sample_store()
+    batch = EntityStore(capacity=2)
+    rows = batch.extend([KIND_BOX, KIND_FRUIT, KIND_KEY, KIND_CLUE, KIND_FRUIT],
+                        store.positions[:5], store.flags[:5],
+                        ["apple", "banana", None, None, "apple"],
+                        ["locked", None, "", "look under the box", None])
+    assert rows.tolist() == [0, 1, 2, 3, 4]
+    for name in ("kinds", "flags", "fruit_ids", "text_ids", "positions"):
+        assert np.array_equal(getattr(batch, name)[:5], getattr(store, name)[:5])
+    assert batch.fruit_names == store.fruit_names and batch.texts == store.texts
+
+def test_queries():
+    store = sample_store()
+    store.flags[4] |= FLAG_COLLECTED
+    assert store.visible(KIND_FRUIT).tolist() == [1]
+    assert store.within_radius([0, 1, 2, 3, 4], 0.0, 0.0, 1.0).tolist() == [2, 3]
+    assert store.uncollected([1, 4]).tolist() == [1]
+    assert store.first_by_kind(np.array([4, 2, 3])) == 3
+    assert store.overlaps_square([0], 1.6, 2.0, 0.2)
+    assert not store.overlaps_square([0], 1.8, 2.0, 0.2)
+
+def test_frozen_is_a_read_only_copy():
+    store = sample_store()
+    snapshot = store.frozen()
+    store.flags[0] = 0
+    store.positions[1] = (9.0, 9.0, 9.0)
+    store.add(KIND_KEY, (0.0, 0.0, 0.0), text="new")
+    assert snapshot.count == 5
+    assert snapshot.flags[0] == FLAG_LOCKED
+    assert snapshot.positions[1].tolist() == [3.0, 0.0, 0.0]
+    assert snapshot.texts == ("locked", "", "look under the box")
+    for name in ("kinds", "flags", "fruit_ids", "text_ids", "positions"):
+        with pytest.raises(ValueError):
+            getattr(snapshot, name)[0] = 0
+
+def test_frozen_shares_unchanged_arrays():
+    store = sample_store()
+    first = store.frozen()
+    store.flags[1] |= FLAG_COLLECTED
+    second = store.frozen(first)
+    assert second.positions is first.positions and second.kinds is first.kinds
+    assert second.flags is not first.flags
+    assert second.flags[1] == FLAG_COLLECTED and first.flags[1] == 0
+    assert store.visible(KIND_FRUIT).tolist() == [4]
+
+    store.add(KIND_CLUE, (5.0, 0.0, 5.0), text="another")
+    third = store.frozen(second)
+    assert third.positions is not second.positions
+    assert third.count == 6 and third.texts[-1] == "another"
+
+def test_frozen_ignores_previous_from_another_store():
+    store, other = sample_store(), sample_store()
+    other.positions[0] = (7.0, 0.0, 7.0)
+    snapshot = store.frozen(other.frozen())
+    assert snapshot.positions[0].tolist() == [1.0, 0.0, 2.0]
@@ -0,0 +1,77 @@
+import random
+import json
+
+import numpy as np
+import pytest
+
+import game_logic as logic
+from headless import HeadlessGame, random_inputs
+from levels import (DEFAULT_LEVEL, GRID_ARRAYS, STORE_ARRAYS, CompiledLevel, LevelData, compile_level,
+                    load_level)
+
+@pytest.fixture
+def compiled(tmp_path):
+    path = tmp_path / "prison.pplc"
+    compile_level(LevelData.load(DEFAULT_LEVEL), str(path))
+    return load_level(str(path))
+
+def test_compiled_level_matches_json(compiled):
+    source = load_level(DEFAULT_LEVEL)
+    assert isinstance(source, LevelData) and isinstance(compiled, CompiledLevel)
+    assert compiled.name == source.name
+    assert compiled.required_fruits == source.required_fruits
+    assert compiled.switches == source.switches
+    assert compiled.sequence_length == source.sequence_length
+    assert [room.to_json() for room in compiled.rooms] == [room.to_json() for room in source.rooms]
+
+    for number in range(len(source.rooms)):
+        expected, loaded = source.room_content(number), compiled.room_content(number)
+        for name in STORE_ARRAYS:
+            assert loaded.arrays[name].dtype == expected.arrays[name].dtype
+            assert np.array_equal(loaded.arrays[name], expected.arrays[name])
+        assert list(loaded.fruit_names) == list(expected.fruit_names)
+        assert list(loaded.texts) == list(expected.texts)
+        assert np.array_equal(loaded.box_mesh, expected.box_mesh)
+        for want, got in zip(expected.grids, loaded.grids):
+            assert (got.cell_size, got.origin_x, got.origin_z, got.cols, got.rows) == \
+                   (want.cell_size, want.origin_x, want.origin_z, want.cols, want.rows)
+            for part in GRID_ARRAYS:
+                assert np.array_equal(getattr(got, part), getattr(want, part))
+
+def play(level, seed, ticks):
+    logic.use_level(level)
+    rng = random.Random(seed)
+    headless = HeadlessGame(seed=seed)
+    path = []
+    for _ in range(ticks):
+        game = headless.step(random_inputs(rng))
+        path.append((game.player_x, game.player_z, game.current_room, game.keys_found, game.time_remaining))
+        if headless.done:
+            break
+    return path
+
+def test_compiled_level_plays_like_json(compiled):
+    try:
+        assert play(compiled, 7, 2000) == play(load_level(DEFAULT_LEVEL), 7, 2000)
+    finally:
+        logic.use_level(load_level(DEFAULT_LEVEL))
+
+@pytest.mark.parametrize("change", [
+    lambda data: data["rooms"][0]["props"].append({"kind": "chair", "pos": [0, 0, 0]}),
+    lambda data: data["rooms"][0].update(gate_to=99),
+    lambda data: data["rooms"][1].update(sequence_length=0),
+])
+def test_invalid_levels_are_rejected(change):
+    with open(DEFAULT_LEVEL) as f:
+        data = json.load(f)
+    change(data)
+    with pytest.raises(ValueError):
+        LevelData.from_json(data)
+
+def test_load_level_rejects_other_versions(compiled, tmp_path):
+    data = bytearray(compiled.data)
+    data[4] += 1
+    path = tmp_path / "old.pplc"
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        load_level(str(path))
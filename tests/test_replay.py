@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import game_logic as logic
+import replay
+
+def record_session(seed, max_ticks=5000):
+    # Random held keys, interacts and camera toggles until the game ends.
+    logic.VERBOSE = False
+    rng = random.Random(seed)
+    logic.new_game(seed)
+    game = logic.game
+    recorder = replay.InputRecorder(seed)
+    path = []
+    for _ in range(max_ticks):
+        if rng.random() < 0.05:
+            flag = rng.choice(replay.KEY_FLAGS)
+            setattr(game, flag, not getattr(game, flag))
+        if rng.random() < 0.03:
+            recorder.event(replay.EVENT_INTERACT)
+            logic.interact()
+        if rng.random() < 0.005:
+            recorder.event(replay.EVENT_CAMERA)
+            replay.toggle_camera(game)
+        recorder.sample(game)
+        logic.simulation_step()
+        path.append((game.player_x, game.player_z, game.current_room, game.keys_found))
+        if game.game_completed or game.game_over:
+            break
+    recorder.log.outcome = replay.outcome(game)
+    return recorder.log, path
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_replay_reproduces_outcome_and_tick(seed, tmp_path):
+    log, path = record_session(seed)
+    assert log.ticks == len(path)
+    file = tmp_path / "run.pprl"
+    log.save(file)
+    loaded = replay.InputLog.load(file)
+    assert (loaded.seed, loaded.runs, loaded.events) == (log.seed, log.runs, log.events)
+
+    replayer = replay.Replayer(loaded)
+    game = replayer.start()
+    replayed = []
+    while not replayer.done:
+        replayer.step()
+        game = logic.game
+        replayed.append((game.player_x, game.player_z, game.current_room, game.keys_found))
+    assert replayer.tick == log.ticks
+    assert replayed == path
+    assert replay.outcome(game) == tuple(loaded.outcome)
+    assert game.game_completed or game.game_over
+
+def test_runs_are_length_encoded():
+    log, path = record_session(4, max_ticks=600)
+    assert len(log.runs) < len(path) / 4
+    assert list(log.masks()) == [mask for mask, length in log.runs for _ in range(length)]
+    assert replay.InputLog.from_bytes(log.to_bytes()).ticks == len(path)
+
+def test_rejects_bad_and_truncated_logs():
+    log, _ = record_session(5, max_ticks=300)
+    data = log.to_bytes()
+    with pytest.raises(ValueError):
+        replay.InputLog.from_bytes(b"XXXX" + data[4:])
+    header = replay.HEADER.unpack_from(data)
+    forged = replay.HEADER.pack(*header[:3], header[3] + 1, *header[4:]) + data[replay.HEADER.size:]
+    with pytest.raises(ValueError):
+        replay.InputLog.from_bytes(forged)
@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+
+from spatial_index import PackedGrid, SpatialGrid
+
+def random_boxes(count, seed):
+    rng = random.Random(seed)
+    return [(rng.uniform(-20, 20), rng.uniform(-20, 20), rng.choice([0.0, 0.15, 0.5, 3.0]), rng.uniform(0, 1))
+            for _ in range(count)]
+
+def overlapping(boxes, min_x, min_z, max_x, max_z):
+    return [i for i, (x, z, hx, hz) in enumerate(boxes)
+            if x + hx > min_x and x - hx < max_x and z + hz > min_z and z - hz < max_z]
+
+def random_queries(count, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        x, z = rng.uniform(-25, 25), rng.uniform(-25, 25)
+        yield x, z, x + rng.uniform(0, 6), z + rng.uniform(0, 6)
+
+def test_spatial_grid_matches_brute_force():
+    boxes = random_boxes(500, 1)
+    grid = SpatialGrid(cell_size=2.0)
+    for i, (x, z, hx, hz) in enumerate(boxes):
+        grid.insert(i, x, z, hx, hz)
+    for query in random_queries(200, 2):
+        assert grid.query_ids(*query) == overlapping(boxes, *query)
+
+def test_spatial_grid_remove_and_reinsert():
+    grid = SpatialGrid(cell_size=2.0)
+    grid.insert("a", 0.0, 0.0, 0.5, 0.5)
+    grid.insert("b", 1.0, 0.0)
+    assert grid.query_ids(-1, -1, 2, 1) == ["a", "b"]
+    assert grid.remove("a")
+    assert not grid.remove("a")
+    assert "a" not in grid and len(grid) == 1
+    grid.insert("b", 10.0, 10.0)
+    assert grid.query_ids(-1, -1, 2, 1) == []
+    assert grid.query_ids(9, 9, 11, 11) == ["b"]
+    assert not grid.cells.get((0, 0))
+
+def test_spatial_grid_query_radius():
+    grid = SpatialGrid(cell_size=1.0)
+    grid.insert("near", 0.5, 0.5)
+    grid.insert("corner", 0.9, 0.9)
+    assert [entry.obj for entry in grid.query_radius(0.0, 0.0, 1.0)] == ["near"]
+
+def test_packed_grid_matches_spatial_grid():
+    # Packed bounds are float32, so the reference grid gets the same values.
+    boxes = random_boxes(500, 3)
+    ids = np.arange(100, 100 + len(boxes))
+    xs = np.array([box[0] for box in boxes], dtype=np.float32)
+    zs = np.array([box[1] for box in boxes], dtype=np.float32)
+    for half in (0.0, 0.5, 2.5):
+        packed = PackedGrid.build(ids, xs, zs, half, half, cell_size=2.0)
+        reference = SpatialGrid(cell_size=2.0)
+        for i, x, z in zip(ids, xs, zs):
+            reference.insert(int(i), float(x), float(z), half, half)
+        for query in random_queries(200, 4):
+            assert packed.query_ids(*query) == reference.query_ids(*query)
+
+def test_packed_grid_remove_only_clears_alive():
+    packed = PackedGrid.build([7, 8, 9], [0.0, 0.5, 5.0], [0.0, 0.5, 5.0], cell_size=2.0)
+    copy = packed.copy()
+    assert packed.remove(8)
+    assert not packed.remove(8)
+    assert not packed.remove(42)
+    assert packed.query_ids(-1, -1, 1, 1) == [7]
+    assert len(packed) == 2 and 8 not in packed
+    assert copy.query_ids(-1, -1, 1, 1) == [7, 8]
+
+def test_packed_grid_empty():
+    packed = PackedGrid.build([], [], [], cell_size=2.0)
+    assert len(packed) == 0
+    assert packed.query_ids(-5, -5, 5, 5) == []